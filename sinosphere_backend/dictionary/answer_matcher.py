@@ -0,0 +1,214 @@
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from .utils import split_translation, normalize_gloss
+from .word_index import WordIndex
+
+
+def bounded_levenshtein(source: str, target: str, max_distance: int) -> int:
+    """
+    Расстояние Левенштейна с ранним выходом.
+    Если расстояние больше max_distance, возвращается max_distance + 1
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    if len(source) < len(target):
+        source, target = target, source
+
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i]
+        row_min = i
+        for j, target_char in enumerate(target, 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (source_char != target_char)
+            )
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return min(previous[-1], max_distance + 1)
+
+
+class AnswerMatcher:
+    """
+    Проверка ответов для одного слова по заранее нормализованным значениям.
+    Экземпляры хранятся в LRU-кэше процесса и сбрасываются при смене версии словаря.
+    Опечатка не засчитывается, если ответ - значение другого слова словаря (стул/стол)
+    """
+    CACHE_SIZE = 10000
+
+    _cache = OrderedDict()
+    _cache_version = None
+    _glosses = frozenset()
+    _glosses_version = None
+    _lock = threading.Lock()
+
+    def __init__(self, word_id, hanzi, pinyin, glosses: Iterable[Tuple[str, str]]):
+        self.word_id = word_id
+        self.hanzi = hanzi
+        self.pinyin = pinyin
+
+        glosses = [(text, normalized) for text, normalized in glosses if normalized]
+        self.glosses = tuple(text for text, _ in glosses)
+        self.normalized = tuple(normalized for _, normalized in glosses)
+        self._exact = {}
+        for position, normalized in enumerate(self.normalized):
+            self._exact.setdefault(normalized, position)
+
+    @staticmethod
+    def max_distance(length: int) -> int:
+        """Допустимое число опечаток в зависимости от длины ответа"""
+        if length <= 3:
+            return 0
+        if length <= 7:
+            return 1
+        return 2
+
+    @property
+    def primary(self) -> str:
+        """Основное значение слова"""
+        return self.glosses[0] if self.glosses else ''
+
+    def random_gloss(self) -> str:
+        """Случайное значение слова"""
+        return random.choice(self.glosses) if self.glosses else ''
+
+    def match(self, answer: str) -> Optional[Tuple[str, int]]:
+        """
+        Сопоставить ответ со значениями слова.
+        Возвращает (значение, число опечаток) или None, если ответ неверный
+        """
+        normalized = normalize_gloss(answer)
+        if not normalized:
+            return None
+
+        position = self._exact.get(normalized)
+        if position is not None:
+            return self.glosses[position], 0
+
+        limit = self.max_distance(len(normalized))
+        if limit == 0 or self.is_dictionary_gloss(normalized):
+            return None
+
+        best = None
+        for text, candidate in zip(self.glosses, self.normalized):
+            distance = bounded_levenshtein(normalized, candidate, limit)
+            if distance <= limit and (best is None or distance < best[1]):
+                best = (text, distance)
+                if distance == 1:
+                    break
+        return best
+
+    @classmethod
+    def is_dictionary_gloss(cls, normalized: str) -> bool:
+        """
+        Совпадает ли нормализованный ответ со значением какого-либо слова словаря.
+        Множество значений загружается один раз на версию словаря
+        """
+        from .models import WordTranslation
+
+        version = WordIndex.current_version()
+        if cls._glosses_version != version:
+            glosses = frozenset(
+                WordTranslation.objects.values_list('normalized', flat=True).iterator(chunk_size=5000)
+            )
+            with cls._lock:
+                cls._glosses = glosses
+                cls._glosses_version = version
+        return normalized in cls._glosses
+
+    def matches_hanzi(self, answer: str) -> bool:
+        """Проверить ответ иероглифами"""
+        return answer.strip() == self.hanzi
+
+    @classmethod
+    def for_word(cls, word_id) -> Optional['AnswerMatcher']:
+        """Получить проверку ответов для слова или None, если слова нет"""
+        return cls.for_words([word_id]).get(word_id)
+
+    @classmethod
+    def for_words(cls, word_ids, words=None) -> Dict[int, 'AnswerMatcher']:
+        """
+        Получить проверки ответов для набора слов, недостающие загружаются пакетно.
+        Если передан словарь уже загруженных words {id: Word}, недостающие
+        строятся по их переводу без запроса
+        """
+        word_ids = [int(word_id) for word_id in word_ids]
+        version = WordIndex.current_version()
+
+        matchers = {}
+        with cls._lock:
+            if cls._cache_version != version:
+                cls._cache.clear()
+                cls._cache_version = version
+
+            for word_id in word_ids:
+                matcher = cls._cache.get(word_id)
+                if matcher is not None:
+                    cls._cache.move_to_end(word_id)
+                    matchers[word_id] = matcher
+
+        missing = [word_id for word_id in word_ids if word_id not in matchers]
+        if missing:
+            if words is not None:
+                loaded = cls._from_words(words[word_id] for word_id in missing if word_id in words)
+            else:
+                loaded = cls._load(missing)
+            matchers.update(loaded)
+
+            with cls._lock:
+                if cls._cache_version == version:
+                    cls._cache.update(loaded)
+                    while len(cls._cache) > cls.CACHE_SIZE:
+                        cls._cache.popitem(last=False)
+
+        return matchers
+
+    @classmethod
+    def _load(cls, word_ids) -> Dict[int, 'AnswerMatcher']:
+        """Загрузить значения слов из WordTranslation, для слов без значений - из перевода"""
+        from .models import Word, WordTranslation
+
+        words = {}
+        glosses = {}
+        rows = WordTranslation.objects.filter(word_id__in=word_ids).values_list(
+            'word_id', 'word__hanzi', 'word__pinyin_graphic', 'text', 'normalized'
+        ).order_by('word_id', 'position')
+
+        for word_id, hanzi, pinyin, text, normalized in rows:
+            words[word_id] = (hanzi, pinyin)
+            glosses.setdefault(word_id, []).append((text, normalized))
+
+        remaining = [word_id for word_id in word_ids if word_id not in words]
+        if remaining:
+            rows = Word.objects.filter(id__in=remaining).values_list(
+                'id', 'hanzi', 'pinyin_graphic', 'translation'
+            )
+            for word_id, hanzi, pinyin, translation in rows:
+                words[word_id] = (hanzi, pinyin)
+                glosses[word_id] = [
+                    (gloss, normalize_gloss(gloss)) for gloss in split_translation(translation)
+                ]
+
+        return {
+            word_id: cls(word_id, hanzi, pinyin, glosses.get(word_id, ()))
+            for word_id, (hanzi, pinyin) in words.items()
+        }
+
+    @classmethod
+    def _from_words(cls, words) -> Dict[int, 'AnswerMatcher']:
+        """Построить проверки по загруженным словам, так же как строятся строки WordTranslation"""
+        return {
+            word.id: cls(word.id, word.hanzi, word.pinyin_graphic, [
+                (gloss[:255], normalize_gloss(gloss)[:255])
+                for gloss in split_translation(word.translation)
+            ])
+            for word in words
+        }
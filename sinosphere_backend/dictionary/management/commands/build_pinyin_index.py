@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from dictionary.pinyin_index import HomophoneIndex
+
+class Command(BaseCommand):
+    help = 'Построить индекс созвучных слов по нормализованному пиньиню'
+    
+    def handle(self, *args, **kwargs):
+        index = HomophoneIndex.build()
+        
+        self.stdout.write(f'Слов в индексе: {len(index.word_syllables)}')
+        self.stdout.write(f'  Групп омофонов: {len(index.exact)}')
+        self.stdout.write(f'  Групп без учёта тонов: {len(index.toneless)}')
+        self.stdout.write(f'  Групп с отличием в один слог: {len(index.near)}')
+        self.stdout.write(self.style.SUCCESS('Индекс созвучных слов построен'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dictionary.models import ExampleSentence, SentenceOccurrence
+from dictionary.utils import build_sentence_occurrences
+from dictionary.word_index import WordIndex
+
+class Command(BaseCommand):
+    help = 'Построить индекс вхождений слов в примеры предложений'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пакета для вставки'
+        )
+    
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        index = WordIndex.get()
+        sentences = ExampleSentence.objects.values_list(
+            'id', 'chinese_sentence', 'word_id', 'word__hanzi'
+        ).order_by('id')
+        
+        created = 0
+        with transaction.atomic():
+            SentenceOccurrence.objects.all().delete()
+            
+            batch = []
+            for sentence_id, text, word_id, hanzi in sentences.iterator(chunk_size=batch_size):
+                batch.extend(build_sentence_occurrences(sentence_id, text, index, word_id, hanzi))
+                if len(batch) >= batch_size:
+                    SentenceOccurrence.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            
+            if batch:
+                SentenceOccurrence.objects.bulk_create(batch)
+                created += len(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'Создано вхождений слов: {created}'))
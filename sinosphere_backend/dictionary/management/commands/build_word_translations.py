@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dictionary.models import Word, WordTranslation
+from dictionary.utils import build_word_translations
+from dictionary.word_index import WordIndex
+
+class Command(BaseCommand):
+    help = 'Заполнить таблицу значений слов по полю перевода'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пакета для вставки'
+        )
+    
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        words = Word.objects.values_list('id', 'translation').order_by('id')
+        
+        created = 0
+        with transaction.atomic():
+            WordTranslation.objects.all().delete()
+            
+            batch = []
+            for word_id, translation in words.iterator(chunk_size=batch_size):
+                batch.extend(build_word_translations(word_id, translation))
+                if len(batch) >= batch_size:
+                    WordTranslation.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            
+            if batch:
+                WordTranslation.objects.bulk_create(batch)
+                created += len(batch)
+        
+        WordIndex.invalidate()
+        
+        self.stdout.write(self.style.SUCCESS(f'Создано значений слов: {created}'))
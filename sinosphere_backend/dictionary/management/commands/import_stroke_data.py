@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from dictionary.stroke_store import StrokeStore, default_stroke_data_path, read_graphics
+
+class Command(BaseCommand):
+    help = 'Импортировать медианы штрихов из graphics.txt (makemeahanzi) в бинарный файл'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'graphics',
+            help='Путь к файлу graphics.txt'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Путь к бинарному файлу (по умолчанию STROKE_DATA_PATH)'
+        )
+    
+    def handle(self, *args, **kwargs):
+        output = kwargs['output'] or default_stroke_data_path()
+        
+        try:
+            count = StrokeStore.build(read_graphics(kwargs['graphics']), output)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Не удалось импортировать данные о штрихах: {e}')
+        
+        self.stdout.write(f'Файл: {output}')
+        self.stdout.write(self.style.SUCCESS(f'Импортировано символов: {count}'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0003_examplesentence_topic_alter_wordtag_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Порядковый номер значения')),
+                ('text', models.CharField(max_length=255, verbose_name='Значение')),
+                ('normalized', models.CharField(help_text='Используется для проверки ответов', max_length=255, verbose_name='Нормализованное значение')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translations', to='dictionary.word', verbose_name='Слово')),
+            ],
+            options={
+                'verbose_name': 'Значение слова',
+                'verbose_name_plural': 'Значения слов',
+                'ordering': ['word', 'position'],
+                'indexes': [models.Index(fields=['normalized'], name='idx_translation_normalized')],
+                'constraints': [models.UniqueConstraint(fields=('word', 'position'), name='unique_word_translation_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_wordtranslation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentenceOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offset', models.PositiveSmallIntegerField(verbose_name='Позиция слова в предложении')),
+                ('length', models.PositiveSmallIntegerField(verbose_name='Длина вхождения')),
+                ('context_word_ids', models.JSONField(default=list, help_text='Для проверки, что пользователь сможет прочитать предложение', verbose_name='Остальные слова предложения')),
+                ('unknown_tokens', models.PositiveSmallIntegerField(default=0, verbose_name='Иероглифов вне словаря')),
+                ('sentence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='dictionary.examplesentence', verbose_name='Предложение')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sentence_occurrences', to='dictionary.word', verbose_name='Слово')),
+            ],
+            options={
+                'verbose_name': 'Вхождение слова в предложение',
+                'verbose_name_plural': 'Вхождения слов в предложения',
+                'constraints': [models.UniqueConstraint(fields=('word', 'sentence', 'offset'), name='unique_word_sentence_offset')],
+            },
+        ),
+    ]
@@ -161,6 +161,47 @@ class ExampleSentence(models.Model):
     def __str__(self):
         return f"{self.word.hanzi}: {self.chinese_sentence[:50]}..."
 
+class SentenceOccurrence(models.Model):
+    """
+    Вхождение слова в пример предложения (индекс для заданий на заполнение пропусков)
+    """
+    word = models.ForeignKey(
+        Word,
+        on_delete=models.CASCADE,
+        related_name='sentence_occurrences',
+        verbose_name='Слово'
+    )
+    sentence = models.ForeignKey(
+        ExampleSentence,
+        on_delete=models.CASCADE,
+        related_name='occurrences',
+        verbose_name='Предложение'
+    )
+    offset = models.PositiveSmallIntegerField(verbose_name='Позиция слова в предложении')
+    length = models.PositiveSmallIntegerField(verbose_name='Длина вхождения')
+    context_word_ids = models.JSONField(
+        default=list,
+        verbose_name='Остальные слова предложения',
+        help_text='Для проверки, что пользователь сможет прочитать предложение'
+    )
+    unknown_tokens = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Иероглифов вне словаря'
+    )
+    
+    class Meta:
+        verbose_name = 'Вхождение слова в предложение'
+        verbose_name_plural = 'Вхождения слов в предложения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['word', 'sentence', 'offset'],
+                name='unique_word_sentence_offset'
+            )
+        ]
+    
+    def __str__(self):
+        return f"{self.word_id} в предложении {self.sentence_id} (позиция {self.offset})"
+
 class PartOfSpeech(models.Model):
     name = models.CharField(max_length=32, unique=True, verbose_name='Название части слова')
 
@@ -233,4 +274,39 @@ class WordPartOfSpeech(models.Model):
         ]
 
     def __str__(self):
-        return f"Слово {self.word} является частью речи: {self.part_of_speech}"
\ No newline at end of file
+        return f"Слово {self.word} является частью речи: {self.part_of_speech}"
+
+class WordTranslation(models.Model):
+    word = models.ForeignKey(
+        Word,
+        on_delete=models.CASCADE,
+        related_name='translations',
+        verbose_name='Слово'
+    )
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Порядковый номер значения'
+    )
+    text = models.CharField(max_length=255, verbose_name='Значение')
+    normalized = models.CharField(
+        max_length=255,
+        verbose_name='Нормализованное значение',
+        help_text='Используется для проверки ответов'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['word', 'position'],
+                name='unique_word_translation_position'
+            )
+        ]
+        verbose_name = 'Значение слова'
+        verbose_name_plural = 'Значения слов'
+        ordering = ['word', 'position']
+        indexes = [
+            models.Index(fields=['normalized'], name='idx_translation_normalized'),
+        ]
+
+    def __str__(self):
+        return f"{self.word.hanzi}: {self.text}"
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, List, Tuple
+from django.core.cache import cache
+from .word_index import WordIndex
+
+_SYLLABLE_RE = re.compile(r'([a-zv]+)([1-5]?)')
+
+
+def normalize_pinyin(pinyin_numeric: str) -> Tuple[str, ...]:
+    """
+    Нормализовать пиньинь с цифрами тонов в кортеж слогов.
+    ü записывается как v, слог без тона получает нейтральный тон 5
+    """
+    text = pinyin_numeric.lower().replace('u:', 'v').replace('ü', 'v')
+    return tuple(f'{base}{tone or 5}' for base, tone in _SYLLABLE_RE.findall(text))
+
+
+def strip_tones(syllables: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Убрать тоны из слогов"""
+    return tuple(syllable.rstrip('12345') for syllable in syllables)
+
+
+class HomophoneIndex:
+    """
+    Индекс созвучных слов по нормализованному pinyin_numeric.
+    Строится за один проход по словарю и хранит только группы из двух и более слов:
+    - exact: полное совпадение звучания с тонами (омофоны)
+    - toneless: совпадение без учёта тонов
+    - near: многосложные слова, отличающиеся ровно одним слогом
+    """
+    CACHE_KEY = 'dictionary:pinyin_index:{version}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+    WILDCARD = '*'
+
+    _instance = None
+
+    def __init__(self, version, word_syllables, exact, toneless, near):
+        self.version = version
+        self.word_syllables = word_syllables
+        self.exact = exact
+        self.toneless = toneless
+        self.near = near
+
+    @classmethod
+    def build(cls, version=None) -> 'HomophoneIndex':
+        """Построить индекс за один проход по словарю и сохранить в кэш"""
+        from .models import Word
+
+        if version is None:
+            version = WordIndex.current_version()
+
+        word_syllables = {}
+        exact = {}
+        toneless = {}
+        near = {}
+
+        for word_id, pinyin in Word.objects.values_list('id', 'pinyin_numeric').iterator(chunk_size=5000):
+            syllables = normalize_pinyin(pinyin)
+            if not syllables:
+                continue
+
+            word_syllables[word_id] = syllables
+            exact.setdefault(' '.join(syllables), []).append(word_id)
+            toneless.setdefault(' '.join(strip_tones(syllables)), []).append(word_id)
+            for key in cls._near_keys(syllables):
+                near.setdefault(key, []).append(word_id)
+
+        index = cls(
+            version,
+            word_syllables,
+            cls._compact(exact),
+            cls._compact(toneless),
+            cls._compact(near),
+        )
+        # Ключ версии ограничен по времени: копии индекса устаревших версий не копятся в кэше
+        cache.set(cls.CACHE_KEY.format(version=version), index._dump(), timeout=cls.CACHE_TIMEOUT)
+        if cls._instance is not None and cls._instance.version != version:
+            cache.delete(cls.CACHE_KEY.format(version=cls._instance.version))
+        cls._instance = index
+        return index
+
+    @classmethod
+    def get(cls) -> 'HomophoneIndex':
+        """Получить актуальный индекс из памяти процесса, кэша или построить его"""
+        version = WordIndex.current_version()
+        if cls._instance is not None and cls._instance.version == version:
+            return cls._instance
+
+        data = cache.get(cls.CACHE_KEY.format(version=version))
+        if data is not None:
+            cls._instance = cls(version, *data)
+            return cls._instance
+
+        return cls.build(version)
+
+    def confusables(self, word_id) -> Dict[str, List[int]]:
+        """Созвучные слова для заданного слова"""
+        syllables = self.word_syllables.get(word_id)
+        if not syllables:
+            return {'homophones': [], 'tone_variants': [], 'near_homophones': []}
+
+        homophones = [
+            wid for wid in self.exact.get(' '.join(syllables), ()) if wid != word_id
+        ]
+        seen = set(homophones)
+        seen.add(word_id)
+
+        tone_variants = [
+            wid for wid in self.toneless.get(' '.join(strip_tones(syllables)), ())
+            if wid not in seen
+        ]
+        seen.update(tone_variants)
+
+        near_homophones = []
+        for key in self._near_keys(syllables):
+            for wid in self.near.get(key, ()):
+                if wid not in seen:
+                    near_homophones.append(wid)
+                    seen.add(wid)
+
+        return {
+            'homophones': homophones,
+            'tone_variants': tone_variants,
+            'near_homophones': near_homophones
+        }
+
+    @classmethod
+    def _near_keys(cls, syllables):
+        """Ключи с одним слогом, заменённым на шаблон (только для многосложных слов)"""
+        if len(syllables) < 2:
+            return []
+        return [
+            ' '.join(syllables[:i] + (cls.WILDCARD,) + syllables[i + 1:])
+            for i in range(len(syllables))
+        ]
+
+    @staticmethod
+    def _compact(groups):
+        return {key: tuple(ids) for key, ids in groups.items() if len(ids) > 1}
+
+    def _dump(self):
+        return (self.word_syllables, self.exact, self.toneless, self.near)
@@ -15,16 +15,28 @@ class TopicSerializer(serializers.ModelSerializer):
             'tags_count', 'words_count'
         ]
     
+    @staticmethod
+    def with_counts(queryset):
+        """Аннотировать темы количеством подтем и тегов, чтобы сериализация не делала запросов"""
+        from django.db.models import Count
+        return queryset.annotate(
+            subtopics_total=Count('subtopics', distinct=True),
+            tags_total=Count('tags', distinct=True)
+        )
+    
     def get_subtopics_count(self, obj):
+        if hasattr(obj, 'subtopics_total'):
+            return obj.subtopics_total
         return obj.subtopics.count()
     
     def get_tags_count(self, obj):
+        if hasattr(obj, 'tags_total'):
+            return obj.tags_total
         return obj.tags.count()
     
     def get_words_count(self, obj):
-        from django.db.models import Count
-        tag_ids = obj.tags.values_list('id', flat=True)
-        return WordTag.objects.filter(tag_id__in=tag_ids).values('word').distinct().count()
+        from .word_index import WordIndex
+        return len(WordIndex.get().get_word_ids(obj.id))
 
 class TagSerializer(serializers.ModelSerializer):
     topic_info = TopicSerializer(source='topic', read_only=True)
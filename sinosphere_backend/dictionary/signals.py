@@ -0,0 +1,77 @@
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Word, WordTag, Tag, WordTranslation, ExampleSentence, SentenceOccurrence
+from .utils import build_word_translations, build_sentence_occurrences
+from .word_index import WordIndex
+
+
+@receiver(post_save, sender=Word)
+def sync_word_translations(sender, instance, update_fields=None, **kwargs):
+    """Пересобрать значения слова при изменении перевода"""
+    if update_fields is not None and 'translation' not in update_fields:
+        return
+
+    # Индекс словаря сбрасывается один раз сигналом сохранения слова, а не на каждое значение
+    WordTranslation.objects.filter(word_id=instance.id).delete()
+    WordTranslation.objects.bulk_create(
+        build_word_translations(instance.id, instance.translation)
+    )
+
+
+def reindex_sentences(sentences):
+    """Пересобрать вхождения слов в предложения выборки"""
+    rows = list(sentences.values_list('id', 'chinese_sentence', 'word_id', 'word__hanzi'))
+    if not rows:
+        return
+
+    index = WordIndex.get()
+    SentenceOccurrence.objects.filter(sentence_id__in=[row[0] for row in rows]).delete()
+    occurrences = []
+    for sentence_id, text, word_id, hanzi in rows:
+        occurrences.extend(build_sentence_occurrences(sentence_id, text, index, word_id, hanzi))
+    SentenceOccurrence.objects.bulk_create(occurrences, batch_size=1000)
+
+
+@receiver(post_save, sender=ExampleSentence)
+def index_example_sentence(sender, instance, **kwargs):
+    """Пересобрать вхождения слов в изменённое предложение"""
+    reindex_sentences(ExampleSentence.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+@receiver(post_save, sender=WordTag)
+@receiver(post_delete, sender=WordTag)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=WordTranslation)
+@receiver(post_delete, sender=WordTranslation)
+def invalidate_word_index(sender, **kwargs):
+    """Сбросить индекс словаря при изменении слов и их тем"""
+    WordIndex.invalidate()
+
+
+@receiver(pre_save, sender=Word)
+def track_word_hanzi(sender, instance, update_fields=None, **kwargs):
+    """Запомнить, изменились ли иероглифы слова (для пересборки индекса предложений)"""
+    if update_fields is not None and 'hanzi' not in update_fields:
+        instance._hanzi_changed = False
+        return
+
+    previous = Word.objects.filter(id=instance.id).values_list('hanzi', flat=True).first()
+    instance._hanzi_changed = previous != instance.hanzi
+
+
+# Подключается после invalidate_word_index, чтобы разбиение шло по обновлённому индексу
+@receiver(post_save, sender=Word)
+def index_word_sentences(sender, instance, **kwargs):
+    """Пересобрать вхождения в предложения, где встречаются новые или прежние иероглифы слова"""
+    if not getattr(instance, '_hanzi_changed', True):
+        return
+
+    reindex_sentences(ExampleSentence.objects.filter(
+        Q(chinese_sentence__contains=instance.hanzi)
+        | Q(occurrences__word_id=instance.id)
+        | Q(word_id=instance.id)
+    ).distinct())
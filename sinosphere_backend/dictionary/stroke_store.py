@@ -0,0 +1,171 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+
+
+def default_stroke_data_path() -> str:
+    """Путь к бинарному файлу данных о штрихах (настройка STROKE_DATA_PATH)"""
+    return str(getattr(
+        settings, 'STROKE_DATA_PATH', os.path.join(settings.BASE_DIR, 'data', 'strokes.bin')
+    ))
+
+
+def read_graphics(path) -> Iterable[Tuple[str, List]]:
+    """Прочитать медианы штрихов из graphics.txt (формат makemeahanzi, JSON на строку)"""
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            character = record.get('character', '')
+            if len(character) != 1 or not record.get('medians'):
+                continue
+            yield character, record['medians']
+
+
+class StrokeStore:
+    """
+    Данные о порядке штрихов иероглифов в бинарном файле, отображённом в память.
+    Файл содержит отсортированные кодовые точки, смещения штрихов и точек
+    и медианы штрихов как int16 в сетке 1024×1024 makemeahanzi. Страницы
+    отображения общие для всех процессов сервера, поиск символа - бинарный
+    поиск по кодовым точкам без запросов к базе
+    """
+    MAGIC = b'SNSTRK01'
+    HEADER = struct.Struct('<8sIII')
+    HEADER_SIZE = 32
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.signature = (stat.st_ino, stat.st_mtime_ns)
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, strokes, points = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f'Неверный формат файла данных о штрихах: {path}')
+
+        offset = self.HEADER_SIZE
+        self.codepoints = np.frombuffer(self._map, dtype='<u4', count=count, offset=offset)
+        offset += self.codepoints.nbytes
+        self.char_offsets = np.frombuffer(self._map, dtype='<u4', count=count + 1, offset=offset)
+        offset += self.char_offsets.nbytes
+        self.stroke_offsets = np.frombuffer(self._map, dtype='<u4', count=strokes + 1, offset=offset)
+        offset += self.stroke_offsets.nbytes
+        self.points = np.frombuffer(
+            self._map, dtype='<i2', count=points * 2, offset=offset
+        ).reshape(points, 2)
+
+    def __len__(self):
+        return len(self.codepoints)
+
+    @classmethod
+    def get(cls) -> Optional['StrokeStore']:
+        """Хранилище процесса (None, если файл ещё не собран); переоткрывается после пересборки файла"""
+        path = default_stroke_data_path()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        instance = cls._instance
+        if (instance is None or instance.path != path
+                or instance.signature != (stat.st_ino, stat.st_mtime_ns)):
+            with cls._lock:
+                instance = cls._instance
+                if (instance is None or instance.path != path
+                        or instance.signature != (stat.st_ino, stat.st_mtime_ns)):
+                    instance = cls(path)
+                    cls._instance = instance
+        return instance
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, List]], path) -> int:
+        """
+        Записать медианы штрихов [(символ, [[[x, y], ...], ...]), ...] в файл.
+        Файл заменяется атомарно, уже открытые отображения продолжают читать старую версию.
+        Возвращает количество символов
+        """
+        characters = {}
+        for character, medians in records:
+            characters[ord(character)] = medians
+        codepoints = sorted(characters)
+
+        char_offsets = [0]
+        stroke_offsets = [0]
+        points = []
+        for codepoint in codepoints:
+            for median in characters[codepoint]:
+                points.extend(median)
+                stroke_offsets.append(len(points))
+            char_offsets.append(len(stroke_offsets) - 1)
+
+        points = np.clip(np.rint(np.array(points, dtype=np.float64).reshape(-1, 2)), -32768, 32767)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as file:
+            header = cls.HEADER.pack(cls.MAGIC, len(codepoints), len(stroke_offsets) - 1, len(points))
+            file.write(header.ljust(cls.HEADER_SIZE, b'\0'))
+            file.write(np.array(codepoints, dtype='<u4').tobytes())
+            file.write(np.array(char_offsets, dtype='<u4').tobytes())
+            file.write(np.array(stroke_offsets, dtype='<u4').tobytes())
+            file.write(points.astype('<i2').tobytes())
+        os.replace(temp_path, path)
+        return len(codepoints)
+
+    def get_character(self, character: str) -> Optional[Dict]:
+        """Медианы штрихов символа или None, если символа нет в данных"""
+        if len(character) != 1:
+            return None
+        codepoint = ord(character)
+        position = int(np.searchsorted(self.codepoints, codepoint))
+        if position >= len(self.codepoints) or self.codepoints[position] != codepoint:
+            return None
+
+        first, last = int(self.char_offsets[position]), int(self.char_offsets[position + 1])
+        bounds = self.stroke_offsets[first:last + 1].tolist()
+        block = self.points[bounds[0]:bounds[-1]].tolist()
+        start = bounds[0]
+        medians = [block[begin - start:end - start] for begin, end in zip(bounds, bounds[1:])]
+        return {
+            'character': character,
+            'stroke_count': len(medians),
+            'medians': medians
+        }
+
+    @classmethod
+    def get_word(cls, hanzi: str) -> Dict:
+        """
+        Данные о штрихах слова: общее число штрихов, медианы по символам
+        и число штрихов каждого символа. Для символов без данных медианы пустые
+        """
+        store = cls.get()
+        medians = []
+        characters = []
+        for character in hanzi:
+            data = store.get_character(character) if store is not None else None
+            medians.append(data['medians'] if data else [])
+            characters.append({
+                'character': character,
+                'stroke_count': data['stroke_count'] if data else 0
+            })
+
+        stroke_count = sum(data['stroke_count'] for data in characters)
+        return {
+            'character': hanzi,
+            'stroke_count': stroke_count or len(hanzi),
+            'medians': medians,
+            'characters': characters
+        }
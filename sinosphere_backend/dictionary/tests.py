@@ -1,3 +1,137 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .answer_matcher import AnswerMatcher
+from .models import Word
+from .pinyin_index import HomophoneIndex
+from .stroke_store import StrokeStore
+from .word_index import WordIndex
 
-# Create your tests here.
+
+class HomophoneIndexCacheTest(TestCase):
+    """Индекс созвучных слов хранится в кэше только для текущей версии словаря"""
+
+    def setUp(self):
+        cache.clear()
+        HomophoneIndex._instance = None
+        Word.objects.create(hanzi='是', pinyin_numeric='shi4', pinyin_graphic='shì', translation='быть')
+        Word.objects.create(hanzi='事', pinyin_numeric='shi4', pinyin_graphic='shì', translation='дело')
+
+    def test_previous_version_dropped(self):
+        old_version = HomophoneIndex.get().version
+
+        WordIndex.invalidate()
+        index = HomophoneIndex.get()
+
+        self.assertNotEqual(index.version, old_version)
+        self.assertIsNone(cache.get(HomophoneIndex.CACHE_KEY.format(version=old_version)))
+        self.assertIsNotNone(cache.get(HomophoneIndex.CACHE_KEY.format(version=index.version)))
+
+
+class AnswerMatcherTest(TestCase):
+    """Опечатки засчитываются, только если ответ не является другим словом"""
+
+    def setUp(self):
+        cache.clear()
+        AnswerMatcher._cache_version = None
+        AnswerMatcher._glosses_version = None
+        self.table = Word.objects.create(hanzi='桌子', pinyin_graphic='zhuōzi', translation='стол')
+        Word.objects.create(hanzi='椅子', pinyin_graphic='yǐzi', translation='стул')
+        self.matcher = AnswerMatcher.for_word(self.table.id)
+
+    def test_exact_answer(self):
+        self.assertEqual(self.matcher.match('Стол'), ('стол', 0))
+
+    def test_typo_accepted(self):
+        self.assertEqual(self.matcher.match('стал'), ('стол', 1))
+
+    def test_other_word_gloss_rejected(self):
+        self.assertIsNone(self.matcher.match('стул'))
+
+
+class StrokeStoreTest(TestCase):
+    """Данные о штрихах читаются из бинарного файла, отображённого в память"""
+    RECORDS = [
+        {'character': '人', 'medians': [[[100, 200], [300.4, 400]], [[500, 600], [700, 800], [900, 1000]]]},
+        {'character': '一', 'medians': [[[10, 20], [30, 40]]]},
+        {'character': '人', 'medians': [[[1, 1], [2, 2]]]},
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'strokes.bin')
+        settings_override = override_settings(STROKE_DATA_PATH=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(setattr, StrokeStore, '_instance', None)
+
+        self.graphics = os.path.join(directory.name, 'graphics.txt')
+        self._write_graphics(self.RECORDS)
+        self.client = APIClient()
+
+    def _write_graphics(self, records):
+        with open(self.graphics, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _import(self):
+        output = StringIO()
+        call_command('import_stroke_data', self.graphics, stdout=output)
+        return output.getvalue()
+
+    def test_round_trip(self):
+        self.assertIn('Импортировано символов: 2', self._import())
+
+        store = StrokeStore.get()
+        self.assertEqual(len(store), 2)
+        # Повторная запись символа заменяет предыдущую
+        self.assertEqual(store.get_character('人'), {
+            'character': '人', 'stroke_count': 1, 'medians': [[[1, 1], [2, 2]]]
+        })
+        self.assertIsNone(store.get_character('大'))
+
+        self.assertEqual(StrokeStore.get_word('一大'), {
+            'character': '一大',
+            'stroke_count': 1,
+            'medians': [[[[10, 20], [30, 40]]], []],
+            'characters': [{'character': '一', 'stroke_count': 1}, {'character': '大', 'stroke_count': 0}]
+        })
+
+    def test_reopened_after_rebuild(self):
+        self._import()
+        store = StrokeStore.get()
+
+        self._write_graphics(self.RECORDS[:1])
+        self._import()
+
+        reopened = StrokeStore.get()
+        self.assertIsNot(reopened, store)
+        # Координаты хранятся целыми числами
+        self.assertEqual(
+            reopened.get_character('人')['medians'],
+            [[[100, 200], [300, 400]], [[500, 600], [700, 800], [900, 1000]]]
+        )
+        self.assertIsNone(reopened.get_character('一'))
+
+    def test_view(self):
+        self.assertEqual(self.client.get(reverse('stroke-data', args=['人'])).status_code, 404)
+        self._import()
+
+        response = self.client.get(reverse('stroke-data', args=['人']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stroke_count'], 1)
+        self.assertIn('max-age=2592000', response['Cache-Control'])
+
+        # Ответ для отсутствующего символа не кэшируется клиентами
+        response = self.client.get(reverse('stroke-data', args=['大']))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+        self.assertEqual(self.client.get(reverse('stroke-data', args=['一人'])).status_code, 400)
@@ -31,6 +31,12 @@ urlpatterns = [
     path('parts-of-speech/', views.PartOfSpeechListView.as_view(), name='part-of-speech-list'),
     path('parts-of-speech/<str:name>/', views.PartOfSpeechDetailView.as_view(), name='part-of-speech-detail'),
     
+    # Созвучные слова
+    path('words/<int:word_id>/confusables/', views.WordConfusablesView.as_view(), name='word-confusables'),
+    
+    # Порядок штрихов иероглифа
+    path('strokes/<str:character>/', views.StrokeDataView.as_view(), name='stroke-data'),
+    
     # Тэги конкретного слова
     path('words/<int:word_id>/tags/', views.WordTagsView.as_view(), name='word-tags'),
     path('words/<int:word_id>/tags/<str:tag_name>/', views.WordTagDetailByWordView.as_view(), name='word-tag-detail'),
@@ -0,0 +1,94 @@
+import re
+from django.db import connections
+
+_PARENTHESES_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_NON_WORD_RE = re.compile(r'[^\w\s-]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def split_translation(translation_text: str):
+    """Разбить строку перевода на отдельные значения"""
+    return [t.strip() for t in translation_text.split(';') if t.strip()]
+
+
+def normalize_gloss(gloss: str) -> str:
+    """Нормализовать значение перевода для сравнения"""
+    gloss = gloss.lower().replace('ё', 'е')
+    gloss = _PARENTHESES_RE.sub(' ', gloss)
+    gloss = _NON_WORD_RE.sub(' ', gloss)
+    return _SPACES_RE.sub(' ', gloss).strip()
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    bulk_create с обновлением строк при конфликте уникального ключа.
+    MySQL (ON DUPLICATE KEY UPDATE) не принимает список полей конфликта,
+    там конфликт определяется уникальными ключами таблицы
+    """
+    options = {'update_conflicts': True, 'update_fields': update_fields, 'batch_size': batch_size}
+    if connections[model.objects.db].features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+    return model.objects.bulk_create(objs, **options)
+
+
+def build_word_translations(word_id, translation_text: str):
+    """Подготовить строки WordTranslation для слова (без сохранения)"""
+    from .models import WordTranslation
+
+    return [
+        WordTranslation(
+            word_id=word_id,
+            position=position,
+            text=gloss[:255],
+            normalized=normalize_gloss(gloss)[:255]
+        )
+        for position, gloss in enumerate(split_translation(translation_text))
+    ]
+
+
+def build_sentence_occurrences(sentence_id, text: str, index, word_id=None, hanzi=''):
+    """
+    Подготовить строки SentenceOccurrence для предложения (без сохранения).
+    Предложение разбивается на слова по индексу словаря; для каждого вхождения
+    сохраняются позиция и остальные слова предложения. Слово, к которому привязан
+    пример (word_id, hanzi), учитывается, даже если разбиение его не выделило
+    """
+    from .models import SentenceOccurrence
+    from .word_index import is_hanzi
+
+    spans = []
+    unknown_tokens = 0
+    position = 0
+    for fragment, word_ids in index.segment(text):
+        if word_ids:
+            spans.append((position, len(fragment), word_ids))
+        elif is_hanzi(fragment[0]):
+            unknown_tokens += 1
+        position += len(fragment)
+
+    if word_id and hanzi and not any(word_id in word_ids for _, _, word_ids in spans):
+        offset = text.find(hanzi)
+        if offset >= 0:
+            # Слова, попавшие внутрь вхождения, в контекст не входят
+            spans = [
+                span for span in spans
+                if span[0] + span[1] <= offset or span[0] >= offset + len(hanzi)
+            ]
+            spans.append((offset, len(hanzi), (word_id,)))
+
+    occurrences = []
+    for offset, length, word_ids in spans:
+        context = [
+            other_ids[0] for other_offset, _, other_ids in spans
+            if other_offset != offset
+        ]
+        for occurrence_word_id in word_ids:
+            occurrences.append(SentenceOccurrence(
+                word_id=occurrence_word_id,
+                sentence_id=sentence_id,
+                offset=offset,
+                length=length,
+                context_word_ids=context,
+                unknown_tokens=unknown_tokens
+            ))
+    return occurrences
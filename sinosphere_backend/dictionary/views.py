@@ -3,7 +3,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
 from .models import Word, WordComposition, Tag, PartOfSpeech, WordTag, WordPartOfSpeech, Topic, ExampleSentence
+from .pinyin_index import HomophoneIndex
+from .stroke_store import StrokeStore
 from .serializers import (
     WordSerializer, WordCompositionSerializer, TagSerializer, 
     PartOfSpeechSerializer, WordTagSerializer, WordPartOfSpeechSerializer,
@@ -467,6 +470,69 @@ class WordByDifficultyView(APIView):
         serializer = WordSerializer(words, many=True)
         return Response(serializer.data)
     
+class WordConfusablesView(APIView):
+    """
+    API для получения созвучных слов (омофоны, отличие в тоне или в одном слоге)
+    """
+    def get(self, request, word_id):
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        
+        groups = HomophoneIndex.get().confusables(word_id)
+        groups = {name: ids[:limit] for name, ids in groups.items()}
+        
+        word_ids = {word_id}
+        for ids in groups.values():
+            word_ids.update(ids)
+        
+        words = {
+            word['id']: word
+            for word in Word.objects.filter(id__in=word_ids).values(
+                'id', 'hanzi', 'pinyin_numeric', 'pinyin_graphic', 'translation', 'difficulty'
+            )
+        }
+        
+        if word_id not in words:
+            return Response(
+                {'error': 'Слово не найдено'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        result = {'word': words[word_id]}
+        for name, ids in groups.items():
+            result[name] = [words[wid] for wid in ids if wid in words]
+        
+        return Response(result)
+    
+class StrokeDataView(APIView):
+    """
+    API для получения данных о порядке штрихов иероглифа.
+    Данные меняются только при импорте, поэтому ответ кэшируется клиентами надолго
+    """
+    CACHE_MAX_AGE = 60 * 60 * 24 * 30
+    
+    def get(self, request, character):
+        if len(character) != 1:
+            return Response(
+                {'error': 'Укажите один иероглиф'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        store = StrokeStore.get()
+        data = store.get_character(character) if store is not None else None
+        if data is None:
+            return Response(
+                {'error': 'Данные о штрихах не найдены'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Кэшируются только найденные данные: ошибки не должны оседать у клиентов
+        response = Response(data)
+        patch_cache_control(response, public=True, max_age=self.CACHE_MAX_AGE)
+        return response
+    
 class WordTagsView(APIView):
     """
     API для получения всех тэгов конкретного слова
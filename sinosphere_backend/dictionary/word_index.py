@@ -0,0 +1,200 @@
+import time
+import numpy as np
+from django.core.cache import cache
+
+
+def is_hanzi(char: str) -> bool:
+    """Проверить, является ли символ китайским иероглифом"""
+    code = ord(char)
+    return (
+        0x4E00 <= code <= 0x9FFF or
+        0x3400 <= code <= 0x4DBF or
+        0x20000 <= code <= 0x2FA1F or
+        0xF900 <= code <= 0xFAFF
+    )
+
+
+def ids_to_bits(ids) -> int:
+    """Упаковать id слов в битовое множество"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for word_id in ids:
+        buffer[word_id >> 3] |= 1 << (word_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bits_to_ids(bits: int):
+    """Распаковать битовое множество в отсортированный список id"""
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index << 3
+        for bit in range(8):
+            if byte & (1 << bit):
+                ids.append(base + bit)
+    return ids
+
+
+class WordIndex:
+    """
+    Снимок словаря в памяти процесса.
+    Строится двумя запросами и пересобирается, когда в кэше меняется версия словаря
+    """
+    VERSION_CACHE_KEY = 'dictionary:word_index:version'
+    MAX_WORD_LENGTH = 8
+
+    _instance = None
+
+    def __init__(self, version):
+        from .models import Word, WordTag
+
+        self.version = version
+        self.hanzi_to_ids = {}
+        self.max_word_length = 1
+        difficulty_ids = {}
+        topic_ids = {}
+
+        words = Word.objects.values_list('id', 'hanzi', 'difficulty').order_by('id')
+        for word_id, hanzi, difficulty in words:
+            difficulty_ids.setdefault(difficulty, []).append(word_id)
+            if not hanzi:
+                continue
+            self.hanzi_to_ids.setdefault(hanzi, []).append(word_id)
+            if len(hanzi) > self.max_word_length:
+                self.max_word_length = len(hanzi)
+
+        self.hanzi_to_ids = {
+            hanzi: tuple(ids) for hanzi, ids in self.hanzi_to_ids.items()
+        }
+        self.max_word_length = min(self.max_word_length, self.MAX_WORD_LENGTH)
+
+        memberships = WordTag.objects.filter(
+            tag__topic__isnull=False
+        ).values_list('tag__topic_id', 'word_id').distinct()
+        for topic_id, word_id in memberships:
+            topic_ids.setdefault(topic_id, []).append(word_id)
+
+        self.word_ids = np.array(
+            sorted(word_id for ids in difficulty_ids.values() for word_id in ids),
+            dtype=np.int64
+        )
+        self.topic_word_ids = {
+            topic_id: np.array(sorted(set(ids)), dtype=np.int64)
+            for topic_id, ids in topic_ids.items()
+        }
+        self.word_topic_ids = {}
+        for topic_id, ids in topic_ids.items():
+            for word_id in ids:
+                self.word_topic_ids.setdefault(word_id, []).append(topic_id)
+        self.word_topic_ids = {
+            word_id: tuple(sorted(set(topics))) for word_id, topics in self.word_topic_ids.items()
+        }
+        self.difficulty_word_ids = {
+            difficulty: np.array(ids, dtype=np.int64)
+            for difficulty, ids in difficulty_ids.items()
+        }
+        self._combined_word_ids = {}
+        self.difficulty_bits = {
+            difficulty: ids_to_bits(ids) for difficulty, ids in difficulty_ids.items()
+        }
+        self.topic_bits = {
+            topic_id: ids_to_bits(ids) for topic_id, ids in topic_ids.items()
+        }
+
+    @classmethod
+    def current_version(cls) -> int:
+        """
+        Текущая версия словаря.
+        Если ключ версии пропал из кэша, отсчёт начинается с текущего времени,
+        чтобы версия не совпала с прежней и индексы в памяти процессов не считались актуальными
+        """
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(cls.VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+            version = cache.get(cls.VERSION_CACHE_KEY)
+        return version
+
+    @classmethod
+    def get(cls) -> 'WordIndex':
+        """Получить актуальный индекс словаря"""
+        version = cls.current_version()
+
+        if cls._instance is None or cls._instance.version != version:
+            cls._instance = cls(version)
+        return cls._instance
+
+    @classmethod
+    def invalidate(cls):
+        """Пометить индекс устаревшим во всех процессах"""
+        try:
+            cache.incr(cls.VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        cls._instance = None
+
+    def segment(self, text: str):
+        """
+        Разбить текст на слова методом прямого максимального соответствия.
+        Возвращает список кортежей (фрагмент, id слов в словаре)
+        """
+        tokens = []
+        position = 0
+        length = len(text)
+
+        while position < length:
+            if not is_hanzi(text[position]):
+                end = position + 1
+                while end < length and not is_hanzi(text[end]):
+                    end += 1
+                tokens.append((text[position:end], ()))
+                position = end
+                continue
+
+            for size in range(min(self.max_word_length, length - position), 0, -1):
+                fragment = text[position:position + size]
+                word_ids = self.hanzi_to_ids.get(fragment)
+                if word_ids:
+                    tokens.append((fragment, word_ids))
+                    position += size
+                    break
+            else:
+                tokens.append((text[position], ()))
+                position += 1
+
+        return tokens
+
+    def get_topic_bits(self, topic_id) -> int:
+        """Битовое множество слов темы"""
+        return self.topic_bits.get(int(topic_id), 0)
+
+    def get_difficulty_bits(self, difficulty) -> int:
+        """Битовое множество слов уровня HSK"""
+        return self.difficulty_bits.get(int(difficulty), 0)
+
+    def get_word_topics(self, word_id) -> tuple:
+        """Темы, в которые входит слово"""
+        return self.word_topic_ids.get(int(word_id), ())
+
+    def get_word_ids(self, topic_id=None, difficulty=None) -> np.ndarray:
+        """Плотный отсортированный массив id слов темы и/или уровня HSK"""
+        if topic_id is None and difficulty is None:
+            return self.word_ids
+
+        empty = np.empty(0, dtype=np.int64)
+        if difficulty is None:
+            return self.topic_word_ids.get(int(topic_id), empty)
+        if topic_id is None:
+            return self.difficulty_word_ids.get(int(difficulty), empty)
+
+        key = (int(topic_id), int(difficulty))
+        if key not in self._combined_word_ids:
+            self._combined_word_ids[key] = np.intersect1d(
+                self.topic_word_ids.get(key[0], empty),
+                self.difficulty_word_ids.get(key[1], empty),
+                assume_unique=True
+            )
+        return self._combined_word_ids[key]
@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'LEARNING_BACKGROUND_WORKERS', 2),
+                thread_name_prefix='learning-background'
+            )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        print(f"Error in background task {getattr(func, '__name__', func)}: {e}")
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Выполнить функцию в фоновом потоке процесса.
+    При LEARNING_BACKGROUND_SYNC = True функция выполняется сразу (для тестов и отладки)
+    """
+    if getattr(settings, 'LEARNING_BACKGROUND_SYNC', False):
+        func(*args, **kwargs)
+        return
+
+    _get_executor().submit(_run, func, args, kwargs)
+
+
+def run_after_commit(func, *args, **kwargs):
+    """
+    Выполнить функцию в фоне после фиксации текущей транзакции.
+    Вне транзакции задача ставится в очередь сразу
+    """
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
@@ -1,9 +1,22 @@
+from typing import Dict, List
+import numpy as np
+from django.core.cache import cache
 from users.models import UserWord
 
 class DifficultyEstimator:
     """
-    Оценщик сложности упражнений на основе истории пользователя
+    Оценщик сложности упражнений на основе истории пользователя.
+    Оценки по истории слов считаются пакетно и кэшируются для пользователя
+    до следующего повторения
     """
+    CACHE_KEY = 'learning:word_difficulty:{user_id}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+    
+    TYPE_OFFSETS = {
+        'translation_cn': 2,
+        'writing': 3,
+    }
+    DEFAULT_PARAMETERS = {'time_limit': 30}
     
     @staticmethod
     def estimate_word_difficulty_for_user(user, word, exercise_type=None):
@@ -11,40 +24,89 @@ class DifficultyEstimator:
         Оценить сложность слова для конкретного пользователя
         Возвращает оценку от 1 (легко) до 10 (очень сложно)
         """
-        try:
-            user_word = UserWord.objects.get(user=user, word=word)
-            time_score = min(user_word.avg_response_time / 10, 1.0) * 4
-            
-            if user_word.total_attempts > 0:
-                accuracy = user_word.correct_attempts / user_word.total_attempts
-                accuracy_score = (1 - accuracy) * 4
-            else:
-                accuracy_score = 4
-            
-            stability_score = max(0, (365 - user_word.stability) / 365) * 2
-            total_difficulty = time_score + accuracy_score + stability_score
-            
-            return min(10, max(1, total_difficulty))
-            
-        except UserWord.DoesNotExist:
-            base_difficulty = word.difficulty
-            
-            if exercise_type == 'translation_cn':
-                base_difficulty += 2
-            elif exercise_type == 'writing':
-                base_difficulty += 3
-            
-            return min(10, base_difficulty)
+        return float(DifficultyEstimator.estimate_many(
+            user, [word.id], [word.difficulty], [exercise_type]
+        )[0])
     
     @staticmethod
     def adjust_exercise_parameters(user, word, exercise_type, base_parameters):
         """
         Настроить параметры упражнения на основе истории пользователя
         """
-        difficulty = DifficultyEstimator.estimate_word_difficulty_for_user(
-            user, word, exercise_type
+        return DifficultyEstimator.adjust_many(
+            user, [word.id], [word.difficulty], [exercise_type], base_parameters
+        )[0]
+    
+    @classmethod
+    def estimate_many(cls, user, word_ids, base_difficulties, exercise_types=None) -> np.ndarray:
+        """
+        Оценить сложность пакета слов (1-10) одним запросом к UserWord.
+        Для слов из словаря пользователя оценка строится по истории ответов,
+        для остальных - по уровню HSK слова и типу задания
+        """
+        word_ids = [int(word_id) for word_id in word_ids]
+        history = cls._get_history_scores(user, word_ids)
+        
+        if exercise_types is None:
+            exercise_types = [None] * len(word_ids)
+        base = np.asarray(base_difficulties, dtype=np.float64) + np.array(
+            [cls.TYPE_OFFSETS.get(exercise_type, 0) for exercise_type in exercise_types],
+            dtype=np.float64
         )
         
+        return np.where(np.isnan(history), np.minimum(base, 10), history)
+    
+    @classmethod
+    def adjust_many(cls, user, word_ids, base_difficulties, exercise_types, base_parameters=None) -> List[Dict]:
+        """Параметры упражнений пакета по оценкам сложности"""
+        difficulties = cls.estimate_many(user, word_ids, base_difficulties, exercise_types)
+        base_parameters = base_parameters or cls.DEFAULT_PARAMETERS
+        
+        return [
+            cls._adjust(float(difficulty), exercise_type, base_parameters)
+            for difficulty, exercise_type in zip(difficulties, exercise_types)
+        ]
+    
+    @classmethod
+    def invalidate(cls, user):
+        """Сбросить оценки пользователя (после повторения слов)"""
+        cache.delete(cls.CACHE_KEY.format(user_id=getattr(user, 'id', user)))
+    
+    @classmethod
+    def _get_history_scores(cls, user, word_ids: List[int]) -> np.ndarray:
+        """Оценки по истории ответов (NaN для слов не из словаря пользователя)"""
+        user_id = getattr(user, 'id', user)
+        cache_key = cls.CACHE_KEY.format(user_id=user_id)
+        scores = cache.get(cache_key) or {}
+        
+        missing = list({word_id for word_id in word_ids if word_id not in scores})
+        if missing:
+            rows = list(UserWord.objects.filter(
+                user_id=user_id,
+                word_id__in=missing
+            ).values_list(
+                'word_id', 'avg_response_time', 'total_attempts', 'correct_attempts', 'stability'
+            ))
+            scores.update({word_id: None for word_id in missing})
+            if rows:
+                ids, response_time, attempts, correct, stability = (
+                    np.array(column, dtype=np.float64) for column in zip(*rows)
+                )
+                time_score = np.minimum(response_time / 10, 1.0) * 4
+                accuracy = np.divide(correct, attempts, out=np.zeros_like(correct), where=attempts > 0)
+                accuracy_score = np.where(attempts > 0, (1 - accuracy) * 4, 4)
+                stability_score = np.maximum(0, (365 - stability) / 365) * 2
+                total = np.clip(time_score + accuracy_score + stability_score, 1, 10)
+                scores.update(zip(ids.astype(np.int64).tolist(), total.tolist()))
+            cache.set(cache_key, scores, timeout=cls.CACHE_TIMEOUT)
+        
+        return np.array(
+            [np.nan if scores[word_id] is None else scores[word_id] for word_id in word_ids],
+            dtype=np.float64
+        )
+    
+    @staticmethod
+    def _adjust(difficulty, exercise_type, base_parameters):
         adjusted_params = base_parameters.copy()
         
         if 'time_limit' in adjusted_params:
@@ -71,4 +133,4 @@ class DifficultyEstimator:
                 adjusted_params['show_pinyin'] = False
                 adjusted_params['show_character'] = False
         
-        return adjusted_params
\ No newline at end of file
+        return adjusted_params
@@ -0,0 +1,137 @@
+import zlib
+import numpy as np
+from django.db import transaction
+from dictionary.models import Word, WordTag, WordPartOfSpeech
+from dictionary.utils import split_translation, normalize_gloss
+from .models import WordDistractor
+
+
+class DistractorPoolBuilder:
+    """
+    Пакетное построение пулов отвлекающих вариантов.
+    Кандидаты берутся из слов соседних уровней HSK (DIFFICULTY_BAND) и ранжируются
+    по близости уровня, общим частям речи и темам, а также по сходству переводов
+    (косинус векторов символьных триграмм).
+    Словарь обрабатывается блоками строк: на блок создаётся несколько матриц
+    размером block × N, поэтому размер блока выбирается так, чтобы в матрице
+    было не больше BLOCK_ELEMENTS элементов (около 16 МБ на матрицу float32)
+    """
+    POOL_SIZE = 20
+    BLOCK_ELEMENTS = 4_000_000
+    GLOSS_DIMENSIONS = 512
+    DIFFICULTY_BAND = 1
+    SYNONYM_SIMILARITY = 0.8
+
+    DIFFICULTY_WEIGHT = 1.0
+    PART_OF_SPEECH_WEIGHT = 1.0
+    TOPIC_WEIGHT = 1.5
+    GLOSS_WEIGHT = 2.0
+
+    def __init__(self, pool_size=None, block_size=None):
+        self.pool_size = pool_size or self.POOL_SIZE
+        self.block_size = block_size
+
+    def build(self) -> int:
+        """Пересчитать пулы для всего словаря, возвращает количество записей"""
+        words = list(
+            Word.objects.values_list('id', 'hanzi', 'translation', 'difficulty').order_by('id')
+        )
+        if len(words) < 2:
+            return 0
+
+        word_ids = np.array([w[0] for w in words], dtype=np.int64)
+        index = {word_id: i for i, word_id in enumerate(word_ids.tolist())}
+
+        difficulty = np.array([w[3] for w in words], dtype=np.float32)
+        _, hanzi_codes = np.unique(np.array([w[1] for w in words]), return_inverse=True)
+        glosses = self._gloss_matrix([w[2] for w in words])
+        has_gloss = glosses.any(axis=1)
+
+        parts_of_speech = self._membership_matrix(
+            WordPartOfSpeech.objects.values_list('word_id', 'part_of_speech_id'),
+            index
+        )
+        topics = self._membership_matrix(
+            WordTag.objects.filter(tag__topic__isnull=False).values_list('word_id', 'tag__topic_id'),
+            index
+        )
+
+        pool_size = min(self.pool_size, len(words) - 1)
+        block_size = self.block_size or max(1, self.BLOCK_ELEMENTS // len(words))
+        positions = np.arange(len(words))
+        distractors = []
+
+        for start in range(0, len(words), block_size):
+            stop = min(start + block_size, len(words))
+
+            similarity = glosses[start:stop] @ glosses.T
+            scores = self.GLOSS_WEIGHT * similarity
+            scores += self.DIFFICULTY_WEIGHT * np.exp(
+                -np.abs(difficulty[start:stop, None] - difficulty[None, :])
+            )
+            if parts_of_speech.shape[1]:
+                scores += self.PART_OF_SPEECH_WEIGHT * (parts_of_speech[start:stop] @ parts_of_speech.T > 0)
+            if topics.shape[1]:
+                scores += self.TOPIC_WEIGHT * (topics[start:stop] @ topics.T > 0)
+
+            invalid = (
+                (positions[start:stop, None] == positions[None, :]) |
+                (similarity >= self.SYNONYM_SIMILARITY) |
+                (hanzi_codes[start:stop, None] == hanzi_codes[None, :]) |
+                (np.abs(difficulty[start:stop, None] - difficulty[None, :]) > self.DIFFICULTY_BAND) |
+                ~has_gloss[None, :]
+            )
+            scores[invalid] = -np.inf
+
+            candidates = np.argpartition(-scores, pool_size - 1, axis=1)[:, :pool_size]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1)
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+            block_ids = word_ids[start:stop].tolist()
+            distractor_ids = word_ids[candidates].tolist()
+            candidate_scores = candidate_scores.tolist()
+
+            for word_id, row_ids, row_scores in zip(block_ids, distractor_ids, candidate_scores):
+                for rank, (distractor_id, score) in enumerate(zip(row_ids, row_scores)):
+                    if score == -np.inf:
+                        break
+                    distractors.append(WordDistractor(
+                        word_id=word_id,
+                        distractor_id=distractor_id,
+                        rank=rank,
+                        score=score
+                    ))
+
+        with transaction.atomic():
+            WordDistractor.objects.all().delete()
+            WordDistractor.objects.bulk_create(distractors, batch_size=5000)
+
+        return len(distractors)
+
+    def _gloss_matrix(self, translations):
+        """Нормированные векторы хешированных символьных триграмм переводов"""
+        matrix = np.zeros((len(translations), self.GLOSS_DIMENSIONS), dtype=np.float32)
+
+        for row, translation in enumerate(translations):
+            for gloss in split_translation(translation):
+                text = f' {normalize_gloss(gloss)} '
+                for i in range(len(text) - 2):
+                    column = zlib.crc32(text[i:i + 3].encode('utf-8')) % self.GLOSS_DIMENSIONS
+                    matrix[row, column] += 1.0
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    @staticmethod
+    def _membership_matrix(pairs, index):
+        """Матрица принадлежности слов категориям (части речи, темы)"""
+        pairs = [(index[word_id], category) for word_id, category in pairs if word_id in index]
+        categories = {category: i for i, category in enumerate(sorted({c for _, c in pairs}))}
+
+        matrix = np.zeros((len(index), len(categories)), dtype=np.float32)
+        for row, category in pairs:
+            matrix[row, categories[category]] = 1.0
+        return matrix
@@ -1,20 +1,37 @@
 import random
-from django.db.models import Count
 from typing import List, Dict
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from dictionary.models import Word
-from users.models import UserWord, UserTopicProgress
+from dictionary.models import Word, SentenceOccurrence
+from dictionary.answer_matcher import AnswerMatcher
+from dictionary.stroke_store import StrokeStore
+from dictionary.word_index import WordIndex, bits_to_ids
+from users.models import UserWord, UserTopicProgress, UserExerciseTypeStats
+from users.word_bitset import KnownWordSet
+from .models import WordDistractor, ExerciseTemplate
 from .fsrs_optimizer import FSRSOptimizer
+from .word_sampler import WordSampler
 
 class ExerciseGenerator:
     """
     Генератор заданий для обучения
     """
+    DISTRACTOR_CANDIDATES = 10
+    # Доля остальных слов предложения, которые должны быть в словаре пользователя
+    FILL_GAP_MIN_COVERAGE = 0.75
+    FILL_GAP_CANDIDATES = 20
+    REVIEW_WORDS = 10
+    # Доля новых слов различает число просроченных карточек только до 20,
+    # поэтому оно берётся из выборки очереди повторений без отдельного COUNT
+    PENDING_REVIEWS_LIMIT = 21
     
     def __init__(self, user, topic_id=None):
         self.user = user
         self.topic_id = topic_id
         self.fsrs = FSRSOptimizer()
+        self.templates = {}
+        self.sentences = {}
         
     def get_next_exercise(self, exercise_type=None):
         """Получить следующее задание для пользователя"""
@@ -26,35 +43,37 @@ class ExerciseGenerator:
         if not words:
             return None
         
+        self._load_templates(word.id for word in words)
+        if exercise_type == 'fill_gap':
+            self._load_sentences([words[0].id])
         exercise = self._generate_exercise(exercise_type, words)
         return exercise
     
     def _select_exercise_type(self) -> str:
-        """Выбрать тип задания на основе истории пользователя"""
-        from users.models import UserExerciseHistory
+        """Выбрать тип задания на основе счётчиков типов пользователя"""
+        type_counts = UserExerciseTypeStats.get_type_counts(self.user)
         
-        history = UserExerciseHistory.objects.filter(user=self.user)
-        
-        if not history.exists():
+        if not type_counts:
             return random.choice(['translation_ru', 'multiple_choice'])
         
-        type_counts = history.values('exercise_type').annotate(count=Count('id'))
-        least_used = min(type_counts, key=lambda x: x['count'])['exercise_type']
+        # Реже всего среди последних заданий, при равенстве - за всё время
+        least_used = min(type_counts, key=type_counts.get)
         
         if random.random() < 0.7:
             return least_used
         else:
             return random.choice([
                 'translation_ru', 'translation_cn', 'matching',
-                'multiple_choice', 'writing'
+                'multiple_choice', 'writing', 'fill_gap'
             ])
     
     def _select_words_for_exercise(self, exercise_type: str) -> List[Word]:
         """Выбрать слова для задания"""
         words = []
         
-        review_words = self._get_words_for_review()
-        new_word_ratio = self._calculate_new_word_ratio()
+        review_queue = self._get_review_queue(self.PENDING_REVIEWS_LIMIT)
+        review_words = [uw.word for uw in review_queue[:self.REVIEW_WORDS]]
+        new_word_ratio = self._calculate_new_word_ratio(len(review_queue))
         
         if review_words:
             words.extend(random.sample(
@@ -67,14 +86,15 @@ class ExerciseGenerator:
             if new_words:
                 words.append(random.choice(new_words))
         
-        if exercise_type == 'matching' and len(words) < 4:
-            additional_words = self._get_additional_words(len(words))
-            words.extend(additional_words)
-        
         return words
     
-    def _get_words_for_review(self) -> List[Word]:
-        """Получить слова для повторения"""
+    def _get_review_queue(self, limit: int) -> List[UserWord]:
+        """
+        Самые срочные слова для повторения.
+        Для просроченных карточек срочность (get_review_urgency) максимальна у новых,
+        а у остальных растёт с давностью due, поэтому очередь собирается
+        двумя выборками по индексам с LIMIT вместо сортировки всех карточек в памяти
+        """
         user_words = UserWord.objects.filter(
             user=self.user,
             due__lte=timezone.now()
@@ -82,24 +102,17 @@ class ExerciseGenerator:
         
         if self.topic_id:
             user_words = user_words.filter(
-                word__word_tags__tag__topic_id=self.topic_id
-            ).distinct()
+                word_id__in=WordIndex.get().get_word_ids(self.topic_id).tolist()
+            )
         
-        sorted_words = sorted(
-            user_words,
-            key=lambda uw: uw.get_review_urgency(),
-            reverse=True
-        )
+        queue = list(user_words.filter(state=0).order_by('due')[:limit])
+        if len(queue) < limit:
+            queue.extend(user_words.exclude(state=0).order_by('due')[:limit - len(queue)])
         
-        return [uw.word for uw in sorted_words[:10]]
+        return queue
     
-    def _calculate_new_word_ratio(self) -> float:
-        """Рассчитать соотношение новых слов на основе прогресса"""
-        pending_reviews = UserWord.objects.filter(
-            user=self.user,
-            due__lte=timezone.now()
-        ).count()
-        
+    def _calculate_new_word_ratio(self, pending_reviews: int) -> float:
+        """Рассчитать соотношение новых слов по числу карточек к повторению"""
         base_ratio = 0.3
         
         if pending_reviews > 20:
@@ -113,48 +126,112 @@ class ExerciseGenerator:
     
     def _get_new_words(self) -> List[Word]:
         """Получить новые слова для пользователя"""
-        user_word_ids = UserWord.objects.filter(
-            user=self.user
-        ).values_list('word_id', flat=True)
+        word_set = KnownWordSet.for_user(self.user)
+        query = self._get_new_words_query(word_set)
         
-        query = Word.objects.exclude(id__in=user_word_ids)
+        if word_set.count() == 0:
+            basic_words = query.filter(difficulty=1)[:20]
+            return list(basic_words)
         
+        return list(query[:10])
+    
+    def _get_new_words_query(self, word_set: KnownWordSet):
+        """Запрос новых слов: темы фильтруются по индексу словаря, без JOIN и DISTINCT"""
         if self.topic_id:
-            query = query.filter(
-                word_tags__tag__topic_id=self.topic_id
-            ).distinct()
+            topic_ids = [self.topic_id]
         else:
-            active_topics = UserTopicProgress.objects.filter(
+            topic_ids = list(UserTopicProgress.objects.filter(
                 user=self.user,
                 is_active=True
-            ).values_list('topic_id', flat=True)
-            
-            if active_topics:
-                query = query.filter(
-                    word_tags__tag__topic_id__in=active_topics
-                ).distinct()
-        
-        query = query.order_by('difficulty', 'hanzi')
-        
-        if not user_word_ids.exists():
-            basic_words = query.filter(difficulty=1)[:20]
-            return list(basic_words)
+            ).values_list('topic_id', flat=True))
+        
+        if topic_ids:
+            index = WordIndex.get()
+            topic_bits = 0
+            for topic_id in topic_ids:
+                topic_bits |= index.get_topic_bits(topic_id)
+            query = Word.objects.filter(id__in=bits_to_ids(topic_bits & ~word_set.all_bits))
+        else:
+            query = Word.objects.exclude(
+                id__in=UserWord.objects.filter(user=self.user).values('word_id')
+            )
         
-        return list(query[:10])
+        return query.order_by('difficulty', 'hanzi')
     
-    def _get_additional_words(self, count_needed: int) -> List[Word]:
+    def _get_additional_words(self, count_needed: int, related_words: List[Word] = None) -> List[Word]:
         """Получить дополнительные слова для заданий"""
-        user_word_ids = UserWord.objects.filter(
-            user=self.user
-        ).values_list('word_id', flat=True)
-        
-        query = Word.objects.filter(
-            word_tags__tag__topic_id=self.topic_id
-        ) if self.topic_id else Word.objects.all()
-        
-        query = query.exclude(id__in=user_word_ids)
+        known_words = KnownWordSet.for_user(self.user)
+        exclude_ids = {word.id for word in related_words or []}
+        additional = []
+        
+        if related_words:
+            distractors = WordDistractor.objects.filter(
+                word=related_words[0]
+            ).select_related('distractor').order_by('rank')[:self.DISTRACTOR_CANDIDATES]
+            
+            for item in distractors:
+                if len(additional) >= count_needed:
+                    break
+                if item.distractor_id in exclude_ids or known_words.contains(item.distractor_id):
+                    continue
+                additional.append(item.distractor)
+                exclude_ids.add(item.distractor_id)
+        
+        if len(additional) < count_needed:
+            additional.extend(self._get_random_words(
+                count_needed - len(additional),
+                exclude_ids,
+                known_words.all_bits
+            ))
         
-        return list(query.order_by('?')[:count_needed])
+        return additional
+    
+    def _get_random_words(self, count: int, exclude_ids=None, exclude_bits: int = 0) -> List[Word]:
+        """Получить случайные слова без сортировки в БД"""
+        return WordSampler(topic_id=self.topic_id or None).sample(count, exclude_ids, exclude_bits)
+    
+    def _load_templates(self, word_ids):
+        """Загрузить шаблоны заданий слов одним запросом (уже загруженные не запрашиваются)"""
+        missing = [word_id for word_id in word_ids if word_id not in self.templates]
+        if not missing:
+            return
+        
+        loaded = {
+            template.word_id: template
+            for template in ExerciseTemplate.objects.filter(word_id__in=missing)
+        }
+        for word_id in missing:
+            self.templates[word_id] = loaded.get(word_id)
+    
+    def _load_sentences(self, word_ids):
+        """Загрузить вхождения слов в примеры предложений одним запросом по индексу"""
+        missing = [word_id for word_id in word_ids if word_id not in self.sentences]
+        if not missing:
+            return
+        
+        for word_id in missing:
+            self.sentences[word_id] = []
+        # Не больше FILL_GAP_CANDIDATES самых простых предложений на слово отбирается в БД
+        occurrences = SentenceOccurrence.objects.filter(
+            word_id__in=missing
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('word_id')],
+                order_by=[F('sentence__difficulty').asc(), F('id').asc()]
+            )
+        ).filter(
+            position__lte=self.FILL_GAP_CANDIDATES
+        ).select_related('sentence').only(
+            'word_id', 'offset', 'length', 'context_word_ids', 'unknown_tokens',
+            'sentence__chinese_sentence', 'sentence__translation'
+        ).order_by('word_id', 'position')
+        for occurrence in occurrences:
+            self.sentences[occurrence.word_id].append(occurrence)
+    
+    def _get_known_bits(self) -> int:
+        """Битовое множество слов из словаря пользователя"""
+        return KnownWordSet.for_user(self.user).all_bits
     
     def _generate_exercise(self, exercise_type: str, words: List[Word]) -> Dict:
         """Сгенерировать конкретное задание"""
@@ -168,18 +245,30 @@ class ExerciseGenerator:
             return self._generate_multiple_choice_exercise(words[0])
         elif exercise_type == 'writing':
             return self._generate_writing_exercise(words[0])
+        elif exercise_type == 'fill_gap':
+            return (
+                self._generate_fill_gap_exercise(words[0]) or
+                self._generate_translation_exercise(words[0], direction='cn_to_ru')
+            )
         else:
             return self._generate_translation_exercise(words[0], direction='cn_to_ru')
     
     def _generate_translation_exercise(self, word: Word, direction: str) -> Dict:
         """Сгенерировать задание на перевод"""
+        template = self.templates.get(word.id)
+        
         if direction == 'cn_to_ru':
-            question = f"Переведите слово: **{word.hanzi}** ({word.pinyin_graphic})"
-            correct_answer = self._get_random_translation(word.translation)
+            if template:
+                question = template.questions['translation_ru']
+            else:
+                question = f"Переведите слово: **{word.hanzi}** ({word.pinyin_graphic})"
+            correct_answer = self._get_random_translation(word)
         else:
-            translations = word.translation.split(';')
-            correct_translation = random.choice(translations).strip()
-            question = f"Как будет **{correct_translation}** по-китайски?"
+            if template:
+                question = random.choice(template.questions['translation_cn'])
+            else:
+                correct_translation = self._get_random_translation(word)
+                question = f"Как будет **{correct_translation}** по-китайски?"
             correct_answer = word.hanzi
         
         return {
@@ -194,18 +283,29 @@ class ExerciseGenerator:
     
     def _generate_matching_exercise(self, words: List[Word]) -> Dict:
         """Сгенерировать задание на сопоставление"""
+        companions = []
         if len(words) < 4:
-            additional = self._get_additional_words(4 - len(words))
-            words.extend(additional)
-        
-        random.shuffle(words)
+            companions = self._get_matching_companions(words, 4 - len(words))
+        if len(words) + len(companions) < 4:
+            companion_ids = {companion[0] for companion in companions}
+            additional = self._get_additional_words(4 - len(words) - len(companions), words)
+            words.extend(word for word in additional if word.id not in companion_ids)
+        
+        matchers = AnswerMatcher.for_words(
+            word.id for word in words[:4] if not self.templates.get(word.id)
+        )
+        entries = [
+            (word.id, word.hanzi, word.pinyin_graphic, self._get_random_translation(word, matchers))
+            for word in words[:4]
+        ]
+        entries.extend(tuple(companion) for companion in companions)
+        random.shuffle(entries)
         
         pairs = []
-        for word in words[:4]:
-            translation = self._get_random_translation(word.translation)
+        for _, hanzi, pinyin, translation in entries:
             pairs.append({
-                'chinese': word.hanzi,
-                'pinyin': word.pinyin_graphic,
+                'chinese': hanzi,
+                'pinyin': pinyin,
                 'translation': translation
             })
         
@@ -213,6 +313,7 @@ class ExerciseGenerator:
         
         return {
             'type': 'matching',
+            'word_ids': [entry[0] for entry in entries],
             'pairs': pairs,
             'correct_pairs': correct_pairs,
             'instructions': 'Сопоставьте китайские слова с их переводами'
@@ -220,9 +321,13 @@ class ExerciseGenerator:
     
     def _generate_multiple_choice_exercise(self, word: Word) -> Dict:
         """Сгенерировать задание с множественным выбором"""
-        correct_translation = self._get_random_translation(word.translation)
+        correct_translation = self._get_random_translation(word)
         
-        incorrect_options = self._get_wrong_translations(word, 3)
+        template = self.templates.get(word.id)
+        if template and template.distractor_sets:
+            incorrect_options = list(random.choice(template.distractor_sets))
+        else:
+            incorrect_options = self._get_wrong_translations(word, 3)
         
         options = [correct_translation] + incorrect_options
         random.shuffle(options)
@@ -232,7 +337,9 @@ class ExerciseGenerator:
         return {
             'type': 'multiple_choice',
             'word_id': word.id,
-            'question': f"Выберите правильный перевод слова: **{word.hanzi}** ({word.pinyin_graphic})",
+            'question': template.questions['multiple_choice'] if template else (
+                f"Выберите правильный перевод слова: **{word.hanzi}** ({word.pinyin_graphic})"
+            ),
             'options': options,
             'correct_index': correct_index,
             'hint': f"Сложность: HSK {word.difficulty}"
@@ -245,42 +352,103 @@ class ExerciseGenerator:
             'word_id': word.id,
             'hanzi': word.hanzi,
             'pinyin': word.pinyin_graphic,
-            'translation': self._get_random_translation(word.translation),
+            'translation': self._get_random_translation(word),
             'stroke_data': self._get_stroke_data(word),
             'instructions': 'Повторите написание иероглифов в правильной последовательности'
         }
     
-    def _get_random_translation(self, translation_text: str) -> str:
-        """Получить случайный перевод из строки с несколькими переводами"""
-        translations = [t.strip() for t in translation_text.split(';') if t.strip()]
-        return random.choice(translations) if translations else translation_text
+    def _generate_fill_gap_exercise(self, word: Word):
+        """
+        Сгенерировать задание на заполнение пропуска в предложении.
+        Выбирается предложение, остальные слова которого пользователь уже знает;
+        если такого нет, возвращается None
+        """
+        known_bits = self._get_known_bits()
+        readable = []
+        for occurrence in self.sentences.get(word.id, []):
+            total = len(occurrence.context_word_ids) + occurrence.unknown_tokens
+            known = sum(1 for word_id in occurrence.context_word_ids if (known_bits >> word_id) & 1)
+            coverage = known / total if total else 1.0
+            if coverage >= self.FILL_GAP_MIN_COVERAGE:
+                readable.append((coverage, occurrence))
+        
+        if not readable:
+            return None
+        
+        best = max(coverage for coverage, _ in readable)
+        occurrence = random.choice([item for coverage, item in readable if coverage == best])
+        sentence = occurrence.sentence.chinese_sentence
+        gap_end = occurrence.offset + occurrence.length
+        
+        return {
+            'type': 'fill_gap',
+            'word_id': word.id,
+            'question': sentence[:occurrence.offset] + '＿' * occurrence.length + sentence[gap_end:],
+            'translation': occurrence.sentence.translation,
+            'correct_answer': word.hanzi,
+            'hint': word.pinyin_graphic,
+            'difficulty': word.difficulty,
+            'instructions': 'Вставьте пропущенное слово'
+        }
+    
+    def _get_random_translation(self, word: Word, matchers=None) -> str:
+        """Получить случайное значение слова из шаблона или заранее разобранных переводов"""
+        template = self.templates.get(word.id)
+        if template and template.glosses:
+            return random.choice(template.glosses)[0]
+        
+        matcher = (matchers or {}).get(word.id) or AnswerMatcher.for_word(word.id)
+        if matcher is None or not matcher.glosses:
+            return word.translation
+        return matcher.random_gloss()
+    
+    def _get_matching_companions(self, words: List[Word], count: int) -> List[list]:
+        """Слова для сопоставления из шаблона основного слова, которых нет в словаре пользователя"""
+        template = self.templates.get(words[0].id)
+        if not template:
+            return []
+        
+        known_bits = self._get_known_bits()
+        exclude_ids = {word.id for word in words}
+        companions = [
+            companion for companion in template.matching_pairs
+            if companion[0] not in exclude_ids and not (known_bits >> companion[0]) & 1
+        ]
+        return companions[:count]
     
     def _get_wrong_translations(self, correct_word: Word, count: int) -> List[str]:
-        """Получить неправильные варианты перевода"""
-        if self.topic_id:
-            other_words = Word.objects.filter(
-                word_tags__tag__topic_id=self.topic_id
-            ).exclude(id=correct_word.id).order_by('?')[:10]
-        else:
-            other_words = Word.objects.exclude(id=correct_word.id).order_by('?')[:10]
+        """Получить неправильные варианты перевода из пула отвлекающих вариантов"""
+        distractors = WordDistractor.objects.filter(
+            word=correct_word
+        ).select_related('distractor').order_by('rank')[:self.DISTRACTOR_CANDIDATES]
+        
+        other_words = [item.distractor for item in distractors]
+        random.shuffle(other_words)
+        
+        if len(other_words) < count:
+            exclude_ids = {correct_word.id} | {word.id for word in other_words}
+            other_words.extend(self._get_random_words(count * 3, exclude_ids))
+        
+        matchers = AnswerMatcher.for_words(
+            [correct_word.id] + [word.id for word in other_words]
+        )
+        correct_matcher = matchers.get(correct_word.id)
+        correct_translations = set(correct_matcher.glosses) if correct_matcher else set()
         
         wrong_translations = []
         for word in other_words:
             if len(wrong_translations) >= count:
                 break
-            translation = self._get_random_translation(word.translation)
-            if translation and translation not in wrong_translations:
+            translation = self._get_random_translation(word, matchers)
+            if (translation and translation not in wrong_translations
+                    and translation not in correct_translations):
                 wrong_translations.append(translation)
         
         return wrong_translations
     
     def _get_stroke_data(self, word: Word) -> Dict:
-        """Получить данные о штрихах иероглифа"""
-        return {
-            'character': word.hanzi,
-            'stroke_count': len(word.hanzi),
-            'medians': []
-        }
+        """Получить данные о штрихах иероглифов слова (из файла, отображённого в память)"""
+        return StrokeStore.get_word(word.hanzi)
     
     def auto_add_word_to_dictionary(self, word: Word):
         """Автоматически добавить слово в словарь пользователя"""
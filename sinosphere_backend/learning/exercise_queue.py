@@ -0,0 +1,168 @@
+import uuid
+from typing import Dict, List, Optional
+from django.core.cache import cache
+from .background import run_after_commit
+from .models import QueuedExercise
+from .session_planner import SessionPlanner
+
+
+class ExerciseQueue:
+    """
+    Очередь заранее сгенерированных заданий пользователя.
+    Хранится в кэше с резервной копией в QueuedExercise и пополняется в фоне,
+    когда в ней остаётся меньше LOW_WATERMARK заданий
+    """
+    CACHE_KEY = 'learning:exercise_queue:{user_id}'
+    REFILL_LOCK_KEY = 'learning:exercise_queue:refill:{user_id}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+    REFILL_LOCK_TIMEOUT = 60
+
+    CAPACITY = 10
+    LOW_WATERMARK = 3
+
+    def __init__(self, user):
+        self.user_id = getattr(user, 'id', user)
+
+    def pop(self) -> Optional[Dict]:
+        """Взять следующее задание из очереди"""
+        items = self._load()
+        item = self._claim_next(items)
+        if item is None:
+            # Холодный старт: генерируем немного заданий сразу, остальное - в фоне
+            self.refill(self.LOW_WATERMARK)
+            items = self._load()
+            item = self._claim_next(items)
+            if item is None:
+                return None
+
+        if len(items) < self.LOW_WATERMARK:
+            self.schedule_refill()
+
+        return item['exercise']
+
+    def _claim_next(self, items: List[Dict]) -> Optional[Dict]:
+        """
+        Забрать первое свободное задание из списка (список изменяется).
+        Задание достаётся запросу, удалившему его строку в QueuedExercise,
+        поэтому параллельные запросы не получают одно и то же задание,
+        а уже забранные задания из устаревшего кэша пропускаются
+        """
+        claimed = None
+        while items:
+            item = items.pop(0)
+            deleted, _ = QueuedExercise.objects.filter(
+                user_id=self.user_id,
+                key=item['key']
+            ).delete()
+            if deleted:
+                claimed = item
+                break
+
+        self._save_to_cache(items)
+        return claimed
+
+    def refill(self, count: int = None) -> int:
+        """Дополнить очередь до count заданий, возвращает количество добавленных"""
+        items = self._load()
+        needed = (count or self.CAPACITY) - len(items)
+        if needed <= 0:
+            return 0
+
+        queued_word_ids = {word_id for item in items for word_id in item['word_ids']}
+        planner = SessionPlanner(self.user_id, exclude_word_ids=queued_word_ids)
+        exercises = planner.plan(needed, add_words=False)
+
+        new_items = [
+            {
+                'key': uuid.uuid4().hex,
+                'word_ids': word_ids,
+                'exercise': exercise
+            }
+            for exercise, word_ids in zip(exercises, planner.planned_word_ids)
+        ]
+        if not new_items:
+            return 0
+
+        QueuedExercise.objects.bulk_create([
+            QueuedExercise(
+                user_id=self.user_id,
+                key=item['key'],
+                word_ids=item['word_ids'],
+                payload=item['exercise']
+            )
+            for item in new_items
+        ])
+
+        # Пока шла генерация, из очереди могли забрать задания
+        self._save_to_cache(self._load() + new_items)
+        return len(new_items)
+
+    def schedule_refill(self):
+        """Запустить фоновое пополнение, если оно ещё не запущено"""
+        lock_key = self.REFILL_LOCK_KEY.format(user_id=self.user_id)
+        if cache.add(lock_key, 1, timeout=self.REFILL_LOCK_TIMEOUT):
+            run_after_commit(self._refill_and_release, lock_key)
+
+    def discard_word(self, word_id):
+        """Убрать задания со словом, расписание которого изменилось"""
+        items = cache.get(self._cache_key())
+        if items is None:
+            run_after_commit(self._prune_rows, word_id)
+            return
+
+        kept = [item for item in items if word_id not in item['word_ids']]
+        if len(kept) == len(items):
+            return
+
+        self._save_to_cache(kept)
+        run_after_commit(
+            self._delete_rows,
+            [item['key'] for item in items if word_id in item['word_ids']]
+        )
+
+        if len(kept) < self.LOW_WATERMARK:
+            self.schedule_refill()
+
+    def invalidate(self):
+        """Полностью сбросить очередь"""
+        cache.delete(self._cache_key())
+        QueuedExercise.objects.filter(user_id=self.user_id).delete()
+
+    def _load(self) -> List[Dict]:
+        """Очередь из кэша, при промахе - из БД"""
+        items = cache.get(self._cache_key())
+        if items is not None:
+            return items
+
+        items = [
+            {
+                'key': row.key,
+                'word_ids': row.word_ids,
+                'exercise': row.payload
+            }
+            for row in QueuedExercise.objects.filter(
+                user_id=self.user_id
+            ).order_by('created_at', 'id')
+        ]
+        self._save_to_cache(items)
+        return items
+
+    def _refill_and_release(self, lock_key):
+        try:
+            self.refill()
+        finally:
+            cache.delete(lock_key)
+
+    def _prune_rows(self, word_id):
+        rows = QueuedExercise.objects.filter(user_id=self.user_id).values_list('key', 'word_ids')
+        self._delete_rows([key for key, word_ids in rows if word_id in word_ids])
+
+    def _delete_rows(self, keys):
+        if keys:
+            QueuedExercise.objects.filter(key__in=keys).delete()
+
+    def _save_to_cache(self, items):
+        cache.set(self._cache_key(), items, timeout=self.CACHE_TIMEOUT)
+
+    def _cache_key(self):
+        return self.CACHE_KEY.format(user_id=self.user_id)
@@ -0,0 +1,106 @@
+import random
+from typing import Dict, List
+from dictionary.answer_matcher import AnswerMatcher
+from dictionary.models import Word
+from dictionary.utils import bulk_upsert
+from .models import ExerciseTemplate, WordDistractor
+
+
+class ExerciseTemplateBuilder:
+    """
+    Пакетное построение шаблонов заданий по словам.
+    Значения слов, формулировки вопросов и наборы неправильных вариантов
+    из пулов отвлекающих вариантов готовятся заранее, чтобы генератор
+    заданий только выбирал шаблон и перемешивал варианты
+    """
+    BLOCK_SIZE = 2000
+    POOL_CANDIDATES = 12
+    MAX_GLOSSES = 8
+    DISTRACTOR_SETS = 3
+    OPTIONS_PER_SET = 3
+    MATCHING_CANDIDATES = 6
+
+    TEMPLATE_FIELDS = ['glosses', 'questions', 'distractor_sets', 'matching_pairs', 'updated_at']
+
+    def build(self, word_ids=None) -> int:
+        """Пересобрать шаблоны слов (по умолчанию всего словаря), возвращает количество шаблонов"""
+        if word_ids is None:
+            word_ids = list(Word.objects.order_by('id').values_list('id', flat=True))
+        else:
+            word_ids = sorted(set(word_ids))
+
+        built = 0
+        for start in range(0, len(word_ids), self.BLOCK_SIZE):
+            built += self._build_block(word_ids[start:start + self.BLOCK_SIZE])
+        return built
+
+    def refresh_word(self, word_id) -> int:
+        """Пересобрать шаблон слова и шаблоны, в пулах которых оно встречается"""
+        word_ids = set(WordDistractor.objects.filter(
+            distractor_id=word_id,
+            rank__lt=self.POOL_CANDIDATES
+        ).values_list('word_id', flat=True))
+        word_ids.add(word_id)
+        return self.build(word_ids)
+
+    def _build_block(self, word_ids: List[int]) -> int:
+        pools = {}
+        rows = WordDistractor.objects.filter(
+            word_id__in=word_ids,
+            rank__lt=self.POOL_CANDIDATES
+        ).values_list('word_id', 'distractor_id').order_by('word_id', 'rank')
+        for word_id, distractor_id in rows:
+            pools.setdefault(word_id, []).append(distractor_id)
+
+        matchers = AnswerMatcher.for_words(
+            set(word_ids) | {distractor_id for ids in pools.values() for distractor_id in ids}
+        )
+
+        templates = [
+            self._build_template(matchers[word_id], pools.get(word_id, []), matchers)
+            for word_id in word_ids
+            if word_id in matchers and matchers[word_id].glosses
+        ]
+        bulk_upsert(ExerciseTemplate, templates, ['word'], self.TEMPLATE_FIELDS, batch_size=1000)
+
+        # Слова без значений (или удалённые) не должны сохранять старый шаблон
+        ExerciseTemplate.objects.filter(word_id__in=word_ids).exclude(
+            word_id__in=[template.word_id for template in templates]
+        ).delete()
+        return len(templates)
+
+    def _build_template(self, matcher: AnswerMatcher, pool: List[int], matchers: Dict) -> ExerciseTemplate:
+        glosses = list(zip(matcher.glosses, matcher.normalized))[:self.MAX_GLOSSES]
+        own_translations = set(matcher.glosses)
+
+        candidates = []
+        matching_pairs = []
+        for distractor_id in pool:
+            distractor = matchers.get(distractor_id)
+            if distractor is None or not distractor.glosses:
+                continue
+            translation = distractor.primary
+            if translation in own_translations or translation in candidates:
+                continue
+            candidates.append(translation)
+            if len(matching_pairs) < self.MATCHING_CANDIDATES:
+                matching_pairs.append([distractor_id, distractor.hanzi, distractor.pinyin, translation])
+
+        distractor_sets = []
+        if len(candidates) >= self.OPTIONS_PER_SET:
+            # Первый набор - самые правдоподобные варианты, остальные - случайные из пула
+            distractor_sets.append(candidates[:self.OPTIONS_PER_SET])
+            for _ in range(self.DISTRACTOR_SETS - 1):
+                distractor_sets.append(random.sample(candidates, self.OPTIONS_PER_SET))
+
+        return ExerciseTemplate(
+            word_id=matcher.word_id,
+            glosses=[list(gloss) for gloss in glosses],
+            questions={
+                'translation_ru': f"Переведите слово: **{matcher.hanzi}** ({matcher.pinyin})",
+                'translation_cn': [f"Как будет **{text}** по-китайски?" for text, _ in glosses],
+                'multiple_choice': f"Выберите правильный перевод слова: **{matcher.hanzi}** ({matcher.pinyin})"
+            },
+            distractor_sets=distractor_sets,
+            matching_pairs=matching_pairs
+        )
@@ -87,15 +87,15 @@ class FSRSOptimizer:
         two_weeks = now + timedelta(days=14)
         
         for word in user_words:
-            if not word.next_review:
+            if not word.due:
                 schedule['today'].append(word)
-            elif word.next_review <= now:
+            elif word.due <= now:
                 schedule['today'].append(word)
-            elif word.next_review <= tomorrow:
+            elif word.due <= tomorrow:
                 schedule['tomorrow'].append(word)
-            elif word.next_review <= next_week:
+            elif word.due <= next_week:
                 schedule['this_week'].append(word)
-            elif word.next_review <= two_weeks:
+            elif word.due <= two_weeks:
                 schedule['next_week'].append(word)
             else:
                 schedule['future'].append(word)
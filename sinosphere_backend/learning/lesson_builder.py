@@ -0,0 +1,316 @@
+import hashlib
+import json
+import math
+import random
+from typing import Dict, List
+from django.db import transaction
+from dictionary.answer_matcher import AnswerMatcher
+from dictionary.models import Topic, Word
+from dictionary.word_index import WordIndex
+from .lesson_payloads import LessonPayloadCache
+from .models import Lesson, Exercise, WordDistractor
+
+
+class LessonBuilder:
+    """
+    Пакетная сборка уроков по темам и уровням HSK из слов с тегами.
+    Каждый урок получает ключ (тема, уровень, часть) и хеш исходных данных:
+    при повторном запуске неизменившиеся уроки не трогаются, изменившиеся
+    пересобираются с новой версией содержимого, а уроки, которые больше
+    не собираются, отключаются
+    """
+    BUILD_VERSION = 1
+    WORDS_PER_LESSON = 8
+    MATCHING_SIZE = 4
+    OPTIONS_COUNT = 4
+    DISTRACTOR_CANDIDATES = 10
+    MINUTES_PER_EXERCISE = 0.5
+
+    LESSON_FIELDS = ['title', 'description', 'difficulty', 'order', 'is_active', 'estimated_time', 'build_hash']
+
+    def __init__(self, words_per_lesson=None, force=False):
+        self.words_per_lesson = words_per_lesson or self.WORDS_PER_LESSON
+        self.force = force
+
+    def build(self, topic_ids=None) -> Dict[str, int]:
+        """Собрать уроки тем (по умолчанию всех активных), возвращает счётчики изменений"""
+        topics = Topic.objects.filter(is_active=True).order_by('order', 'name')
+        if topic_ids:
+            topics = topics.filter(id__in=topic_ids)
+        topics = list(topics.values_list('id', 'name'))
+
+        plans = self._plan_lessons(topics)
+        word_ids = {word_id for plan in plans for word_id in plan['word_ids']}
+        distractors = self._load_distractors(word_ids)
+        word_ids.update(word_id for ids in distractors.values() for word_id in ids)
+
+        words = Word.objects.only('id', 'hanzi', 'pinyin_graphic', 'difficulty').in_bulk(word_ids)
+        matchers = AnswerMatcher.for_words(word_ids)
+
+        built = {}
+        for plan in plans:
+            exercises = self._build_exercises(plan, words, matchers, distractors)
+            if exercises:
+                plan['exercises'] = exercises
+                plan['build_hash'] = self._hash(plan)
+                built[plan['key']] = plan
+
+        existing = Lesson.objects.filter(build_key__isnull=False)
+        if topic_ids:
+            existing = existing.filter(topic_id__in=[topic_id for topic_id, _ in topics])
+        existing = {lesson.build_key: lesson for lesson in existing}
+
+        return self._save(built, existing)
+
+    def _plan_lessons(self, topics) -> List[Dict]:
+        """Разбить слова каждой темы по уровням HSK на уроки"""
+        index = WordIndex.get()
+        levels = sorted(index.difficulty_word_ids)
+        plans = []
+
+        for topic_id, topic_name in topics:
+            order = 0
+            for level in levels:
+                level_ids = index.get_word_ids(topic_id, level).tolist()
+                parts = math.ceil(len(level_ids) / self.words_per_lesson)
+                for part in range(parts):
+                    chunk = level_ids[part * self.words_per_lesson:(part + 1) * self.words_per_lesson]
+                    order += 1
+                    plans.append({
+                        'key': f'{topic_id}:{level}:{part + 1}',
+                        'topic_id': topic_id,
+                        'title': f'{topic_name}: HSK {level}, часть {part + 1}',
+                        'description': f'Слова темы «{topic_name}» уровня HSK {level}',
+                        'difficulty': min(3, (level + 1) // 2),
+                        'level': level,
+                        'order': order,
+                        'word_ids': chunk
+                    })
+
+        return plans
+
+    def _load_distractors(self, word_ids) -> Dict[int, List[int]]:
+        """Пулы отвлекающих вариантов слов уроков одним запросом"""
+        distractors = {}
+        rows = WordDistractor.objects.filter(
+            word_id__in=word_ids,
+            rank__lt=self.DISTRACTOR_CANDIDATES
+        ).values_list('word_id', 'distractor_id').order_by('word_id', 'rank')
+        for word_id, distractor_id in rows:
+            distractors.setdefault(word_id, []).append(distractor_id)
+        return distractors
+
+    def _build_exercises(self, plan, words, matchers, distractors) -> List[Dict]:
+        """Задания урока: перевод, выбор варианта, обратный перевод и сопоставление"""
+        # Порядок вариантов зависит только от урока, чтобы повторная сборка давала тот же хеш
+        rng = random.Random(f"{plan['key']}:{self.BUILD_VERSION}")
+        lesson_words = [
+            words[word_id] for word_id in plan['word_ids']
+            if word_id in words and matchers.get(word_id) and matchers[word_id].glosses
+        ]
+
+        translation_ru = []
+        multiple_choice = []
+        translation_cn = []
+        for word in lesson_words:
+            matcher = matchers[word.id]
+            translation_ru.append({
+                'exercise_type': 'translation_ru',
+                'question': f"Переведите слово: **{word.hanzi}** ({word.pinyin_graphic})",
+                'correct_answer': matcher.primary,
+                'options': [],
+                'word_id': word.id,
+                'difficulty': word.difficulty,
+                'explanation': f"Значения: {'; '.join(matcher.glosses)}"
+            })
+
+            options = self._get_options(word, lesson_words, matchers, distractors, rng)
+            if options:
+                multiple_choice.append({
+                    'exercise_type': 'multiple_choice',
+                    'question': f"Выберите правильный перевод слова: **{word.hanzi}** ({word.pinyin_graphic})",
+                    'correct_answer': matcher.primary,
+                    'options': options,
+                    'word_id': word.id,
+                    'difficulty': word.difficulty,
+                    'explanation': f"Правильный перевод: {matcher.primary}"
+                })
+
+            translation_cn.append({
+                'exercise_type': 'translation_cn',
+                'question': f"Как будет **{matcher.primary}** по-китайски?",
+                'correct_answer': word.hanzi,
+                'options': [],
+                'word_id': word.id,
+                'difficulty': word.difficulty,
+                'explanation': f"Правильный ответ: {word.hanzi} ({word.pinyin_graphic})"
+            })
+
+        matching = []
+        for start in range(0, len(lesson_words) - 1, self.MATCHING_SIZE):
+            group = lesson_words[start:start + self.MATCHING_SIZE]
+            if len(group) < 2:
+                break
+            pairs = [
+                {
+                    'chinese': word.hanzi,
+                    'pinyin': word.pinyin_graphic,
+                    'translation': matchers[word.id].primary
+                }
+                for word in group
+            ]
+            matching.append({
+                'exercise_type': 'matching',
+                'question': 'Сопоставьте китайские слова с их переводами',
+                'correct_answer': '; '.join(f"{pair['chinese']} - {pair['translation']}" for pair in pairs),
+                'options': pairs,
+                'word_id': group[0].id,
+                'additional_word_ids': [word.id for word in group[1:]],
+                'difficulty': max(word.difficulty for word in group),
+                'explanation': ''
+            })
+
+        exercises = translation_ru + multiple_choice + translation_cn + matching
+        for order, exercise in enumerate(exercises, 1):
+            exercise['order'] = order
+        return exercises
+
+    def _get_options(self, word, lesson_words, matchers, distractors, rng) -> List[str]:
+        """Варианты ответа: перевод слова и переводы слов из его пула отвлекающих вариантов"""
+        correct = matchers[word.id].primary
+        excluded = set(matchers[word.id].glosses)
+        candidates = distractors.get(word.id, []) + [
+            other.id for other in lesson_words if other.id != word.id
+        ]
+
+        wrong = []
+        for candidate_id in candidates:
+            matcher = matchers.get(candidate_id)
+            if matcher is None or not matcher.glosses:
+                continue
+            translation = matcher.primary
+            if translation in excluded or translation in wrong:
+                continue
+            wrong.append(translation)
+            if len(wrong) == self.OPTIONS_COUNT - 1:
+                break
+
+        if len(wrong) < self.OPTIONS_COUNT - 1:
+            return []
+
+        options = [correct] + wrong
+        rng.shuffle(options)
+        return options
+
+    def _hash(self, plan) -> str:
+        data = [
+            self.BUILD_VERSION,
+            plan['title'],
+            plan['description'],
+            plan['difficulty'],
+            plan['order'],
+            plan['exercises']
+        ]
+        return hashlib.sha1(json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _save(self, built: Dict[str, Dict], existing: Dict[str, Lesson]) -> Dict[str, int]:
+        """Записать новые и изменившиеся уроки пакетными операциями"""
+        created = []
+        changed = []
+        for key, plan in built.items():
+            lesson = existing.get(key)
+            if lesson is None:
+                lesson = Lesson(build_key=key, topic_id=plan['topic_id'])
+                created.append(lesson)
+            elif self.force or not lesson.is_active or lesson.build_hash != plan['build_hash']:
+                changed.append(lesson)
+            else:
+                continue
+
+            lesson.title = plan['title']
+            lesson.description = plan['description']
+            lesson.difficulty = plan['difficulty']
+            lesson.order = plan['order']
+            lesson.is_active = True
+            lesson.estimated_time = max(1, math.ceil(len(plan['exercises']) * self.MINUTES_PER_EXERCISE))
+            lesson.build_hash = plan['build_hash']
+
+        stale = [
+            lesson.id for key, lesson in existing.items()
+            if key not in built and lesson.is_active
+        ]
+
+        with transaction.atomic():
+            if created:
+                Lesson.objects.bulk_create(created)
+                # Не все СУБД возвращают id при вставке (MySQL)
+                if any(lesson.pk is None for lesson in created):
+                    ids = dict(Lesson.objects.filter(
+                        build_key__in=[lesson.build_key for lesson in created]
+                    ).values_list('build_key', 'id'))
+                    for lesson in created:
+                        lesson.pk = ids[lesson.build_key]
+
+            if changed:
+                Lesson.objects.bulk_update(changed, self.LESSON_FIELDS)
+                Exercise.objects.filter(lesson__in=changed).delete()
+
+            self._create_exercises(created + changed, built)
+
+            if stale:
+                Lesson.objects.filter(id__in=stale).update(is_active=False)
+
+            # Собранные данные уроков в кэше становятся недействительными
+            LessonPayloadCache.bump([lesson.id for lesson in changed] + stale)
+
+        return {
+            'created': len(created),
+            'updated': len(changed),
+            'unchanged': len(built) - len(created) - len(changed),
+            'deactivated': len(stale)
+        }
+
+    def _create_exercises(self, lessons: List[Lesson], built: Dict[str, Dict]):
+        exercises = []
+        additional = {}
+        for lesson in lessons:
+            for item in built[lesson.build_key]['exercises']:
+                exercises.append(Exercise(
+                    lesson_id=lesson.id,
+                    exercise_type=item['exercise_type'],
+                    question=item['question'],
+                    correct_answer=item['correct_answer'],
+                    options=item['options'],
+                    word_id=item['word_id'],
+                    difficulty=item['difficulty'],
+                    explanation=item['explanation'],
+                    order=item['order']
+                ))
+                if item.get('additional_word_ids'):
+                    additional[(lesson.id, item['order'])] = item['additional_word_ids']
+
+        if not exercises:
+            return
+        Exercise.objects.bulk_create(exercises, batch_size=1000)
+
+        if not additional:
+            return
+        if any(exercise.pk is None for exercise in exercises):
+            ids = {
+                (lesson_id, order): exercise_id
+                for exercise_id, lesson_id, order in Exercise.objects.filter(
+                    lesson_id__in=[lesson.id for lesson in lessons]
+                ).values_list('id', 'lesson_id', 'order')
+            }
+        else:
+            ids = {(exercise.lesson_id, exercise.order): exercise.pk for exercise in exercises}
+
+        Through = Exercise.additional_words.through
+        Through.objects.bulk_create(
+            [
+                Through(exercise_id=ids[key], word_id=word_id)
+                for key, word_ids in additional.items()
+                for word_id in word_ids
+            ],
+            batch_size=1000
+        )
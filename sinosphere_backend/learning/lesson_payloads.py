@@ -0,0 +1,52 @@
+from typing import Dict
+from django.core.cache import cache
+from django.db.models import F, Prefetch, QuerySet
+from dictionary.models import Word
+from .models import Lesson
+from .practice_sessions import PracticeSessionStore
+from .serializers import LessonSerializer, ExerciseSerializer
+
+
+class LessonPayloadCache:
+    """
+    Скомпилированные данные урока (урок с темой и задания со словами).
+    Одинаковы для всех пользователей, хранятся в кэше по версии содержимого урока,
+    которую увеличивают сигналы Lesson, Exercise, Word, Topic, Tag и WordTag
+    (число слов, тегов и подтем темы входит в данные урока). Вместе с заданиями
+    хранятся записи для проверки ответов, из которых создаётся сессия урока
+    """
+    CACHE_KEY = 'learning:lesson_payload:v2:{lesson_id}:{version}'
+    CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+    @classmethod
+    def get(cls, lesson: Lesson) -> Dict:
+        """Данные урока из кэша, при промахе урок компилируется"""
+        cache_key = cls.CACHE_KEY.format(lesson_id=lesson.id, version=lesson.content_version)
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = cls.compile(lesson)
+            cache.set(cache_key, payload, timeout=cls.CACHE_TIMEOUT)
+        return payload
+
+    @staticmethod
+    def compile(lesson: Lesson) -> Dict:
+        """Собрать данные урока"""
+        exercises = list(lesson.exercises.select_related('word').prefetch_related(
+            Prefetch('additional_words', queryset=Word.objects.only('id'))
+        ))
+        return {
+            'lesson': LessonSerializer(lesson).data,
+            'exercises': ExerciseSerializer(
+                exercises,
+                many=True,
+                context={'hide_answer': True}
+            ).data,
+            'answers': [PracticeSessionStore.lesson_answer_record(exercise) for exercise in exercises]
+        }
+
+    @staticmethod
+    def bump(lessons) -> int:
+        """Увеличить версию содержимого уроков (queryset или список id)"""
+        if not isinstance(lessons, QuerySet):
+            lessons = Lesson.objects.filter(id__in=list(lessons))
+        return lessons.update(content_version=F('content_version') + 1)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from learning.distractor_pools import DistractorPoolBuilder
+
+class Command(BaseCommand):
+    help = 'Построить пулы отвлекающих вариантов для заданий с выбором и сопоставлением'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            default=DistractorPoolBuilder.POOL_SIZE,
+            help='Количество кандидатов на слово'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('Построение пулов отвлекающих вариантов...')
+        
+        builder = DistractorPoolBuilder(pool_size=options['pool_size'])
+        created = builder.build()
+        
+        self.stdout.write(self.style.SUCCESS(f'Сохранено вариантов: {created}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from learning.exercise_templates import ExerciseTemplateBuilder
+
+class Command(BaseCommand):
+    help = 'Построить шаблоны заданий по словам (после build_distractor_pools)'
+    
+    def handle(self, *args, **options):
+        self.stdout.write('Построение шаблонов заданий...')
+        
+        built = ExerciseTemplateBuilder().build()
+        
+        self.stdout.write(self.style.SUCCESS(f'Сохранено шаблонов: {built}'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from learning.lesson_builder import LessonBuilder
+
+class Command(BaseCommand):
+    help = 'Собрать уроки по темам и уровням HSK из слов с тегами'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--topic',
+            type=int,
+            action='append',
+            help='ID темы (можно указать несколько раз, по умолчанию - все активные темы)'
+        )
+        parser.add_argument(
+            '--words-per-lesson',
+            type=int,
+            default=LessonBuilder.WORDS_PER_LESSON,
+            help='Количество слов в одном уроке'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересобрать уроки, даже если исходные данные не изменились'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('Сборка уроков...')
+        
+        builder = LessonBuilder(
+            words_per_lesson=options['words_per_lesson'],
+            force=options['force']
+        )
+        result = builder.build(options['topic'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано уроков: {result['created']}, обновлено: {result['updated']}, "
+            f"без изменений: {result['unchanged']}, отключено: {result['deactivated']}"
+        ))
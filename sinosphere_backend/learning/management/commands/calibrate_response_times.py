@@ -0,0 +1,32 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from users.response_times import ResponseTimeTables
+
+class Command(BaseCommand):
+    help = 'Рассчитать таблицы процентилей времени ответа для автоматического рейтинга FSRS'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=180,
+            help='Учитывать ответы за последние N дней (0 - за всё время)'
+        )
+        parser.add_argument(
+            '--min-samples',
+            type=int,
+            default=ResponseTimeTables.MIN_SAMPLES,
+            help='Минимальное количество ответов для таблицы'
+        )
+    
+    def handle(self, *args, **kwargs):
+        since = None
+        if kwargs['days'] > 0:
+            since = timezone.now() - timedelta(days=kwargs['days'])
+        
+        result = ResponseTimeTables.calibrate(since=since, min_samples=kwargs['min_samples'])
+        
+        self.stdout.write(f"Правильных ответов: {result['answers']}")
+        self.stdout.write(f"  Таблиц пользователей: {result['user_tables']}")
+        self.stdout.write(self.style.SUCCESS(f"Рассчитано таблиц времени ответа: {result['tables']}"))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from learning.practice_sessions import PracticeSessionStore
+
+class Command(BaseCommand):
+    help = 'Удалить истёкшие сессии практики'
+    
+    def handle(self, *args, **options):
+        deleted = PracticeSessionStore.clear_expired()
+        self.stdout.write(self.style.SUCCESS(f'Удалено сессий: {deleted}'))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from users.models import UserExerciseTypeStats
+
+class Command(BaseCommand):
+    help = 'Пересчитать счётчики типов заданий пользователей по истории заданий'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество пользователей в одном пакете'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID пользователя (по умолчанию - все пользователи с историей)'
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        if options['user']:
+            user_ids = [options['user']]
+        else:
+            user_ids = list(User.objects.filter(
+                exercise_history__isnull=False
+            ).distinct().order_by('id').values_list('id', flat=True))
+        
+        updated = 0
+        for start in range(0, len(user_ids), batch_size):
+            updated += UserExerciseTypeStats.rebuild(user_ids[start:start + batch_size])
+        
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано пользователей: {updated}'))
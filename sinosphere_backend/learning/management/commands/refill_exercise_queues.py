@@ -0,0 +1,34 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from learning.exercise_queue import ExerciseQueue
+from users.models import UserLearningStats
+
+class Command(BaseCommand):
+    help = 'Заполнить очереди заданий активных пользователей (например, перед вечерним пиком)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Пользователи, занимавшиеся за последние N дней'
+        )
+    
+    def handle(self, *args, **options):
+        # last_login не обновляется при входе по токену, активность берётся из статистики
+        since = timezone.now().date() - timedelta(days=options['days'])
+        user_ids = UserLearningStats.objects.filter(
+            user__is_active=True,
+            last_activity_date__gte=since
+        ).values_list('user_id', flat=True)
+        
+        users_count = 0
+        exercises_count = 0
+        for user_id in user_ids.iterator():
+            exercises_count += ExerciseQueue(user_id).refill()
+            users_count += 1
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Очереди пополнены: пользователей {users_count}, заданий {exercises_count}'
+        ))
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from learning.topic_recommendations import TopicRecommender
+
+class Command(BaseCommand):
+    help = 'Пересчитать рекомендации тем пользователей'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID пользователя (по умолчанию - все активные пользователи)'
+        )
+    
+    def handle(self, *args, **options):
+        if options['user']:
+            user_ids = [options['user']]
+        else:
+            user_ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        
+        recommender = TopicRecommender()
+        updated = recommender.refresh_users(user_ids)
+        
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано пользователей: {updated}'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0003_examplesentence_topic_alter_wordtag_options_and_more'),
+        ('learning', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordDistractor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(default=0, verbose_name='Место в пуле')),
+                ('score', models.FloatField(default=0.0, verbose_name='Оценка правдоподобия')),
+                ('distractor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distractor_for', to='dictionary.word', verbose_name='Отвлекающее слово')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distractors', to='dictionary.word', verbose_name='Слово')),
+            ],
+            options={
+                'verbose_name': 'Отвлекающий вариант',
+                'verbose_name_plural': 'Отвлекающие варианты',
+                'indexes': [models.Index(fields=['word', 'rank'], name='idx_distractor_word_rank')],
+                'constraints': [models.UniqueConstraint(fields=('word', 'distractor'), name='unique_word_distractor')],
+            },
+        ),
+    ]
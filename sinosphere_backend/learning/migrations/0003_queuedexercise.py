@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0002_worddistractor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedExercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True, verbose_name='Ключ задания')),
+                ('word_ids', models.JSONField(default=list, verbose_name='Слова задания')),
+                ('payload', models.JSONField(verbose_name='Задание')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_exercises', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задание в очереди',
+                'verbose_name_plural': 'Задания в очереди',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='idx_queued_user_created')],
+            },
+        ),
+    ]
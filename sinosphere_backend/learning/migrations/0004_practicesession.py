@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_queuedexercise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PracticeSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True, verbose_name='Идентификатор сессии')),
+                ('session_type', models.CharField(default='mixed', max_length=16, verbose_name='Тип сессии')),
+                ('answers', models.JSONField(default=list, verbose_name='Ответы на задания')),
+                ('answered', models.JSONField(default=list, verbose_name='Выполненные задания')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('expires_at', models.DateTimeField(verbose_name='Действительна до')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='practice_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Сессия практики',
+                'verbose_name_plural': 'Сессии практики',
+                'indexes': [models.Index(fields=['expires_at'], name='idx_practice_session_expires')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_practicesession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, help_text='Увеличивается при изменении урока, его заданий и слов', verbose_name='Версия содержимого'),
+        ),
+    ]
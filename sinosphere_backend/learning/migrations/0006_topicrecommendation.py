@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_wordtranslation'),
+        ('learning', '0005_lesson_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0.0, verbose_name='Оценка рекомендации')),
+                ('mastery_level', models.PositiveSmallIntegerField(default=0, verbose_name='Уровень освоения')),
+                ('accuracy', models.FloatField(default=0.0, verbose_name='Точность ответов')),
+                ('words_known', models.IntegerField(default=0, verbose_name='Слов в словаре пользователя')),
+                ('words_learned', models.IntegerField(default=0, verbose_name='Слов изучено')),
+                ('total_words', models.IntegerField(default=0, verbose_name='Всего слов в теме')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Пересчитано')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='dictionary.topic', verbose_name='Тема')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_recommendations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация темы',
+                'verbose_name_plural': 'Рекомендации тем',
+                'indexes': [models.Index(fields=['user', '-score'], name='idx_recommendation_score')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic'), name='unique_user_topic_recommendation')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0006_topicrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='build_hash',
+            field=models.CharField(blank=True, max_length=40, verbose_name='Хеш исходных данных сборки'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='build_key',
+            field=models.CharField(blank=True, help_text='Тема, уровень HSK и часть для уроков, собранных командой build_lessons', max_length=64, null=True, unique=True, verbose_name='Ключ автосборки'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_wordtranslation'),
+        ('learning', '0007_lesson_build_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('glosses', models.JSONField(default=list, help_text='Пары [значение, нормализованное значение]', verbose_name='Значения')),
+                ('questions', models.JSONField(default=dict, verbose_name='Формулировки заданий по типам')),
+                ('distractor_sets', models.JSONField(default=list, help_text='Для заданий с множественным выбором', verbose_name='Наборы неправильных вариантов')),
+                ('matching_pairs', models.JSONField(default=list, help_text='Списки [id слова, иероглифы, пиньинь, перевод]', verbose_name='Слова для сопоставления')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_template', to='dictionary.word', verbose_name='Слово')),
+            ],
+            options={
+                'verbose_name': 'Шаблон заданий',
+                'verbose_name_plural': 'Шаблоны заданий',
+            },
+        ),
+    ]
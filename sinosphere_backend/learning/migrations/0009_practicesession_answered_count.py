@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0008_exercisetemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practicesession',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0, help_text='Версия списка выполненных заданий для условной записи ответа', verbose_name='Число выполненных заданий'),
+        ),
+    ]
@@ -27,6 +27,24 @@ class Lesson(models.Model):
         verbose_name='Примерное время выполнения (минуты)'
     )
     xp_reward = models.IntegerField(default=100, verbose_name='Награда за прохождение (XP)')
+    content_version = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Версия содержимого',
+        help_text='Увеличивается при изменении урока, его заданий и слов'
+    )
+    build_key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Ключ автосборки',
+        help_text='Тема, уровень HSK и часть для уроков, собранных командой build_lessons'
+    )
+    build_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        verbose_name='Хеш исходных данных сборки'
+    )
     
     class Meta:
         verbose_name = 'Урок'
@@ -151,13 +169,243 @@ class DailyGoal(models.Model):
     
     def update_progress(self, xp=0, words=0, time_minutes=0):
         """Обновить прогресс дневной цели"""
-        self.current_xp += xp
-        self.current_words += words
-        self.current_time += time_minutes
+        DailyGoal.add_progress(self.user_id, xp=xp, words=words, time_minutes=time_minutes)
+        self.refresh_from_db(fields=['date', 'current_xp', 'current_words', 'current_time', 'completed'])
+    
+    @classmethod
+    def add_progress(cls, user, xp=0, words=0, time_minutes=0):
+        """
+        Атомарно увеличить прогресс дневной цели F-выражениями.
+        У пользователя одна строка цели: в новый день она сбрасывается.
+        Выполнение цели вычисляется в том же UPDATE (completed стоит первым в SET:
+        MySQL подставляет в следующие выражения уже обновлённые значения)
+        """
+        user_id = getattr(user, 'id', user)
+        today = timezone.now().date()
+        time_minutes = int(time_minutes)
+        
+        increments = {
+            'completed': models.Case(
+                models.When(
+                    models.Q(completed=True) | models.Q(
+                        target_xp__lte=models.F('current_xp') + xp,
+                        target_words__lte=models.F('current_words') + words,
+                        target_time__lte=models.F('current_time') + time_minutes
+                    ),
+                    then=models.Value(True)
+                ),
+                default=models.Value(False)
+            ),
+            'current_xp': models.F('current_xp') + xp,
+            'current_words': models.F('current_words') + words,
+            'current_time': models.F('current_time') + time_minutes,
+        }
         
-        if (self.current_xp >= self.target_xp and 
-            self.current_words >= self.target_words and
-            self.current_time >= self.target_time):
-            self.completed = True
+        if cls.objects.filter(user_id=user_id, date=today).update(**increments):
+            return
         
-        self.save()
\ No newline at end of file
+        reset = cls.objects.filter(user_id=user_id).exclude(date=today).update(
+            completed=models.Case(
+                models.When(
+                    models.Q(target_xp__lte=xp, target_words__lte=words, target_time__lte=time_minutes),
+                    then=models.Value(True)
+                ),
+                default=models.Value(False)
+            ),
+            date=today,
+            current_xp=xp,
+            current_words=words,
+            current_time=time_minutes
+        )
+        if reset:
+            return
+        
+        goal, created = cls.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'date': today,
+                'current_xp': xp,
+                'current_words': words,
+                'current_time': time_minutes
+            }
+        )
+        if created:
+            if goal.current_xp >= goal.target_xp and goal.current_words >= goal.target_words \
+                    and goal.current_time >= goal.target_time:
+                cls.objects.filter(pk=goal.pk).update(completed=True)
+        else:
+            # Строку успели создать или сбросить параллельно
+            cls.objects.filter(user_id=user_id).update(**increments)
+
+class WordDistractor(models.Model):
+    """
+    Заранее подобранный неправильный вариант ответа для слова
+    """
+    word = models.ForeignKey(
+        Word,
+        on_delete=models.CASCADE,
+        related_name='distractors',
+        verbose_name='Слово'
+    )
+    distractor = models.ForeignKey(
+        Word,
+        on_delete=models.CASCADE,
+        related_name='distractor_for',
+        verbose_name='Отвлекающее слово'
+    )
+    rank = models.PositiveSmallIntegerField(default=0, verbose_name='Место в пуле')
+    score = models.FloatField(default=0.0, verbose_name='Оценка правдоподобия')
+    
+    class Meta:
+        verbose_name = 'Отвлекающий вариант'
+        verbose_name_plural = 'Отвлекающие варианты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['word', 'distractor'],
+                name='unique_word_distractor'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['word', 'rank'], name='idx_distractor_word_rank'),
+        ]
+    
+    def __str__(self):
+        return f"{self.word.hanzi} -> {self.distractor.hanzi} ({self.score:.2f})"
+
+
+class ExerciseTemplate(models.Model):
+    """
+    Заранее подготовленные данные для генерации заданий по слову:
+    значения, формулировки и наборы неправильных вариантов из пула отвлекающих слов
+    """
+    word = models.OneToOneField(
+        Word,
+        on_delete=models.CASCADE,
+        related_name='exercise_template',
+        verbose_name='Слово'
+    )
+    glosses = models.JSONField(
+        default=list,
+        verbose_name='Значения',
+        help_text='Пары [значение, нормализованное значение]'
+    )
+    questions = models.JSONField(default=dict, verbose_name='Формулировки заданий по типам')
+    distractor_sets = models.JSONField(
+        default=list,
+        verbose_name='Наборы неправильных вариантов',
+        help_text='Для заданий с множественным выбором'
+    )
+    matching_pairs = models.JSONField(
+        default=list,
+        verbose_name='Слова для сопоставления',
+        help_text='Списки [id слова, иероглифы, пиньинь, перевод]'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+    
+    class Meta:
+        verbose_name = 'Шаблон заданий'
+        verbose_name_plural = 'Шаблоны заданий'
+    
+    def __str__(self):
+        return f"Шаблон заданий для слова {self.word_id}"
+
+
+class QueuedExercise(models.Model):
+    """
+    Заранее сгенерированное задание из очереди пользователя (резервная копия кэша)
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='queued_exercises',
+        verbose_name='Пользователь'
+    )
+    key = models.CharField(max_length=32, unique=True, verbose_name='Ключ задания')
+    word_ids = models.JSONField(default=list, verbose_name='Слова задания')
+    payload = models.JSONField(verbose_name='Задание')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    
+    class Meta:
+        verbose_name = 'Задание в очереди'
+        verbose_name_plural = 'Задания в очереди'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='idx_queued_user_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.payload.get('type')}"
+
+
+class PracticeSession(models.Model):
+    """
+    Сессия практики: правильные ответы на выданные задания для проверки на сервере
+    """
+    key = models.CharField(max_length=32, unique=True, verbose_name='Идентификатор сессии')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='practice_sessions',
+        verbose_name='Пользователь'
+    )
+    session_type = models.CharField(max_length=16, default='mixed', verbose_name='Тип сессии')
+    answers = models.JSONField(default=list, verbose_name='Ответы на задания')
+    answered = models.JSONField(default=list, verbose_name='Выполненные задания')
+    answered_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число выполненных заданий',
+        help_text='Версия списка выполненных заданий для условной записи ответа'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+    expires_at = models.DateTimeField(verbose_name='Действительна до')
+    
+    class Meta:
+        verbose_name = 'Сессия практики'
+        verbose_name_plural = 'Сессии практики'
+        indexes = [
+            models.Index(fields=['expires_at'], name='idx_practice_session_expires'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.key} ({len(self.answers)} заданий)"
+
+
+class TopicRecommendation(models.Model):
+    """
+    Предрассчитанная оценка темы для рекомендаций пользователю.
+    Пересчитывается после изменения прогресса по темам и периодически командой
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='topic_recommendations',
+        verbose_name='Пользователь'
+    )
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Тема'
+    )
+    score = models.FloatField(default=0.0, verbose_name='Оценка рекомендации')
+    mastery_level = models.PositiveSmallIntegerField(default=0, verbose_name='Уровень освоения')
+    accuracy = models.FloatField(default=0.0, verbose_name='Точность ответов')
+    words_known = models.IntegerField(default=0, verbose_name='Слов в словаре пользователя')
+    words_learned = models.IntegerField(default=0, verbose_name='Слов изучено')
+    total_words = models.IntegerField(default=0, verbose_name='Всего слов в теме')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Пересчитано')
+    
+    class Meta:
+        verbose_name = 'Рекомендация темы'
+        verbose_name_plural = 'Рекомендации тем'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'topic'],
+                name='unique_user_topic_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='idx_recommendation_score'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.topic.name} ({self.score:.2f})"
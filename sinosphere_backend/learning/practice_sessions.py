@@ -0,0 +1,162 @@
+import uuid
+from datetime import timedelta
+from functools import partial
+from typing import Dict, List, Optional
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import PracticeSession
+
+
+class PracticeSessionStore:
+    """
+    Хранилище выданных заданий и правильных ответов к ним.
+    Для каждого задания сохраняется только то, что нужно для проверки;
+    записи живут SESSION_TTL, кэш используется как быстрый слой перед БД.
+    Выполненные задания отмечаются в строке сессии условным UPDATE
+    по числу выполненных заданий, поэтому каждый ответ проверяется один раз
+    """
+    CACHE_KEY = 'learning:practice_session:{key}'
+    SESSION_TTL = timedelta(hours=6)
+
+    @classmethod
+    def create(cls, user, exercises: List[Dict], session_type='mixed') -> str:
+        """Сохранить задания сессии, возвращает session_id"""
+        return cls.create_from_records(
+            user,
+            [cls.answer_record(exercise) for exercise in exercises],
+            session_type
+        )
+
+    @classmethod
+    def create_from_records(cls, user, answers: List[Dict], session_type='mixed') -> str:
+        """Сохранить сессию по готовым записям для проверки ответов"""
+        key = uuid.uuid4().hex
+        expires_at = timezone.now() + cls.SESSION_TTL
+
+        PracticeSession.objects.create(
+            key=key,
+            user=user,
+            session_type=session_type,
+            answers=answers,
+            expires_at=expires_at
+        )
+        cls._save_to_cache(key, {
+            'user_id': user.id,
+            'answers': answers,
+            'answered': [],
+            'expires_at': expires_at
+        })
+        return key
+
+    @classmethod
+    def get(cls, user, key) -> Optional[Dict]:
+        """Получить действующую сессию пользователя"""
+        session = cache.get(cls.CACHE_KEY.format(key=key))
+
+        if session is None:
+            stored = PracticeSession.objects.filter(
+                key=key,
+                expires_at__gt=timezone.now()
+            ).values('user_id', 'answers', 'answered', 'expires_at').first()
+            if stored is None:
+                return None
+            session = stored
+            cls._save_to_cache(key, session)
+
+        if session['user_id'] != user.id or session['expires_at'] <= timezone.now():
+            return None
+        return session
+
+    @classmethod
+    def claim(cls, requested: Dict[str, List[int]], sessions: Dict[str, Dict]) -> Dict[str, List[int]]:
+        """
+        Отметить задания выполненными (вызывается внутри transaction.atomic).
+        requested - индексы заданий по сессиям, sessions - данные сессий из get().
+        Список сохраняется одним UPDATE при условии, что число выполненных заданий
+        в БД совпадает с кэшем; иначе строка блокируется и проверяется по БД.
+        Возвращает принятые индексы по сессиям, истёкших сессий в результате нет
+        """
+        now = timezone.now()
+        claimed = {}
+        for key, indexes in requested.items():
+            session = sessions[key]
+            answered = list(session['answered'])
+            accepted = [index for index in dict.fromkeys(indexes) if index not in answered]
+            if not accepted:
+                # Выполненные по кэшу задания уже отмечены в БД
+                claimed[key] = []
+                continue
+
+            updated = PracticeSession.objects.filter(
+                key=key,
+                expires_at__gt=now,
+                answered_count=len(answered)
+            ).update(answered=answered + accepted, answered_count=len(answered) + len(accepted))
+
+            if not updated:
+                stored = PracticeSession.objects.select_for_update().filter(
+                    key=key,
+                    expires_at__gt=now
+                ).values_list('answered', flat=True).first()
+                if stored is None:
+                    continue
+                answered = list(stored)
+                accepted = [index for index in dict.fromkeys(indexes) if index not in answered]
+                if accepted:
+                    PracticeSession.objects.filter(key=key).update(
+                        answered=answered + accepted,
+                        answered_count=len(answered) + len(accepted)
+                    )
+
+            claimed[key] = accepted
+            transaction.on_commit(partial(
+                cls._save_to_cache, key, {**session, 'answered': answered + accepted}
+            ))
+        return claimed
+
+    @classmethod
+    def clear_expired(cls) -> int:
+        """Удалить истёкшие сессии"""
+        deleted, _ = PracticeSession.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    @staticmethod
+    def answer_record(exercise: Dict) -> Dict:
+        """Компактная запись для проверки ответа на задание"""
+        exercise_type = exercise['type']
+        if exercise_type == 'translation':
+            exercise_type = 'translation_ru' if exercise.get('direction') == 'cn_to_ru' else 'translation_cn'
+
+        record = {'type': exercise_type}
+        if exercise.get('word_id'):
+            record['word_id'] = exercise['word_id']
+        if 'correct_index' in exercise:
+            record['correct_index'] = exercise['correct_index']
+            record['correct_answer'] = exercise['options'][exercise['correct_index']]
+        if 'correct_pairs' in exercise:
+            record['correct_pairs'] = [list(pair) for pair in exercise['correct_pairs']]
+            record['word_ids'] = exercise.get('word_ids', [])
+        return record
+
+    @staticmethod
+    def lesson_answer_record(exercise) -> Dict:
+        """Запись для проверки ответа на задание урока (Exercise)"""
+        record = {'type': exercise.exercise_type}
+        if exercise.word_id:
+            record['word_id'] = exercise.word_id
+        options = exercise.options if isinstance(exercise.options, list) else []
+        if exercise.exercise_type == 'multiple_choice' and exercise.correct_answer in options:
+            record['correct_index'] = options.index(exercise.correct_answer)
+            record['correct_answer'] = exercise.correct_answer
+        if exercise.exercise_type == 'matching':
+            # Пары урока выдаются в исходном порядке
+            record['correct_pairs'] = [[index, index] for index in range(len(options))]
+            record['word_ids'] = [exercise.word_id] + [word.id for word in exercise.additional_words.all()]
+        return record
+
+    @classmethod
+    def _save_to_cache(cls, key, session):
+        timeout = (session['expires_at'] - timezone.now()).total_seconds()
+        if timeout > 0:
+            cache.set(cls.CACHE_KEY.format(key=key), session, timeout=timeout)
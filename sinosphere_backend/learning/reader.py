@@ -0,0 +1,124 @@
+from typing import Dict
+from django.utils import timezone
+from dictionary.models import Word
+from dictionary.word_index import WordIndex
+from users.models import UserWord
+from users.word_bitset import KnownWordSet
+
+
+class TextReader:
+    """
+    Разметка текста словами пользователя для режима чтения
+    """
+    STATUS_KNOWN = 'known'
+    STATUS_LEARNING = 'learning'
+    STATUS_DUE = 'due'
+    STATUS_NEW = 'new'
+
+    STATUS_PRIORITY = {
+        STATUS_KNOWN: 3,
+        STATUS_DUE: 2,
+        STATUS_LEARNING: 1,
+        STATUS_NEW: 0,
+    }
+
+    def __init__(self, user):
+        self.user = user
+
+    def annotate(self, text: str) -> Dict:
+        """Разбить текст на слова и отметить статус каждого слова"""
+        tokens = WordIndex.get().segment(text)
+
+        word_ids = set()
+        for _, ids in tokens:
+            word_ids.update(ids)
+
+        statuses = self._get_word_statuses(word_ids)
+        words_info = self._get_words_info(word_ids)
+
+        counts = {status: 0 for status in self.STATUS_PRIORITY}
+        annotated_tokens = []
+
+        for fragment, ids in tokens:
+            if not ids:
+                annotated_tokens.append({
+                    'text': fragment,
+                    'word_id': None,
+                    'status': None
+                })
+                continue
+
+            word_id = max(
+                ids,
+                key=lambda wid: self.STATUS_PRIORITY[statuses.get(wid, self.STATUS_NEW)]
+            )
+            token_status = statuses.get(word_id, self.STATUS_NEW)
+            counts[token_status] += 1
+
+            annotated_tokens.append({
+                'text': fragment,
+                'word_id': word_id,
+                'status': token_status
+            })
+
+        total_words = sum(counts.values())
+        coverage = round(counts[self.STATUS_KNOWN] / total_words * 100, 1) if total_words > 0 else 0
+
+        return {
+            'tokens': annotated_tokens,
+            'words': words_info,
+            'counts': counts,
+            'total_words': total_words,
+            'unique_words': len(word_ids),
+            'coverage': coverage
+        }
+
+    def _get_word_statuses(self, word_ids) -> Dict[int, str]:
+        """Получить статусы слов по битовым множествам пользователя"""
+        if not word_ids:
+            return {}
+
+        word_set = KnownWordSet.for_user(self.user)
+        statuses = {}
+        in_progress_ids = []
+
+        for word_id in word_ids:
+            bucket = word_set.get_bucket(word_id)
+            if bucket is None or bucket == KnownWordSet.NEW:
+                statuses[word_id] = self.STATUS_NEW
+            elif word_set.contains(word_id, KnownWordSet.LEARNED):
+                statuses[word_id] = self.STATUS_KNOWN
+            else:
+                statuses[word_id] = self.STATUS_LEARNING
+                in_progress_ids.append(word_id)
+
+        if in_progress_ids:
+            due_ids = UserWord.objects.filter(
+                user=self.user,
+                word_id__in=in_progress_ids,
+                due__lte=timezone.now()
+            ).values_list('word_id', flat=True)
+
+            for word_id in due_ids:
+                statuses[word_id] = self.STATUS_DUE
+
+        return statuses
+
+    def _get_words_info(self, word_ids) -> Dict[int, Dict]:
+        """Получить краткую информацию о словах текста одним запросом"""
+        if not word_ids:
+            return {}
+
+        words = Word.objects.filter(id__in=word_ids).values(
+            'id', 'hanzi', 'pinyin_graphic', 'translation', 'difficulty'
+        )
+
+        return {
+            word['id']: {
+                'hanzi': word['hanzi'],
+                'pinyin': word['pinyin_graphic'],
+                'translation': word['translation'].split(';')[0].strip(),
+                'difficulty': word['difficulty']
+            }
+            for word in words
+        }
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Lesson, Exercise, UserLessonProgress, DailyGoal
+from .models import Lesson, Exercise, UserLessonProgress, DailyGoal, TopicRecommendation
 from dictionary.serializers import WordSerializer, TopicSerializer
 from users.models import UserLearningStats, UserTopicProgress
 
@@ -42,7 +42,7 @@ class LessonSerializer(serializers.ModelSerializer):
 
 
 class UserLessonProgressSerializer(serializers.ModelSerializer):
-    lesson_info = LessonSerializer(source='lesson', read_only=True)
+    lesson_info = serializers.SerializerMethodField()
     completion_percentage = serializers.SerializerMethodField()
     
     class Meta:
@@ -54,6 +54,13 @@ class UserLessonProgressSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user', 'started_at']
     
+    def get_lesson_info(self, obj):
+        # Уже собранные данные урока (например, из кэша) передаются через контекст
+        lesson_info = self.context.get('lesson_info')
+        if lesson_info is not None:
+            return lesson_info
+        return LessonSerializer(obj.lesson).data
+    
     def get_completion_percentage(self, obj):
         if obj.completed:
             return 100
@@ -104,24 +111,61 @@ class TopicProgressSerializer(serializers.ModelSerializer):
         return 0
 
 
+class TopicRecommendationSerializer(serializers.ModelSerializer):
+    topic_info = TopicSerializer(source='topic', read_only=True)
+    progress_percentage = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TopicRecommendation
+        fields = [
+            'id', 'topic', 'topic_info', 'score', 'mastery_level', 'accuracy',
+            'words_known', 'words_learned', 'total_words', 'progress_percentage'
+        ]
+    
+    def get_progress_percentage(self, obj):
+        if obj.total_words > 0:
+            return round((obj.words_learned / obj.total_words) * 100, 1)
+        return 0
+
+
 class ExerciseSubmissionSerializer(serializers.Serializer):
-    exercise_id = serializers.IntegerField(required=False)
-    word_id = serializers.IntegerField(required=True)
-    answer = serializers.CharField(required=True)
-    exercise_type = serializers.CharField(required=True)
+    """Ответ на задание выданной сессии (задания вне сессий не проверяются)"""
+    session_id = serializers.CharField(max_length=32)
+    exercise_index = serializers.IntegerField(min_value=0)
+    answer = serializers.JSONField()
     time_spent = serializers.FloatField(default=0)
     
     def validate(self, data):
-        from dictionary.models import Word
-        try:
-            word = Word.objects.get(id=data['word_id'])
-        except Word.DoesNotExist:
-            raise serializers.ValidationError({"word_id": "Слово не найдено"})
+        from .practice_sessions import PracticeSessionStore
+        
+        session = PracticeSessionStore.get(self.context['request'].user, data['session_id'])
+        if session is None:
+            raise serializers.ValidationError({"session_id": "Сессия не найдена или истекла"})
+        if data['exercise_index'] >= len(session['answers']):
+            raise serializers.ValidationError({"exercise_index": "Задание не найдено"})
+        # Быстрая проверка по кэшу, окончательная - по строке сессии при записи ответа
+        if data['exercise_index'] in session['answered']:
+            raise serializers.ValidationError({"exercise_index": "Ответ на задание уже отправлен"})
+        
+        exercise = session['answers'][data['exercise_index']]
+        word_id = exercise.get('word_id') or next(iter(exercise.get('word_ids', [])), None)
+        if word_id is None:
+            raise serializers.ValidationError({"exercise_index": "Задание не проверяется"})
         
-        data['word'] = word
+        data['session'] = session
+        data['exercise'] = exercise
+        data['word_id'] = word_id
         return data
 
 
+class ExerciseBatchSubmissionSerializer(serializers.Serializer):
+    answers = ExerciseSubmissionSerializer(many=True, allow_empty=False, max_length=100)
+
+
+class ReaderTextSerializer(serializers.Serializer):
+    text = serializers.CharField(required=True, max_length=100000, trim_whitespace=False)
+
+
 class LearningStatsSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     daily_goals_completed = serializers.SerializerMethodField()
@@ -155,18 +199,30 @@ class LearningStatsSerializer(serializers.ModelSerializer):
 
 
 class GeneratedExerciseSerializer(serializers.Serializer):
+    ANSWER_FIELDS = ('correct_answer', 'correct_index', 'correct_pairs')
+    
     type = serializers.CharField()
-    question = serializers.CharField()
-    word_id = serializers.IntegerField()
+    direction = serializers.CharField(required=False)
+    question = serializers.CharField(required=False)
+    word_id = serializers.IntegerField(required=False)
+    hanzi = serializers.CharField(required=False)
+    pinyin = serializers.CharField(required=False, allow_blank=True)
+    translation = serializers.CharField(required=False, allow_blank=True)
     options = serializers.ListField(child=serializers.CharField(), required=False)
     correct_answer = serializers.CharField(required=False)
-    hint = serializers.CharField(required=False, allow_blank=True)
+    correct_index = serializers.IntegerField(required=False)
+    correct_pairs = serializers.ListField(child=serializers.ListField(), required=False)
+    hint = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    exercise_index = serializers.IntegerField(required=False)
     difficulty = serializers.IntegerField(default=1)
     pairs = serializers.ListField(child=serializers.DictField(), required=False)
+    stroke_data = serializers.DictField(required=False)
     instructions = serializers.CharField(required=False)
+    parameters = serializers.DictField(required=False)
     
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        if 'correct_answer' in data and self.context.get('hide_answer', True):
-            del data['correct_answer']
+        if self.context.get('hide_answer', True):
+            for field in self.ANSWER_FIELDS:
+                data.pop(field, None)
         return data
\ No newline at end of file
@@ -0,0 +1,279 @@
+import random
+from typing import List, Dict
+from dictionary.models import Word
+from dictionary.answer_matcher import AnswerMatcher
+from users.models import UserWord, UserExerciseTypeStats
+from users.word_bitset import KnownWordSet
+from .difficulty_estimator import DifficultyEstimator
+from .exercise_generator import ExerciseGenerator
+from .models import WordDistractor
+from .word_sampler import WordSampler
+
+
+class SessionPlanner(ExerciseGenerator):
+    """
+    Планировщик сессии практики.
+    Очередь повторений, кандидаты в новые слова и шаблоны заданий
+    загружаются один раз, после чего задания собираются в памяти
+    """
+    EXERCISE_TYPES = ['translation_ru', 'translation_cn', 'matching', 'multiple_choice', 'writing', 'fill_gap']
+    SESSION_EXERCISE_TYPES = {
+        'review': ['translation_ru', 'multiple_choice'],
+        'new': ['translation_cn', 'matching'],
+    }
+    REVIEW_CANDIDATES = 10
+    NEW_CANDIDATES = 10
+    SPARE_WORDS_PER_EXERCISE = 4
+
+    def __init__(self, user, topic_id=None, session_type='mixed', exclude_word_ids=None):
+        super().__init__(user, topic_id)
+        self.session_type = session_type
+        self.exclude_word_ids = set(exclude_word_ids or ())
+        self.word_set = None
+        self.review_queue = []
+        self.new_candidates = []
+        self.pending_reviews = 0
+        self.type_counts = {}
+        self.distractors = {}
+        self.spare_words = []
+        self.matchers = {}
+        self.planned_word_ids = []
+
+    def plan(self, count: int, add_words: bool = True) -> List[Dict]:
+        """
+        Составить сессию из count заданий.
+        planned_word_ids после вызова содержит id слов каждого задания
+        """
+        self._load(count)
+
+        slots = []
+        for _ in range(count):
+            exercise_type = self._select_exercise_type()
+            words = self._select_words_for_exercise(exercise_type)
+            if words:
+                slots.append((exercise_type, words))
+
+        self._load_distractors(slots)
+        parameters = self._estimate_parameters(slots)
+
+        # Задания на сопоставление добираются словами из пулов при генерации
+        exercises = [
+            self._generate_exercise(exercise_type, words)
+            for exercise_type, words in slots
+        ]
+        self.planned_word_ids = [
+            exercise.get('word_ids') or [exercise['word_id']] for exercise in exercises
+        ]
+        for exercise, exercise_parameters in zip(exercises, parameters):
+            exercise['parameters'] = exercise_parameters
+
+        if add_words and self.session_type != 'review':
+            self._add_words_to_dictionary(exercises, slots)
+
+        return exercises
+
+    def _load(self, count: int):
+        """Загрузить данные пользователя для всей сессии"""
+        self.word_set = KnownWordSet.for_user(self.user)
+
+        review_queue = self._get_review_queue(
+            max(count * 3 + self.REVIEW_CANDIDATES, self.PENDING_REVIEWS_LIMIT)
+        )
+        self.pending_reviews = len(review_queue)
+        self.review_queue = [
+            uw.word for uw in review_queue
+            if uw.word_id not in self.exclude_word_ids
+        ]
+
+        self.new_candidates = [
+            word for word in self._load_new_candidates(count)
+            if word.id not in self.exclude_word_ids
+        ]
+
+        if self.session_type not in self.SESSION_EXERCISE_TYPES:
+            self.type_counts = UserExerciseTypeStats.get_type_counts(self.user)
+
+        exclude_ids = {word.id for word in self.review_queue} | self.exclude_word_ids
+        exclude_ids.update(word.id for word in self.new_candidates)
+        self.spare_words = WordSampler(topic_id=self.topic_id or None).sample(
+            count * self.SPARE_WORDS_PER_EXERCISE,
+            exclude_ids
+        )
+
+    def _load_new_candidates(self, count: int) -> List[Word]:
+        """Кандидаты в новые слова одним запросом (по темам пользователя)"""
+        query = self._get_new_words_query(self.word_set)
+
+        if self.word_set.count() == 0:
+            query = query.filter(difficulty=1)
+
+        return list(query[:max(count, self.NEW_CANDIDATES * 2)])
+
+    def _load_distractors(self, slots):
+        """
+        Загрузить шаблоны заданий и вхождения в предложения слов сессии,
+        пулы отвлекающих вариантов для слов без шаблонов и значения
+        слов без шаблонов и запасных слов
+        """
+        word_ids = {word.id for _, words in slots for word in words}
+        self._load_templates(word_ids)
+        self._load_sentences({words[0].id for exercise_type, words in slots if exercise_type == 'fill_gap'})
+
+        anchor_ids = {words[0].id for _, words in slots if not self.templates.get(words[0].id)}
+        if anchor_ids:
+            distractors = WordDistractor.objects.filter(
+                word_id__in=anchor_ids,
+                rank__lt=self.DISTRACTOR_CANDIDATES
+            ).select_related('distractor').order_by('word_id', 'rank')
+
+            for item in distractors:
+                self.distractors.setdefault(item.word_id, []).append(item.distractor)
+
+        # Запасными словами дополняются и задания с шаблонами (сопоставление),
+        # поэтому их значения загружаются всегда
+        word_ids = {word_id for word_id in word_ids if not self.templates.get(word_id)}
+        word_ids.update(word.id for words in self.distractors.values() for word in words)
+        word_ids.update(word.id for word in self.spare_words)
+        self.matchers = AnswerMatcher.for_words(word_ids)
+
+    def _estimate_parameters(self, slots) -> List[Dict]:
+        """Параметры заданий по сложности основного слова, одним пакетом на сессию"""
+        return DifficultyEstimator.adjust_many(
+            self.user,
+            [words[0].id for _, words in slots],
+            [words[0].difficulty for _, words in slots],
+            [exercise_type for exercise_type, _ in slots]
+        )
+
+    def _get_known_bits(self) -> int:
+        return self.word_set.all_bits
+
+    def _select_exercise_type(self) -> str:
+        """Выбрать тип задания по гистограмме, обновляемой в памяти"""
+        if self.session_type in self.SESSION_EXERCISE_TYPES:
+            return random.choice(self.SESSION_EXERCISE_TYPES[self.session_type])
+
+        if not self.type_counts:
+            exercise_type = random.choice(['translation_ru', 'multiple_choice'])
+        elif random.random() < 0.7:
+            exercise_type = min(self.type_counts, key=self.type_counts.get)
+        else:
+            exercise_type = random.choice(self.EXERCISE_TYPES)
+
+        recent, total = self.type_counts.get(exercise_type, (0, 0))
+        self.type_counts[exercise_type] = (recent + 1, total + 1)
+        return exercise_type
+
+    def _select_words_for_exercise(self, exercise_type: str) -> List[Word]:
+        """Выбрать слова для задания из загруженных очередей"""
+        words = []
+
+        review_count = min(
+            len(self.review_queue),
+            self.REVIEW_CANDIDATES,
+            3 if exercise_type == 'matching' else 1
+        )
+        for word in random.sample(self.review_queue[:self.REVIEW_CANDIDATES], review_count):
+            self.review_queue.remove(word)
+            words.append(word)
+
+        if random.random() < self._calculate_new_word_ratio(self.pending_reviews) and len(words) < 4:
+            if self.new_candidates:
+                word = random.choice(self.new_candidates[:self.NEW_CANDIDATES])
+                self.new_candidates.remove(word)
+                words.append(word)
+
+        return words
+
+    def _get_additional_words(self, count_needed: int, related_words: List[Word] = None) -> List[Word]:
+        """Дополнительные слова из загруженного пула или запасных слов"""
+        exclude_ids = {word.id for word in related_words or []}
+        additional = []
+
+        if related_words:
+            for word in self.distractors.get(related_words[0].id, []):
+                if len(additional) >= count_needed:
+                    break
+                if word.id in exclude_ids or self.word_set.contains(word.id):
+                    continue
+                additional.append(word)
+                exclude_ids.add(word.id)
+
+        if len(additional) < count_needed:
+            additional.extend(self._get_random_words(
+                count_needed - len(additional),
+                exclude_ids,
+                self.word_set.all_bits
+            ))
+
+        return additional
+
+    def _get_random_words(self, count: int, exclude_ids=None, exclude_bits: int = 0) -> List[Word]:
+        """Случайные слова из запасного набора, загруженного на старте сессии"""
+        exclude_ids = exclude_ids or set()
+        words = [
+            word for word in self.spare_words
+            if word.id not in exclude_ids and not (exclude_bits >> word.id) & 1
+        ][:count]
+
+        for word in words:
+            self.spare_words.remove(word)
+
+        return words
+
+    def _get_wrong_translations(self, correct_word: Word, count: int) -> List[str]:
+        """Неправильные варианты перевода из загруженного пула"""
+        other_words = list(self.distractors.get(correct_word.id, []))
+        random.shuffle(other_words)
+
+        if len(other_words) < count:
+            other_words.extend(random.sample(
+                self.spare_words,
+                min(len(self.spare_words), count * 3)
+            ))
+
+        correct_matcher = self.matchers.get(correct_word.id)
+        correct_translations = set(correct_matcher.glosses) if correct_matcher else set()
+
+        wrong_translations = []
+        for word in other_words:
+            if len(wrong_translations) >= count:
+                break
+            translation = self._get_random_translation(word, self.matchers)
+            if (translation and translation not in wrong_translations
+                    and translation not in correct_translations):
+                wrong_translations.append(translation)
+
+        return wrong_translations
+
+    def _add_words_to_dictionary(self, exercises: List[Dict], slots):
+        """Добавить слова заданий в словарь пользователя одним запросом"""
+        from .exercise_queue import ExerciseQueue
+
+        words = {word.id: word for _, slot_words in slots for word in slot_words}
+        word_ids = {
+            exercise['word_id'] for exercise in exercises
+            if exercise.get('word_id') in words and not self.word_set.contains(exercise['word_id'])
+        }
+        if not word_ids:
+            return
+
+        created_user_words = UserWord.objects.bulk_create(
+            [
+                UserWord(
+                    user=self.user,
+                    word=words[word_id],
+                    state=0,
+                    difficulty=words[word_id].difficulty,
+                    stability=1.0
+                )
+                for word_id in word_ids
+            ],
+            ignore_conflicts=True
+        )
+
+        # bulk_create не вызывает сигналы: множества обновляются под блокировкой строки,
+        # оценки сложности и очередь заданий сбрасываются явно
+        self.word_set = KnownWordSet.record_words(self.user, created_user_words)
+        DifficultyEstimator.invalidate(self.user)
+        ExerciseQueue(self.user).invalidate()
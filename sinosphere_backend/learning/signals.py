@@ -0,0 +1,97 @@
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from dictionary.models import Word, Topic, Tag, WordTag
+from users.models import UserWord, UserTopicProgress
+from .background import run_after_commit
+from .difficulty_estimator import DifficultyEstimator
+from .exercise_templates import ExerciseTemplateBuilder
+from .exercise_queue import ExerciseQueue
+from .lesson_payloads import LessonPayloadCache
+from .models import Lesson, Exercise
+from .topic_recommendations import TopicRecommender
+
+
+@receiver(post_save, sender=UserWord)
+def discard_queued_exercises(sender, instance, **kwargs):
+    """Убрать из очереди задания со словом, расписание которого изменилось"""
+    ExerciseQueue(instance.user_id).discard_word(instance.word_id)
+
+
+@receiver(post_delete, sender=UserWord)
+def reset_exercise_queue(sender, instance, **kwargs):
+    """Сбросить очередь заданий при удалении слова из словаря"""
+    ExerciseQueue(instance.user_id).invalidate()
+
+
+@receiver(post_save, sender=UserWord)
+@receiver(post_delete, sender=UserWord)
+def invalidate_word_difficulty(sender, instance, **kwargs):
+    """Сбросить оценки сложности слов пользователя после изменения его словаря"""
+    DifficultyEstimator.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Lesson)
+def bump_lesson_version(sender, instance, **kwargs):
+    """Новая версия содержимого урока после его изменения"""
+    LessonPayloadCache.bump([instance.pk])
+    instance.content_version += 1
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def bump_exercise_lesson_version(sender, instance, **kwargs):
+    """Новая версия урока после изменения его задания"""
+    LessonPayloadCache.bump([instance.lesson_id])
+
+
+@receiver(post_save, sender=Word)
+def bump_word_lessons_version(sender, instance, **kwargs):
+    """Новая версия уроков, задания которых используют слово"""
+    LessonPayloadCache.bump(Lesson.objects.filter(exercises__word=instance))
+
+
+@receiver(post_save, sender=Word)
+def refresh_exercise_templates(sender, instance, **kwargs):
+    """Пересобрать шаблоны заданий слова и слов, для которых оно служит отвлекающим вариантом"""
+    run_after_commit(ExerciseTemplateBuilder().refresh_word, instance.id)
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def bump_topic_lessons_version(sender, instance, **kwargs):
+    """
+    Новая версия уроков темы и родительской темы
+    (в данные урока входит информация о теме с числом подтем)
+    """
+    LessonPayloadCache.bump(Lesson.objects.filter(
+        topic_id__in=[instance.id, instance.parent_topic_id]
+    ))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_lessons_version(sender, instance, **kwargs):
+    """
+    Новая версия уроков темы тега и её родительской темы
+    (число тегов и слов темы в данных урока)
+    """
+    if instance.topic_id:
+        LessonPayloadCache.bump(Lesson.objects.filter(
+            Q(topic_id=instance.topic_id) | Q(topic__subtopics__id=instance.topic_id)
+        ))
+
+
+@receiver(post_save, sender=WordTag)
+@receiver(post_delete, sender=WordTag)
+def bump_word_tag_lessons_version(sender, instance, **kwargs):
+    """Новая версия уроков темы, в которую добавлено или из которой убрано слово, и её родительской темы"""
+    LessonPayloadCache.bump(Lesson.objects.filter(
+        Q(topic__tags__id=instance.tag_id) | Q(topic__subtopics__tags__id=instance.tag_id)
+    ))
+
+
+@receiver(post_save, sender=UserTopicProgress)
+def refresh_topic_recommendations(sender, instance, **kwargs):
+    """Пересчитать рекомендации тем после изменения прогресса пользователя"""
+    run_after_commit(TopicRecommender().refresh, instance.user_id)
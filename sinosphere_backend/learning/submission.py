@@ -0,0 +1,333 @@
+from functools import partial
+from typing import Dict, List
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from dictionary.answer_matcher import AnswerMatcher
+from dictionary.models import Word
+from dictionary.utils import bulk_upsert
+from dictionary.word_index import WordIndex
+from users.models import (
+    UserWord, ReviewLog, UserExerciseHistory, UserExerciseTypeStats, UserLearningStats,
+    UserTopicProgress, LearningScheduler
+)
+from users.word_bitset import KnownWordSet
+from .background import run_in_background
+from .difficulty_estimator import DifficultyEstimator
+from .exercise_queue import ExerciseQueue
+from .models import DailyGoal
+from .practice_sessions import PracticeSessionStore
+from .topic_recommendations import TopicRecommender
+
+
+def check_answer(exercise_type, user_answer, word_id, exercise_data=None, matcher=None) -> Dict:
+    """Проверить правильность ответа по сохранённой на сервере записи задания"""
+    matcher = matcher or AnswerMatcher.for_word(word_id)
+    if matcher is None:
+        return {'error': 'Слово не найдено'}
+
+    result = {
+        'is_correct': False,
+        'correct_answer': '',
+        'explanation': ''
+    }
+
+    if exercise_type == 'translation_ru':
+        match = matcher.match(str(user_answer))
+
+        if match:
+            matched_translation, typos = match
+            result['is_correct'] = True
+            result['correct_answer'] = matched_translation
+            if typos:
+                result['explanation'] = f"Ответ засчитан с опечаткой, правильно: {matched_translation}"
+        else:
+            result['is_correct'] = False
+            result['correct_answer'] = matcher.primary
+            result['explanation'] = f"Правильный перевод: {matcher.primary}"
+
+    elif exercise_type in ('translation_cn', 'writing', 'fill_gap'):
+        correct_answer = matcher.hanzi
+
+        if matcher.matches_hanzi(str(user_answer)):
+            result['is_correct'] = True
+            result['correct_answer'] = correct_answer
+        else:
+            result['is_correct'] = False
+            result['correct_answer'] = correct_answer
+            result['explanation'] = f"Правильный ответ: {correct_answer} ({matcher.pinyin})"
+
+    elif exercise_type == 'multiple_choice':
+        try:
+            selected_index = int(user_answer)
+            if exercise_data and 'correct_index' in exercise_data:
+                result['is_correct'] = (selected_index == exercise_data['correct_index'])
+                result['correct_answer'] = exercise_data.get('correct_answer', '')
+        except (TypeError, ValueError):
+            result['is_correct'] = False
+
+    elif exercise_type == 'matching':
+        if isinstance(user_answer, list) and exercise_data:
+            # user_answer: список пар [индекс_китайского, индекс_перевода]
+            # exercise_data['correct_pairs']: список правильных пар
+            correct_pairs = exercise_data.get('correct_pairs', [])
+            try:
+                user_pairs = [list(pair) for pair in user_answer]
+            except TypeError:
+                user_pairs = []
+
+            if sorted(correct_pairs) == sorted(user_pairs):
+                result['is_correct'] = True
+            else:
+                result['is_correct'] = False
+                result['explanation'] = "Не все пары сопоставлены правильно"
+
+    return result
+
+
+class SubmissionPipeline:
+    """
+    Обработка ответов на задания.
+    Задания сессий отмечаются выполненными до проверки, ответы применяются к карточкам
+    FSRS в памяти. В транзакции запроса записываются отметка сессии, карточки, ReviewLog,
+    история и статистика с серией дней и уровнем - не больше QUERY_BUDGET запросов
+    на одиночный ответ (на MySQL новая карточка добавляет SELECT её id).
+    Битовые множества, дневная цель и прогресс по темам обновляются F-выражениями
+    сразу после фиксации в том же запросе; в фоне обновляются только производные
+    данные: статистика по типам упражнений (пересобирается командой
+    reconcile_exercise_type_stats) и рекомендации тем
+    """
+    XP_CORRECT = 15
+    XP_INCORRECT = 5
+    QUERY_BUDGET = 6
+
+    def __init__(self, user):
+        self.user = user
+
+    def submit(self, submissions: List[Dict]) -> List[Dict]:
+        """
+        Обработать проверенные сериализатором ответы.
+        Возвращает результат для каждого ответа (или {'error': ...})
+        """
+        with transaction.atomic():
+            requested = {}
+            sessions = {}
+            for submission in submissions:
+                requested.setdefault(submission['session_id'], []).append(submission['exercise_index'])
+                sessions[submission['session_id']] = submission['session']
+            # Задание считается выполненным с момента отметки, даже если ответ не удалось проверить
+            claimed = PracticeSessionStore.claim(requested, sessions)
+
+            results, graded, reviewed, new_words, history, review_logs = self._grade(submissions, claimed)
+            if not graded:
+                return results
+
+            created = [user_word for word_id, user_word in reviewed.items() if word_id in new_words]
+            updated = [user_word for word_id, user_word in reviewed.items() if word_id not in new_words]
+
+            if created:
+                self._create_user_words(created)
+            if updated:
+                UserWord.objects.bulk_update(updated, UserWord.REVIEW_FIELDS)
+            ReviewLog.objects.bulk_create(review_logs)
+            UserExerciseHistory.objects.bulk_create(history)
+
+            xp = sum(result['xp_earned'] for result in graded)
+            time_spent = sum(result['time_spent'] for result in graded)
+            UserLearningStats.add_progress(
+                self.user,
+                exercises=len(graded),
+                xp=xp,
+                time_spent=time_spent
+            )
+
+            self._update_cached_word_states(reviewed.values())
+            transaction.on_commit(
+                partial(
+                    self._apply_progress,
+                    list(reviewed.values()),
+                    self._topic_results(graded),
+                    [item.exercise_type for item in history],
+                    xp,
+                    time_spent
+                ),
+                robust=True
+            )
+
+        DifficultyEstimator.invalidate(self.user)
+        if len(reviewed) == 1:
+            ExerciseQueue(self.user).discard_word(next(iter(reviewed)))
+        else:
+            ExerciseQueue(self.user).invalidate()
+
+        for result in graded:
+            del result['time_spent']
+            del result['learned_change']
+
+        return results
+
+    def _grade(self, submissions: List[Dict], claimed: Dict[str, List[int]]):
+        """
+        Проверить ответы и применить их к карточкам в памяти.
+        claimed - индексы заданий, отмеченных этим запросом, по сессиям
+        """
+        user_words, new_words = self._get_user_words({submission['word_id'] for submission in submissions})
+        words = {word_id: user_word.word for word_id, user_word in user_words.items()}
+        matchers = AnswerMatcher.for_words(words.keys(), words=words)
+        scheduler = LearningScheduler.get_scheduler(user=self.user)
+        review_date = timezone.now()
+
+        results = []
+        review_logs = []
+        history = []
+        reviewed = {}
+        used = set()
+
+        for submission in submissions:
+            session_id = submission['session_id']
+            exercise_index = submission['exercise_index']
+            if session_id not in claimed:
+                results.append({'error': 'Сессия не найдена или истекла'})
+                continue
+            if exercise_index not in claimed[session_id] or (session_id, exercise_index) in used:
+                results.append({'error': 'Ответ на задание уже отправлен'})
+                continue
+            used.add((session_id, exercise_index))
+
+            word = words.get(submission['word_id'])
+            if word is None:
+                results.append({'error': 'Слово не найдено'})
+                continue
+
+            exercise = submission['exercise']
+            exercise_type = exercise['type']
+            response_time = submission.get('time_spent', 0)
+
+            check_result = check_answer(
+                exercise_type, submission['answer'], word.id, exercise, matchers.get(word.id)
+            )
+            if check_result.get('error'):
+                results.append({'error': check_result['error']})
+                continue
+
+            is_correct = check_result['is_correct']
+            user_word = user_words[word.id]
+            was_learned = user_word.is_learned
+            review_log = user_word.apply_review(
+                is_correct,
+                response_time,
+                exercise_type,
+                scheduler=scheduler,
+                review_date=review_date
+            )
+            review_logs.append(review_log)
+            reviewed[word.id] = user_word
+
+            history.append(UserExerciseHistory(
+                user=self.user,
+                exercise_type=exercise_type,
+                word=word,
+                is_correct=is_correct,
+                time_spent=response_time,
+                difficulty=word.difficulty
+            ))
+
+            xp = self.XP_CORRECT if is_correct else self.XP_INCORRECT
+            results.append({
+                'word_id': word.id,
+                'is_correct': is_correct,
+                'correct_answer': check_result.get('correct_answer'),
+                'explanation': check_result.get('explanation'),
+                'rating': review_log.rating,
+                'next_review': user_word.due,
+                'mastery_score': user_word.mastery_score,
+                'xp_earned': xp,
+                'is_learned': user_word.is_learned,
+                'consecutive_correct': user_word.consecutive_correct,
+                'time_spent': response_time,
+                'learned_change': int(user_word.is_learned) - int(was_learned)
+            })
+
+        graded = [result for result in results if 'error' not in result]
+        return results, graded, reviewed, new_words, history, review_logs
+
+    def _get_user_words(self, word_ids):
+        """
+        Слова пакета вместе с карточками пользователя одним запросом.
+        Для слов без карточки создаются несохранённые карточки,
+        возвращает (карточки по id слова, id слов новых карточек)
+        """
+        words = Word.objects.filter(id__in=word_ids).annotate(
+            card=FilteredRelation('user_words', condition=Q(user_words__user=self.user))
+        ).select_related('card')
+
+        user_words = {}
+        missing = set()
+        for word in words:
+            user_word = getattr(word, 'card', None)
+            if user_word is None:
+                user_word = UserWord(
+                    user=self.user,
+                    due=timezone.now(),
+                    state=0,
+                    difficulty=8.0
+                )
+                missing.add(word.id)
+            user_word.word = word
+            user_words[word.id] = user_word
+
+        return user_words, missing
+
+    def _create_user_words(self, user_words: List[UserWord]):
+        """Вставить новые карточки (upsert на случай параллельного добавления слова)"""
+        bulk_upsert(UserWord, user_words, ['user', 'word'], UserWord.REVIEW_FIELDS)
+
+        # Не все СУБД возвращают id при вставке (MySQL)
+        if any(user_word.pk is None for user_word in user_words):
+            ids = dict(UserWord.objects.filter(
+                user=self.user,
+                word_id__in=[user_word.word_id for user_word in user_words]
+            ).values_list('word_id', 'id'))
+            for user_word in user_words:
+                user_word.pk = ids[user_word.word_id]
+
+    def _update_cached_word_states(self, user_words):
+        """Отразить новые состояния карточек в закэшированных битовых множествах"""
+        word_set = KnownWordSet.from_cache(self.user)
+        if word_set is not None:
+            for user_word in user_words:
+                word_set.set_word(user_word.word_id, user_word.state, user_word.is_learned)
+            word_set.save(persist=False)
+
+    def _apply_progress(self, user_words, topic_results, exercise_types, xp, time_spent):
+        """
+        Обновить битовые множества, дневную цель и прогресс по темам после фиксации ответа.
+        Пересчёт статистики по типам упражнений и рекомендаций тем уходит в фон
+        """
+        # bulk_update не вызывает сигналы, поэтому множества обновляются явно
+        KnownWordSet.record_words(self.user, user_words)
+        DailyGoal.add_progress(self.user, xp=xp, time_minutes=time_spent / 60.0)
+        if topic_results:
+            UserTopicProgress.add_results(self.user, topic_results)
+
+        run_in_background(self._apply_side_effects, exercise_types, bool(topic_results))
+
+    def _apply_side_effects(self, exercise_types: List[str], refresh_topics: bool):
+        """Отложенное обновление производных данных после ответа"""
+        UserExerciseTypeStats.record(self.user, exercise_types)
+        if refresh_topics:
+            TopicRecommender().refresh(self.user)
+
+    def _topic_results(self, graded: List[Dict]) -> Dict[int, tuple]:
+        """Приращения попыток и изученных слов по темам слов пакета"""
+        index = WordIndex.get()
+        topic_results = {}
+        for result in graded:
+            for topic_id in index.get_word_topics(result['word_id']):
+                attempts, correct, learned = topic_results.get(topic_id, (0, 0, 0))
+                topic_results[topic_id] = (
+                    attempts + 1,
+                    correct + int(result['is_correct']),
+                    learned + result['learned_change']
+                )
+        return topic_results
@@ -1,3 +1,982 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipIf
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dictionary.models import ExampleSentence, SentenceOccurrence, Word, Topic, Tag, WordTag
+from dictionary.word_index import WordIndex
+from django.utils import timezone
+from users.models import (
+    UserWord, ReviewLog, UserExerciseHistory, UserExerciseTypeStats, UserLearningStats, UserTopicProgress,
+    LearningScheduler
+)
+from users.response_times import ResponseTimeTables
+from users.word_bitset import KnownWordSet
+from .models import (
+    DailyGoal, Exercise, ExerciseTemplate, Lesson, QueuedExercise, TopicRecommendation, WordDistractor
+)
+from .difficulty_estimator import DifficultyEstimator
+from .distractor_pools import DistractorPoolBuilder
+from .exercise_generator import ExerciseGenerator
+from .exercise_templates import ExerciseTemplateBuilder
+from .practice_sessions import PracticeSessionStore
+from .reader import TextReader
+from .session_planner import SessionPlanner
+from .topic_recommendations import TopicRecommender
+from .submission import SubmissionPipeline
 
-# Create your tests here.
+
+@override_settings(LEARNING_BACKGROUND_SYNC=True)
+class SubmitExerciseQueryBudgetTest(TestCase):
+    """Одиночная отправка ответа укладывается в фиксированное число запросов"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.word = Word.objects.create(
+            hanzi='你好',
+            pinyin_graphic='nǐ hǎo',
+            translation='привет; здравствуйте',
+            difficulty=1
+        )
+        # Слово входит в две темы
+        self.topics = [
+            Topic.objects.create(name='Приветствия'),
+            Topic.objects.create(name='Вежливость')
+        ]
+        for index, topic in enumerate(self.topics):
+            tag = Tag.objects.create(name=f'tag{index}', topic=topic)
+            WordTag.objects.create(word=self.word, tag=tag)
+        # Активный пользователь: строки статистики, дневной цели, прогресса по темам
+        # и битовых множеств уже есть, индекс словаря, веса FSRS и таблицы времени ответа загружены
+        UserLearningStats.objects.create(user=self.user)
+        DailyGoal.objects.create(user=self.user)
+        for topic in self.topics:
+            UserTopicProgress.objects.create(user=self.user, topic=topic, total_words=1)
+        KnownWordSet.rebuild(self.user)
+        WordIndex.get()
+        LearningScheduler.get_user_weights(self.user)
+        ResponseTimeTables.get()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_session(self):
+        exercise = {
+            'type': 'translation',
+            'direction': 'cn_to_ru',
+            'word_id': self.word.id
+        }
+        return PracticeSessionStore.create(self.user, [exercise], 'single')
+
+    def _submit(self, session_id, answer='привет'):
+        """
+        Отправить ответ; возвращает ответ и запросы транзакции запроса
+        (без SAVEPOINT тестовой транзакции и без обновлений после фиксации)
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('submit-exercise'),
+                    {
+                        'session_id': session_id,
+                        'exercise_index': 0,
+                        'answer': answer,
+                        'time_spent': 5
+                    },
+                    format='json'
+                )
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+
+    def test_existing_word_within_budget(self):
+        UserWord.objects.create(user=self.user, word=self.word)
+        session_id = self._create_session()
+
+        response, queries = self._submit(session_id)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['is_correct'])
+        self.assertLessEqual(
+            len(queries), SubmissionPipeline.QUERY_BUDGET, '\n'.join(queries)
+        )
+        user_word = UserWord.objects.get(user=self.user, word=self.word)
+        self.assertEqual(user_word.total_attempts, 1)
+        self.assertEqual(ReviewLog.objects.filter(user_word=user_word).count(), 1)
+        # История и XP записываются в транзакции запроса, а не в фоне
+        self.assertEqual(UserExerciseHistory.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            UserLearningStats.objects.get(user=self.user).xp_points, SubmissionPipeline.XP_CORRECT
+        )
+        # Дневная цель и прогресс по темам обновляются сразу после фиксации
+        self.assertEqual(DailyGoal.objects.get(user=self.user).current_xp, SubmissionPipeline.XP_CORRECT)
+        for progress in UserTopicProgress.objects.filter(user=self.user):
+            self.assertEqual(progress.total_attempts, 1)
+            self.assertEqual(progress.total_correct, 1)
+
+    def test_new_word_within_budget(self):
+        session_id = self._create_session()
+
+        response, queries = self._submit(session_id, answer='здравствуйте')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['is_correct'])
+        self.assertLessEqual(
+            len(queries), SubmissionPipeline.QUERY_BUDGET, '\n'.join(queries)
+        )
+        user_word = UserWord.objects.get(user=self.user, word=self.word)
+        self.assertEqual(ReviewLog.objects.filter(user_word=user_word).count(), 1)
+
+    def test_resubmit_rejected(self):
+        session_id = self._create_session()
+
+        self._submit(session_id)
+        response, _ = self._submit(session_id)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AddWordsToDictionaryTest(TestCase):
+    """Слова новой сессии добавляются в словарь без потери параллельных изменений"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.learned_word = Word.objects.create(hanzi='你', pinyin_graphic='nǐ', translation='ты', difficulty=1)
+        self.new_word = Word.objects.create(hanzi='好', pinyin_graphic='hǎo', translation='хороший', difficulty=1)
+
+    def test_stale_snapshot_not_written_back(self):
+        planner = SessionPlanner(self.user)
+        planner.word_set = KnownWordSet.for_user(self.user)
+        # Параллельный ответ отмечает слово изученным после загрузки сессии
+        learned = UserWord.objects.create(user=self.user, word=self.learned_word, state=2, is_learned=True)
+        KnownWordSet.record_words(self.user, [learned])
+        cache.set(DifficultyEstimator.CACHE_KEY.format(user_id=self.user.id), {self.new_word.id: 0.5})
+
+        planner._add_words_to_dictionary(
+            [{'type': 'translation_cn', 'word_id': self.new_word.id}],
+            [('translation_cn', [self.new_word])]
+        )
+
+        self.assertTrue(UserWord.objects.filter(user=self.user, word=self.new_word).exists())
+        self.assertIsNone(cache.get(DifficultyEstimator.CACHE_KEY.format(user_id=self.user.id)))
+        cache.clear()
+        word_set = KnownWordSet.for_user(self.user)
+        self.assertTrue(word_set.contains(self.learned_word.id, KnownWordSet.LEARNED))
+        self.assertTrue(word_set.contains(self.new_word.id))
+
+
+class RefillExerciseQueuesCommandTest(TestCase):
+    """Команда пополняет очереди пользователей, занимавшихся за последние дни"""
+
+    def setUp(self):
+        cache.clear()
+        for index, (hanzi, translation) in enumerate([
+            ('你', 'ты'), ('好', 'хороший'), ('我', 'я'), ('他', 'он'),
+            ('是', 'быть'), ('人', 'человек'), ('大', 'большой'), ('小', 'маленький')
+        ]):
+            Word.objects.create(hanzi=hanzi, pinyin_graphic=f'p{index}', translation=translation, difficulty=1)
+        today = timezone.now().date()
+        self.active = User.objects.create_user(username='active', password='password')
+        UserLearningStats.objects.create(user=self.active, last_activity_date=today)
+        self.inactive = User.objects.create_user(username='inactive', password='password')
+        UserLearningStats.objects.create(user=self.inactive, last_activity_date=today - timedelta(days=30))
+
+    def test_recently_active_user_queue_filled(self):
+        call_command('refill_exercise_queues', days=7, stdout=StringIO())
+
+        self.assertTrue(QueuedExercise.objects.filter(user=self.active).exists())
+        self.assertFalse(QueuedExercise.objects.filter(user=self.inactive).exists())
+
+
+class TextReaderTest(TestCase):
+    """Режим чтения размечает слова текста статусами из словаря пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='password')
+        self.words = {
+            hanzi: Word.objects.create(hanzi=hanzi, pinyin_graphic=pinyin, translation=translation, difficulty=1)
+            for hanzi, pinyin, translation in [
+                ('我', 'wǒ', 'я'),
+                ('喜欢', 'xǐhuan', 'нравиться; любить'),
+                ('学习', 'xuéxí', 'учиться'),
+                ('中文', 'zhōngwén', 'китайский язык'),
+            ]
+        }
+        now = timezone.now()
+        UserWord.objects.create(user=self.user, word=self.words['我'], state=2, is_learned=True)
+        UserWord.objects.create(user=self.user, word=self.words['喜欢'], state=2, due=now - timedelta(days=1))
+        UserWord.objects.create(user=self.user, word=self.words['中文'], state=1, due=now + timedelta(days=1))
+        KnownWordSet.rebuild(self.user)
+
+    def test_annotate(self):
+        result = TextReader(self.user).annotate('我喜欢学习中文。')
+
+        self.assertEqual(
+            [(token['text'], token['status']) for token in result['tokens']],
+            [('我', 'known'), ('喜欢', 'due'), ('学习', 'new'), ('中文', 'learning'), ('。', None)]
+        )
+        self.assertEqual(result['tokens'][1]['word_id'], self.words['喜欢'].id)
+        self.assertEqual(result['counts'], {'known': 1, 'due': 1, 'learning': 1, 'new': 1})
+        self.assertEqual(result['total_words'], 4)
+        self.assertEqual(result['unique_words'], 4)
+        self.assertEqual(result['coverage'], 25.0)
+        self.assertEqual(result['words'][self.words['喜欢'].id]['translation'], 'нравиться')
+
+    def test_annotate_view(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.post(reverse('reader-annotate'), {'text': '我学习'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.data),
+            {'tokens', 'words', 'counts', 'total_words', 'unique_words', 'coverage'}
+        )
+        self.assertEqual([token['status'] for token in response.data['tokens']], ['known', 'new'])
+        self.assertEqual(client.post(reverse('reader-annotate'), {}, format='json').status_code, 400)
+
+
+class DistractorPoolBuilderTest(TestCase):
+    """Пулы отвлекающих вариантов строятся из других слов соседних уровней HSK"""
+
+    def setUp(self):
+        words = [
+            ('一', 'один', 1), ('二', 'два', 1), ('三', 'три', 2), ('四', 'четыре', 2),
+            ('医生', 'врач', 4), ('经济', 'экономика', 4), ('哲学', 'философия', 6), ('宇宙', 'вселенная', 6),
+        ]
+        for hanzi, translation, difficulty in words:
+            Word.objects.create(hanzi=hanzi, pinyin_graphic=hanzi, translation=translation, difficulty=difficulty)
+
+    def test_ranks_exclude_word_and_stay_in_band(self):
+        created = DistractorPoolBuilder(pool_size=5, block_size=3).build()
+
+        rows = list(WordDistractor.objects.values_list(
+            'word_id', 'distractor_id', 'rank', 'word__difficulty', 'distractor__difficulty'
+        ).order_by('word_id', 'rank'))
+        self.assertEqual(len(rows), created)
+        self.assertTrue(rows)
+        for word_id, distractor_id, _, difficulty, distractor_difficulty in rows:
+            self.assertNotEqual(word_id, distractor_id)
+            self.assertLessEqual(abs(difficulty - distractor_difficulty), DistractorPoolBuilder.DIFFICULTY_BAND)
+
+        # Ранги внутри пула идут подряд с нуля
+        pools = {}
+        for word_id, _, rank, _, _ in rows:
+            pools.setdefault(word_id, []).append(rank)
+        for ranks in pools.values():
+            self.assertEqual(ranks, list(range(len(ranks))))
+
+
+class ReviewQueueTest(TestCase):
+    """Очередь повторений собирается двумя выборками с LIMIT"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        now = timezone.now()
+        self.cards = {}
+        for index, (state, due_days) in enumerate([
+            (2, -10), (0, -1), (1, -5), (0, -3), (2, -2), (2, 3), (0, 2)
+        ]):
+            word = Word.objects.create(
+                hanzi=chr(0x4e00 + index), pinyin_graphic=f'p{index}', translation=f'слово {index}', difficulty=1
+            )
+            self.cards[index] = UserWord.objects.create(
+                user=self.user, word=word, state=state, due=now + timedelta(days=due_days)
+            )
+
+    def _queue_indexes(self, generator, limit):
+        ids = {card.id: index for index, card in self.cards.items()}
+        return [ids[user_word.id] for user_word in generator._get_review_queue(limit)]
+
+    def test_new_cards_first_then_overdue(self):
+        generator = ExerciseGenerator(self.user)
+
+        # Сначала новые просроченные карточки по due, затем остальные по давности due
+        self.assertEqual(self._queue_indexes(generator, 10), [3, 1, 0, 2, 4])
+        self.assertEqual(self._queue_indexes(generator, 3), [3, 1, 0])
+        self.assertEqual(self._queue_indexes(generator, 1), [3])
+
+    def test_topic_filter(self):
+        topic = Topic.objects.create(name='Тема')
+        tag = Tag.objects.create(name='tag', topic=topic)
+        for index in (0, 1, 5):
+            WordTag.objects.create(word=self.cards[index].word, tag=tag)
+
+        self.assertEqual(self._queue_indexes(ExerciseGenerator(self.user, topic.id), 10), [1, 0])
+
+    def test_new_word_ratio_without_count(self):
+        generator = ExerciseGenerator(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            generator._select_words_for_exercise('translation_ru')
+
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(generator._calculate_new_word_ratio(5), 0.3)
+        self.assertAlmostEqual(generator._calculate_new_word_ratio(ExerciseGenerator.PENDING_REVIEWS_LIMIT), 0.09)
+
+
+@override_settings(LEARNING_BACKGROUND_SYNC=True)
+class SubmitExerciseBatchTest(TestCase):
+    """Пакетная отправка даёт те же результаты и счётчики, что и одиночные ответы"""
+    CARD_FIELDS = ['state', 'reps', 'lapses', 'total_attempts', 'correct_attempts', 'consecutive_correct', 'is_learned']
+    STATS_FIELDS = ['total_exercises_completed', 'total_time_spent', 'xp_points', 'level', 'current_streak']
+
+    def setUp(self):
+        cache.clear()
+        self.hello = Word.objects.create(hanzi='你好', pinyin_graphic='nǐ hǎo', translation='привет', difficulty=1)
+        self.thanks = Word.objects.create(hanzi='谢谢', pinyin_graphic='xièxie', translation='спасибо', difficulty=1)
+        topic = Topic.objects.create(name='Вежливость')
+        tag = Tag.objects.create(name='polite', topic=topic)
+        WordTag.objects.create(word=self.hello, tag=tag)
+        WordTag.objects.create(word=self.thanks, tag=tag)
+
+    def _start(self, username):
+        user = User.objects.create_user(username=username, password='password')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        session_id = PracticeSessionStore.create(user, [
+            {'type': 'translation', 'direction': 'cn_to_ru', 'word_id': self.hello.id},
+            {'type': 'translation', 'direction': 'cn_to_ru', 'word_id': self.thanks.id},
+        ], 'mixed')
+        return user, client, session_id
+
+    def _answers(self, session_id):
+        # Правильный ответ, неправильный и повтор первого задания
+        return [
+            {'session_id': session_id, 'exercise_index': 0, 'answer': 'привет', 'time_spent': 60},
+            {'session_id': session_id, 'exercise_index': 1, 'answer': 'пока', 'time_spent': 60},
+            {'session_id': session_id, 'exercise_index': 0, 'answer': 'привет', 'time_spent': 60},
+        ]
+
+    def _state(self, user):
+        cards = {
+            user_word.word_id: {field: getattr(user_word, field) for field in self.CARD_FIELDS}
+            for user_word in UserWord.objects.filter(user=user)
+        }
+        stats = UserLearningStats.objects.filter(user=user).values(*self.STATS_FIELDS).get()
+        goal = DailyGoal.objects.filter(user=user).values('current_xp', 'current_time').get()
+        topics = list(UserTopicProgress.objects.filter(user=user).values(
+            'topic_id', 'total_attempts', 'total_correct', 'words_learned'
+        ))
+        return cards, stats, goal, topics, ReviewLog.objects.filter(user_word__user=user).count()
+
+    def test_mixed_batch_matches_single_submits(self):
+        batch_user, client, session_id = self._start('batch')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                reverse('submit-exercise-batch'), {'answers': self._answers(session_id)}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results']
+        self.assertTrue(results[0]['is_correct'])
+        self.assertEqual(results[0]['xp_earned'], SubmissionPipeline.XP_CORRECT)
+        self.assertFalse(results[1]['is_correct'])
+        self.assertEqual(results[1]['correct_answer'], 'спасибо')
+        self.assertEqual(results[2], {'error': 'Ответ на задание уже отправлен'})
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['correct'], 1)
+        self.assertEqual(
+            response.data['xp_earned'], SubmissionPipeline.XP_CORRECT + SubmissionPipeline.XP_INCORRECT
+        )
+
+        single_user, client, session_id = self._start('single')
+        statuses = []
+        for answer in self._answers(session_id):
+            with self.captureOnCommitCallbacks(execute=True):
+                statuses.append(client.post(reverse('submit-exercise'), answer, format='json').status_code)
+        self.assertEqual(statuses, [200, 200, 400])
+
+        batch_state = self._state(batch_user)
+        single_state = self._state(single_user)
+        self.assertEqual(batch_state, single_state)
+        self.assertEqual(batch_state[1]['total_exercises_completed'], 2)
+        self.assertEqual(batch_state[4], 2)
+
+
+@override_settings(LEARNING_BACKGROUND_SYNC=True)
+class ExerciseTemplateTest(TestCase):
+    """Шаблоны заданий строятся из пулов отвлекающих вариантов и обновляются при изменении слов"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.table = Word.objects.create(hanzi='桌子', pinyin_graphic='zhuōzi', translation='стол; парта', difficulty=1)
+        self.chair = Word.objects.create(hanzi='椅子', pinyin_graphic='yǐzi', translation='стул', difficulty=1)
+        stand = Word.objects.create(hanzi='台', pinyin_graphic='tái', translation='стол', difficulty=1)
+        self.bed = Word.objects.create(hanzi='床', pinyin_graphic='chuáng', translation='кровать', difficulty=1)
+        self.door = Word.objects.create(hanzi='门', pinyin_graphic='mén', translation='дверь', difficulty=1)
+        WordDistractor.objects.bulk_create([
+            WordDistractor(word=self.table, distractor=word, rank=rank)
+            for rank, word in enumerate([self.chair, stand, self.bed, self.door])
+        ])
+
+    def test_build(self):
+        output = StringIO()
+        call_command('build_exercise_templates', stdout=output)
+        self.assertIn('Сохранено шаблонов: 5', output.getvalue())
+
+        template = ExerciseTemplate.objects.get(word=self.table)
+        self.assertEqual(template.glosses, [['стол', 'стол'], ['парта', 'парта']])
+        self.assertEqual(template.questions['translation_cn'], [
+            'Как будет **стол** по-китайски?', 'Как будет **парта** по-китайски?'
+        ])
+        # Совпадающий перевод другого слова не становится неправильным вариантом
+        self.assertEqual(template.distractor_sets[0], ['стул', 'кровать', 'дверь'])
+        for distractor_set in template.distractor_sets:
+            self.assertEqual(sorted(distractor_set), ['дверь', 'кровать', 'стул'])
+        self.assertEqual([pair[0] for pair in template.matching_pairs], [self.chair.id, self.bed.id, self.door.id])
+
+    def test_distractor_change_refreshes_template(self):
+        ExerciseTemplateBuilder().build()
+
+        self.chair.translation = 'табурет'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chair.save()
+
+        template = ExerciseTemplate.objects.get(word=self.table)
+        self.assertEqual(template.distractor_sets[0], ['табурет', 'кровать', 'дверь'])
+
+    def test_generator_uses_template(self):
+        ExerciseTemplateBuilder().build()
+        generator = ExerciseGenerator(self.user)
+        generator._load_templates([self.table.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            exercise = generator._generate_multiple_choice_exercise(self.table)
+        self.assertEqual(len(queries), 0)
+
+        self.assertEqual(
+            exercise['question'], 'Выберите правильный перевод слова: **桌子** (zhuōzi)'
+        )
+        correct = exercise['options'][exercise['correct_index']]
+        self.assertIn(correct, ['стол', 'парта'])
+        self.assertEqual(
+            sorted(option for option in exercise['options'] if option != correct), ['дверь', 'кровать', 'стул']
+        )
+
+
+class FillGapExerciseTest(TestCase):
+    """Задания на заполнение пропуска строятся по индексу вхождений слов в предложения"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.words = {
+            hanzi: Word.objects.create(hanzi=hanzi, pinyin_graphic=pinyin, translation=translation, difficulty=1)
+            for hanzi, pinyin, translation in [
+                ('我', 'wǒ', 'я'), ('喜欢', 'xǐhuan', 'любить'), ('喝', 'hē', 'пить'), ('茶', 'chá', 'чай')
+            ]
+        }
+        self.tea = self.words['茶']
+        self.readable = ExampleSentence.objects.create(
+            word=self.tea, chinese_sentence='我喜欢喝茶。', pinyin_sentence='wǒ xǐhuan hē chá',
+            translation='Я люблю пить чай.', difficulty=1
+        )
+        # Два иероглифа вне словаря: пользователь не сможет прочитать предложение
+        ExampleSentence.objects.create(
+            word=self.tea, chinese_sentence='她喝茶吗？', pinyin_sentence='tā hē chá ma',
+            translation='Она пьёт чай?', difficulty=1
+        )
+
+    def _learn(self, *hanzi):
+        UserWord.objects.bulk_create([UserWord(user=self.user, word=self.words[item]) for item in hanzi])
+        KnownWordSet.rebuild(self.user)
+
+    def _fill_gap(self):
+        generator = ExerciseGenerator(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            generator._load_sentences([self.tea.id])
+        self.assertEqual(len(queries), 1)
+        return generator._generate_exercise('fill_gap', [self.tea])
+
+    def test_occurrences_indexed_on_save(self):
+        occurrence = SentenceOccurrence.objects.get(word=self.tea, sentence=self.readable)
+        self.assertEqual((occurrence.offset, occurrence.length, occurrence.unknown_tokens), (4, 1, 0))
+        self.assertEqual(
+            sorted(occurrence.context_word_ids),
+            sorted(self.words[hanzi].id for hanzi in ('我', '喜欢', '喝'))
+        )
+
+        output = StringIO()
+        call_command('build_sentence_index', stdout=output)
+        self.assertEqual(SentenceOccurrence.objects.filter(word=self.tea).count(), 2)
+        self.assertIn(f'Создано вхождений слов: {SentenceOccurrence.objects.count()}', output.getvalue())
+
+    def test_readable_sentence_selected(self):
+        self._learn('我', '喜欢', '喝')
+
+        exercise = self._fill_gap()
+
+        self.assertEqual(exercise['type'], 'fill_gap')
+        self.assertEqual(exercise['question'], '我喜欢喝＿。')
+        self.assertEqual(exercise['translation'], 'Я люблю пить чай.')
+        self.assertEqual(exercise['correct_answer'], '茶')
+
+    def test_falls_back_to_translation(self):
+        self._learn('喝')
+
+        exercise = self._fill_gap()
+
+        self.assertEqual(exercise['type'], 'translation')
+        self.assertEqual(exercise['word_id'], self.tea.id)
+
+
+class LessonBuilderTest(TestCase):
+    """Повторная сборка уроков не трогает неизменившиеся уроки"""
+
+    def setUp(self):
+        cache.clear()
+        self.topic = Topic.objects.create(name='Еда')
+        tag = Tag.objects.create(name='food', topic=self.topic)
+        self.words = []
+        for index, translation in enumerate(['рис', 'чай', 'вода', 'мясо', 'рыба', 'суп', 'хлеб', 'яйцо', 'сок']):
+            word = Word.objects.create(
+                hanzi=chr(0x4e00 + index), pinyin_graphic=f'p{index}', translation=translation, difficulty=1
+            )
+            WordTag.objects.create(word=word, tag=tag)
+            self.words.append(word)
+
+    def _build(self):
+        output = StringIO()
+        call_command('build_lessons', stdout=output)
+        return output.getvalue()
+
+    def _lessons(self):
+        return {
+            lesson.build_key: lesson
+            for lesson in Lesson.objects.filter(topic=self.topic).prefetch_related('exercises')
+        }
+
+    def test_rebuild_is_idempotent(self):
+        self.assertIn('Создано уроков: 2', self._build())
+        lessons = self._lessons()
+        first = lessons[f'{self.topic.id}:1:1']
+        self.assertEqual(
+            sorted(exercise.exercise_type for exercise in first.exercises.all()),
+            ['matching'] * 2 + ['multiple_choice'] * 8 + ['translation_cn'] * 8 + ['translation_ru'] * 8
+        )
+        self.assertEqual(lessons[f'{self.topic.id}:1:2'].exercises.count(), 2)
+
+        self.assertIn('обновлено: 0, без изменений: 2, отключено: 0', self._build())
+        for key, lesson in self._lessons().items():
+            self.assertEqual(lesson.content_version, lessons[key].content_version)
+            self.assertEqual(lesson.build_hash, lessons[key].build_hash)
+            self.assertEqual(
+                {exercise.id for exercise in lesson.exercises.all()},
+                {exercise.id for exercise in lessons[key].exercises.all()}
+            )
+
+    def test_changed_and_removed_words(self):
+        self._build()
+        lessons = self._lessons()
+        first = lessons[f'{self.topic.id}:1:1']
+
+        self.words[0].translation = 'рис; каша'
+        self.words[0].save()
+        WordTag.objects.filter(word=self.words[8]).delete()
+
+        self.assertIn('обновлено: 1, без изменений: 0, отключено: 1', self._build())
+        rebuilt = self._lessons()
+        self.assertNotEqual(rebuilt[first.build_key].build_hash, first.build_hash)
+        self.assertGreater(rebuilt[first.build_key].content_version, first.content_version)
+        self.assertFalse(rebuilt[f'{self.topic.id}:1:2'].is_active)
+
+
+class LessonPayloadVersionTest(TestCase):
+    """Данные начатого урока обновляются после изменения слов и тегов темы"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.parent = Topic.objects.create(name='Люди')
+        self.topic = Topic.objects.create(name='Семья', parent_topic=self.parent)
+        self.tag = Tag.objects.create(name='family', topic=self.topic)
+        self.word = Word.objects.create(hanzi='妈妈', pinyin_graphic='māma', translation='мама', difficulty=1)
+        WordTag.objects.create(word=self.word, tag=self.tag)
+        self.lesson = Lesson.objects.create(title='Семья', topic=self.topic)
+        self.parent_lesson = Lesson.objects.create(title='Люди', topic=self.parent)
+        Exercise.objects.create(
+            lesson=self.lesson,
+            exercise_type='translation_ru',
+            question='妈妈',
+            correct_answer='мама',
+            word=self.word
+        )
+
+    def _start(self):
+        response = self.client.post(reverse('start-lesson', args=[self.lesson.id]))
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_word_edit_changes_payload(self):
+        self.assertEqual(self._start()['exercises'][0]['word_info']['translation'], 'мама')
+
+        self.word.translation = 'мама; мать'
+        self.word.save()
+
+        self.assertEqual(self._start()['exercises'][0]['word_info']['translation'], 'мама; мать')
+
+    def test_word_tag_edit_changes_payload(self):
+        self.assertEqual(self._start()['lesson']['topic_info']['words_count'], 1)
+        parent_version = Lesson.objects.get(id=self.parent_lesson.id).content_version
+
+        word = Word.objects.create(hanzi='爸爸', pinyin_graphic='bàba', translation='папа', difficulty=1)
+        WordTag.objects.create(word=word, tag=self.tag)
+
+        self.assertEqual(self._start()['lesson']['topic_info']['words_count'], 2)
+        self.assertGreater(Lesson.objects.get(id=self.parent_lesson.id).content_version, parent_version)
+
+
+class ExerciseTypeStatsTest(TestCase):
+    """Счётчики типов заданий ведутся по ответам и сверяются командой с историей"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.word = Word.objects.create(hanzi='你好', pinyin_graphic='nǐ hǎo', translation='привет', difficulty=1)
+        self.types = ['translation_ru'] * 40 + ['matching'] * 15 + ['writing'] * 5
+        UserExerciseHistory.objects.bulk_create([
+            UserExerciseHistory(user=self.user, exercise_type=exercise_type, word=self.word, is_correct=True)
+            for exercise_type in self.types
+        ])
+
+    def test_record(self):
+        UserExerciseTypeStats.record(self.user, ['matching', 'writing'])
+        UserExerciseTypeStats.record(self.user, ['matching'])
+
+        self.assertEqual(UserExerciseTypeStats.get_type_counts(self.user), {'matching': (2, 2), 'writing': (1, 1)})
+
+    def test_reconcile_command(self):
+        # Счётчики разошлись с историей (например, фоновая задача не выполнилась)
+        UserExerciseTypeStats.objects.create(user=self.user, counts={'matching': 1}, recent=['matching'])
+
+        call_command('reconcile_exercise_type_stats', batch_size=1, stdout=StringIO())
+
+        stats = UserExerciseTypeStats.objects.get(user=self.user)
+        self.assertEqual(stats.counts, {'translation_ru': 40, 'matching': 15, 'writing': 5})
+        self.assertEqual(stats.recent, self.types[-UserExerciseTypeStats.RECENT_WINDOW:])
+        self.assertEqual(
+            UserExerciseTypeStats.get_type_counts(self.user),
+            {'translation_ru': (30, 40), 'matching': (15, 15), 'writing': (5, 5)}
+        )
+
+
+class TopicListViewTest(TestCase):
+    """Список тем создаёт прогресс при первом посещении и сериализуется без запросов на тему"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.parent = Topic.objects.create(name='Люди', order=1)
+        Topic.objects.create(name='Семья', parent_topic=self.parent, order=2)
+        Topic.objects.create(name='Архив', is_active=False)
+        for index, hanzi in enumerate(['妈妈', '爸爸']):
+            tag = Tag.objects.create(name=f'people{index}', topic=self.parent)
+            word = Word.objects.create(hanzi=hanzi, pinyin_graphic=hanzi, translation=hanzi, difficulty=1)
+            WordTag.objects.create(word=word, tag=tag)
+        WordIndex.get()
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('topic-list'))
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_first_visit_and_counts(self):
+        data, first_queries = self._get()
+
+        self.assertEqual([item['topic_info']['name'] for item in data], ['Люди', 'Семья'])
+        parent = data[0]
+        self.assertEqual(parent['total_words'], 2)
+        self.assertEqual(
+            (parent['topic_info']['subtopics_count'], parent['topic_info']['tags_count'],
+             parent['topic_info']['words_count']),
+            (1, 2, 2)
+        )
+        self.assertEqual(UserTopicProgress.objects.filter(user=self.user).count(), 2)
+
+        data, _ = self._get()
+        self.assertEqual(len(data), 2)
+        self.assertEqual(UserTopicProgress.objects.filter(user=self.user).count(), 2)
+
+        # Число запросов не зависит от количества тем
+        for index in range(5):
+            Topic.objects.create(name=f'Новая тема {index}', order=10 + index)
+        data, queries = self._get()
+        self.assertEqual(len(data), 7)
+        self.assertEqual(queries, first_queries)
+
+
+class TopicRecommenderTest(TestCase):
+    """Рекомендации тем пересчитываются в таблицу и отдаются по убыванию оценки"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.topics = {}
+        for name, difficulty, hanzi_list in [
+            ('easy', 1, ['一', '二']),
+            ('hard', 4, ['经济', '政治']),
+            ('mastered', 1, ['三']),
+            ('learned', 1, ['四']),
+            ('empty', 1, []),
+        ]:
+            topic = Topic.objects.create(name=name, difficulty_level=difficulty)
+            tag = Tag.objects.create(name=f'tag_{name}', topic=topic)
+            for hanzi in hanzi_list:
+                word = Word.objects.create(hanzi=hanzi, pinyin_graphic=hanzi, translation=hanzi, difficulty=difficulty)
+                WordTag.objects.create(word=word, tag=tag)
+            self.topics[name] = topic
+
+        UserWord.objects.create(user=self.user, word=Word.objects.get(hanzi='一'), state=1)
+        UserWord.objects.create(user=self.user, word=Word.objects.get(hanzi='四'), state=2, is_learned=True)
+        KnownWordSet.rebuild(self.user)
+        UserTopicProgress.objects.create(user=self.user, topic=self.topics['easy'], total_words=2, is_active=True)
+        UserTopicProgress.objects.create(
+            user=self.user, topic=self.topics['mastered'], total_words=1, mastery_level=5
+        )
+
+    def _recommended(self):
+        return dict(TopicRecommendation.objects.filter(user=self.user).values_list('topic__name', 'score'))
+
+    def test_refresh(self):
+        self.assertEqual(TopicRecommender().refresh(self.user), 2)
+
+        scores = self._recommended()
+        # Освоенные, полностью изученные и пустые темы не рекомендуются
+        self.assertEqual(set(scores), {'easy', 'hard'})
+        self.assertGreater(scores['easy'], scores['hard'])
+        easy = TopicRecommendation.objects.get(user=self.user, topic=self.topics['easy'])
+        self.assertEqual((easy.words_known, easy.words_learned, easy.total_words), (1, 0, 2))
+
+        # Освоенная тема убирается из рекомендаций при пересчёте
+        UserTopicProgress.objects.filter(user=self.user, topic=self.topics['easy']).update(mastery_level=5)
+        TopicRecommender().refresh(self.user)
+        self.assertEqual(set(self._recommended()), {'hard'})
+
+    def test_view_computes_for_new_user_and_limits(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.get(reverse('recommended-topics'), {'limit': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['topic_info']['name'] for item in response.data], ['easy'])
+        response = client.get(reverse('recommended-topics'), {'limit': 0})
+        self.assertEqual(len(response.data), 1)
+
+
+class DifficultyEstimatorTest(TestCase):
+    """Пакетная оценка сложности совпадает с поштучной формулой и кэшируется до повторения"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.known = Word.objects.create(hanzi='你好', pinyin_graphic='nǐ hǎo', translation='привет', difficulty=1)
+        self.fresh = Word.objects.create(hanzi='经济', pinyin_graphic='jīngjì', translation='экономика', difficulty=4)
+        UserWord.objects.create(
+            user=self.user, word=self.known, avg_response_time=5.0,
+            total_attempts=4, correct_attempts=3, stability=73.0
+        )
+
+    def test_estimate_many(self):
+        word_ids = [self.known.id, self.fresh.id, self.fresh.id, self.fresh.id, self.fresh.id]
+        types = ['translation_ru', 'translation_ru', 'translation_cn', 'writing', 'fill_gap']
+
+        with CaptureQueriesContext(connection) as queries:
+            estimates = DifficultyEstimator.estimate_many(
+                self.user, word_ids, [self.known.difficulty] + [self.fresh.difficulty] * 4, types
+            )
+        self.assertEqual(len(queries), 1)
+
+        # История: 0.5 * 4 + 0.25 * 4 + 0.8 * 2; без истории - уровень HSK и смещение типа
+        self.assertAlmostEqual(estimates[0], 4.6)
+        self.assertEqual(estimates[1:].tolist(), [4.0, 6.0, 7.0, 4.0])
+        self.assertAlmostEqual(
+            DifficultyEstimator.estimate_word_difficulty_for_user(self.user, self.fresh, 'writing'), 7.0
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            DifficultyEstimator.estimate_many(self.user, [self.known.id], [1])
+        self.assertEqual(len(queries), 0)
+
+    def test_invalidated_after_review(self):
+        DifficultyEstimator.estimate_many(self.user, [self.known.id], [1])
+
+        UserWord.objects.filter(user=self.user, word=self.known).update(correct_attempts=4)
+        DifficultyEstimator.invalidate(self.user)
+
+        self.assertAlmostEqual(DifficultyEstimator.estimate_many(self.user, [self.known.id], [1])[0], 3.6)
+
+    def test_adjust_many(self):
+        parameters = DifficultyEstimator.adjust_many(
+            self.user, [self.fresh.id, self.fresh.id], [6, 6], ['translation_ru', 'writing']
+        )
+
+        self.assertEqual(parameters[0], {
+            'time_limit': 33, 'hints_available': 1, 'show_pinyin': False, 'show_character': False
+        })
+        self.assertEqual(parameters[1], {'time_limit': 42, 'hints_available': 2})
+
+
+class AtomicCountersTest(TestCase):
+    """Счётчики статистики и дневной цели обновляются F-выражениями"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+
+    def test_level_up_after_increment(self):
+        UserLearningStats.add_progress(self.user, exercises=1, xp=350)
+
+        stats = UserLearningStats.objects.get(user=self.user)
+        # 100 очков на 2 уровень, 200 - на 3, остаётся 50
+        self.assertEqual(stats.level, 3)
+        self.assertEqual(stats.xp_points, 50)
+        self.assertEqual(stats.total_exercises_completed, 1)
+
+    def test_streak(self):
+        UserLearningStats.objects.create(
+            user=self.user,
+            current_streak=4,
+            longest_streak=4,
+            last_activity_date=timezone.now().date() - timedelta(days=1)
+        )
+
+        UserLearningStats.add_progress(self.user, exercises=1)
+        UserLearningStats.add_progress(self.user, exercises=1)
+
+        stats = UserLearningStats.objects.get(user=self.user)
+        self.assertEqual(stats.current_streak, 5)
+        self.assertEqual(stats.longest_streak, 5)
+        self.assertEqual(stats.total_exercises_completed, 2)
+
+    def test_daily_goal_reset_and_completion(self):
+        DailyGoal.objects.create(
+            user=self.user,
+            date=timezone.now().date() - timedelta(days=1),
+            current_xp=80,
+            target_xp=20,
+            target_words=0,
+            target_time=0
+        )
+
+        DailyGoal.add_progress(self.user, xp=10)
+        goal = DailyGoal.objects.get(user=self.user)
+        self.assertEqual(goal.date, timezone.now().date())
+        self.assertEqual(goal.current_xp, 10)
+        self.assertFalse(goal.completed)
+
+        DailyGoal.add_progress(self.user, xp=10)
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_xp, 20)
+        self.assertTrue(goal.completed)
+
+
+def sqlite_without_concurrent_writes() -> bool:
+    """
+    Тестовая база SQLite не выдерживает параллельных транзакций записи:
+    база в памяти (по умолчанию без TEST['NAME']) или режим транзакций не IMMEDIATE,
+    при котором повышение блокировки сразу падает с "database is locked"
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    test_name = connection.settings_dict['TEST']['NAME']
+    if not test_name or connection.creation.is_in_memory_db(test_name):
+        return True
+    return connection.settings_dict['OPTIONS'].get('transaction_mode') != 'IMMEDIATE'
+
+
+@skipIf(
+    sqlite_without_concurrent_writes(),
+    "Для SQLite нужна файловая тестовая база (TEST['NAME']) и OPTIONS['transaction_mode'] = 'IMMEDIATE'"
+)
+@override_settings(LEARNING_BACKGROUND_SYNC=True)
+class ConcurrentSubmitTest(TransactionTestCase):
+    """Параллельные ответы с разных устройств не теряют увеличения счётчиков"""
+    THREADS = 8
+    SUBMITS_PER_THREAD = 5
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.word = Word.objects.create(
+            hanzi='你好',
+            pinyin_graphic='nǐ hǎo',
+            translation='привет',
+            difficulty=1
+        )
+        UserWord.objects.create(user=self.user, word=self.word)
+
+    def _submit_session(self, barrier, errors):
+        try:
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            exercises = [
+                {'type': 'translation', 'direction': 'cn_to_ru', 'word_id': self.word.id}
+                for _ in range(self.SUBMITS_PER_THREAD)
+            ]
+            session_id = PracticeSessionStore.create(self.user, exercises, 'mixed')
+            barrier.wait()
+
+            for index in range(self.SUBMITS_PER_THREAD):
+                response = client.post(
+                    reverse('submit-exercise'),
+                    {
+                        'session_id': session_id,
+                        'exercise_index': index,
+                        'answer': 'привет',
+                        'time_spent': 60
+                    },
+                    format='json'
+                )
+                if response.status_code != 200:
+                    errors.append(response.data)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_parallel_submits(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        threads = [
+            threading.Thread(target=self._submit_session, args=(barrier, errors))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        total = self.THREADS * self.SUBMITS_PER_THREAD
+        total_xp = total * SubmissionPipeline.XP_CORRECT
+
+        stats = UserLearningStats.objects.get(user=self.user)
+        self.assertEqual(stats.total_exercises_completed, total)
+        self.assertEqual(stats.total_time_spent, total * 60)
+        spent_on_levels = sum(level * 100 for level in range(1, stats.level))
+        self.assertEqual(stats.xp_points + spent_on_levels, total_xp)
+        self.assertLess(stats.xp_points, stats.level * 100)
+
+        goal = DailyGoal.objects.get(user=self.user)
+        self.assertEqual(goal.current_xp, total_xp)
+        self.assertEqual(goal.current_time, total)
+        self.assertEqual(ReviewLog.objects.filter(user_word__user=self.user).count(), total)
@@ -0,0 +1,126 @@
+import math
+from typing import Dict, List
+from django.db import transaction
+from django.db.models import Avg
+from dictionary.models import Topic
+from dictionary.utils import bulk_upsert
+from dictionary.word_index import WordIndex
+from users.models import UserTopicProgress
+from users.word_bitset import KnownWordSet
+from .models import TopicRecommendation
+
+
+class TopicRecommender:
+    """
+    Пересчёт рекомендаций тем в таблицу TopicRecommendation.
+    Оценка темы учитывает вес темы и её тегов, соответствие сложности уровню
+    пользователя, начатое изучение и долю слов темы, уже знакомых пользователю.
+    Освоенные темы не рекомендуются
+    """
+    LIMIT = 4
+    MASTERED_LEVEL = 5
+    # Темы с таким уровнем освоения определяют уровень пользователя
+    COMPLETED_LEVEL = 3
+
+    PROGRESS_WEIGHT = 1.0
+    OVERLAP_WEIGHT = 0.5
+    HARDER_PENALTY = 1.0
+    EASIER_PENALTY = 0.3
+
+    SAVED_FIELDS = [
+        'score', 'mastery_level', 'accuracy', 'words_known',
+        'words_learned', 'total_words', 'updated_at'
+    ]
+
+    def __init__(self):
+        self._topics = None
+
+    @property
+    def topics(self) -> Dict[int, tuple]:
+        """{id темы: (сложность, вес с учётом тегов)} активных тем, загружаются один раз"""
+        if self._topics is None:
+            rows = Topic.objects.filter(is_active=True).annotate(
+                tag_weight=Avg('tags__weight')
+            ).values_list('id', 'difficulty_level', 'weight', 'tag_weight')
+            self._topics = {
+                topic_id: (difficulty, weight * (tag_weight if tag_weight is not None else 1.0))
+                for topic_id, difficulty, weight, tag_weight in rows
+            }
+        return self._topics
+
+    def refresh(self, user) -> int:
+        """Пересчитать рекомендации пользователя, возвращает количество рекомендованных тем"""
+        user_id = getattr(user, 'id', user)
+        progress = {
+            topic_id: (mastery_level, accuracy, is_active)
+            for topic_id, mastery_level, accuracy, is_active in UserTopicProgress.objects.filter(
+                user_id=user_id
+            ).values_list('topic_id', 'mastery_level', 'accuracy', 'is_active')
+        }
+        recommendations = self.score_topics(user_id, progress)
+
+        with transaction.atomic():
+            TopicRecommendation.objects.filter(user_id=user_id).exclude(
+                topic_id__in=[recommendation.topic_id for recommendation in recommendations]
+            ).delete()
+            if recommendations:
+                bulk_upsert(TopicRecommendation, recommendations, ['user', 'topic'], self.SAVED_FIELDS)
+        return len(recommendations)
+
+    def refresh_users(self, user_ids) -> int:
+        """Пересчитать рекомендации нескольких пользователей (темы загружаются один раз)"""
+        for user_id in user_ids:
+            self.refresh(user_id)
+        return len(user_ids)
+
+    def score_topics(self, user_id, progress: Dict[int, tuple]) -> List[TopicRecommendation]:
+        """Оценить активные темы по прогрессу {id темы: (уровень, точность, изучается)}"""
+        index = WordIndex.get()
+        word_set = KnownWordSet.for_user(user_id)
+        dictionary_bits = word_set.all_bits
+        learned_bits = word_set.known_bits
+        level = self.user_level(progress)
+
+        recommendations = []
+        for topic_id, (difficulty, weight) in self.topics.items():
+            topic_bits = index.get_topic_bits(topic_id)
+            total = topic_bits.bit_count()
+            if total == 0:
+                continue
+
+            mastery_level, accuracy, is_active = progress.get(topic_id, (0, 0.0, False))
+            learned = (learned_bits & topic_bits).bit_count()
+            if mastery_level >= self.MASTERED_LEVEL or learned >= total:
+                continue
+            known = (dictionary_bits & topic_bits).bit_count()
+
+            gap = difficulty - level
+            fit = math.exp(-self.HARDER_PENALTY * max(gap, 0) - self.EASIER_PENALTY * max(-gap, 0))
+            bonus = 1.0 + self.OVERLAP_WEIGHT * (known - learned) / total
+            if is_active:
+                bonus += self.PROGRESS_WEIGHT
+            remaining = 0.5 + 0.5 * (total - learned) / total
+
+            recommendations.append(TopicRecommendation(
+                user_id=user_id,
+                topic_id=topic_id,
+                score=weight * fit * bonus * remaining,
+                mastery_level=mastery_level,
+                accuracy=accuracy,
+                words_known=known,
+                words_learned=learned,
+                total_words=total
+            ))
+
+        return recommendations
+
+    def user_level(self, progress: Dict[int, tuple]) -> float:
+        """Подходящая сложность новых тем: на единицу выше средней сложности пройденных"""
+        difficulties = [
+            self.topics[topic_id][0]
+            for topic_id, (mastery_level, _, _) in progress.items()
+            if mastery_level >= self.COMPLETED_LEVEL and topic_id in self.topics
+        ]
+        if not difficulties:
+            return 1
+        return sum(difficulties) / len(difficulties) + 1
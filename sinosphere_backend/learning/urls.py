@@ -14,11 +14,15 @@ urlpatterns = [
     # Упражнения
     path('exercises/generate/', views.GenerateExerciseView.as_view(), name='generate-exercise'),
     path('exercises/submit/', views.SubmitExerciseView.as_view(), name='submit-exercise'),
+    path('exercises/submit-batch/', views.SubmitExerciseBatchView.as_view(), name='submit-exercise-batch'),
     path('practice/session/', views.PracticeSessionView.as_view(), name='practice-session'),
     
     # Повторение
     path('review/schedule/', views.ReviewScheduleView.as_view(), name='review-schedule'),
     
+    # Режим чтения
+    path('reader/annotate/', views.ReaderAnnotateView.as_view(), name='reader-annotate'),
+    
     # Статистика
     path('stats/', views.LearningStatsView.as_view(), name='learning-stats'),
     
@@ -1,23 +1,35 @@
-import random
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, Prefetch
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import permission_classes, api_view
 from django.shortcuts import get_object_or_404
-from .models import Lesson, Exercise, UserLessonProgress, DailyGoal
-from dictionary.models import Topic, Word, WordTag
+from .models import Lesson, Exercise, UserLessonProgress, DailyGoal, TopicRecommendation
+from dictionary.models import Topic, Word
+from dictionary.serializers import TopicSerializer
+from dictionary.word_index import WordIndex
+from dictionary.answer_matcher import AnswerMatcher
 from users.models import UserWord, UserLearningStats, UserTopicProgress, UserExerciseHistory
+from users.word_bitset import KnownWordSet
 from .serializers import (
-    LessonSerializer, ExerciseSerializer, UserLessonProgressSerializer,
-    DailyGoalSerializer, TopicProgressSerializer, LearningStatsSerializer,
-    ExerciseSubmissionSerializer, GeneratedExerciseSerializer
+    LessonSerializer, UserLessonProgressSerializer,
+    DailyGoalSerializer, TopicProgressSerializer, TopicRecommendationSerializer, LearningStatsSerializer,
+    ExerciseSubmissionSerializer, ExerciseBatchSubmissionSerializer,
+    GeneratedExerciseSerializer, ReaderTextSerializer
 )
 from .exercise_generator import ExerciseGenerator
+from .session_planner import SessionPlanner
+from .exercise_queue import ExerciseQueue
+from .practice_sessions import PracticeSessionStore
+from .lesson_payloads import LessonPayloadCache
+from .submission import SubmissionPipeline
+from .reader import TextReader
+from .topic_recommendations import TopicRecommender
 from .fsrs_optimizer import FSRSOptimizer
+from .difficulty_estimator import DifficultyEstimator
 
 
 class TopicListView(APIView):
@@ -27,35 +39,32 @@ class TopicListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        topics = Topic.objects.filter(is_active=True).order_by('order')
-        
-        user_progress = UserTopicProgress.objects.filter(
-            user=request.user
-        ).select_related('topic')
-        
-        progress_dict = {up.topic_id: up for up in user_progress}
-        
-        result = []
-        for topic in topics:
-            progress = progress_dict.get(topic.id)
-            if progress:
-                serializer = TopicProgressSerializer(progress)
-            else:
-                progress = UserTopicProgress.objects.create(
+        missing_topic_ids = Topic.objects.filter(is_active=True).exclude(
+            user_progress__user=request.user
+        ).values_list('id', flat=True)
+        
+        index = WordIndex.get()
+        UserTopicProgress.objects.bulk_create(
+            [
+                UserTopicProgress(
                     user=request.user,
-                    topic=topic,
-                    total_words=self._get_words_count_in_topic(topic)
+                    topic_id=topic_id,
+                    total_words=len(index.get_word_ids(topic_id))
                 )
-                serializer = TopicProgressSerializer(progress)
-            
-            result.append(serializer.data)
+                for topic_id in missing_topic_ids
+            ],
+            ignore_conflicts=True
+        )
         
-        return Response(result)
-    
-    def _get_words_count_in_topic(self, topic):
-        """Получить количество слов в теме"""
-        tag_ids = topic.tags.values_list('id', flat=True)
-        return WordTag.objects.filter(tag_id__in=tag_ids).values('word').distinct().count()
+        user_progress = UserTopicProgress.objects.filter(
+            user=request.user,
+            topic__is_active=True
+        ).prefetch_related(
+            Prefetch('topic', queryset=TopicSerializer.with_counts(Topic.objects.all()))
+        ).order_by('topic__order')
+        
+        serializer = TopicProgressSerializer(user_progress, many=True)
+        return Response(serializer.data)
 
 
 class LessonListView(APIView):
@@ -93,28 +102,44 @@ class StartLessonView(APIView):
             progress.attempts += 1
             progress.save()
         
-        exercises = lesson.exercises.all()
-        exercise_serializer = ExerciseSerializer(
-            exercises,
-            many=True,
-            context={'hide_answer': True}
-        )
+        payload = LessonPayloadCache.get(lesson)
         
         self._update_learning_stats(request.user, 'lesson_started')
         
+        # Ответы на задания урока проверяются по сессии, как и в тренировке
+        session_id = PracticeSessionStore.create_from_records(request.user, payload['answers'], 'lesson')
+        exercises = self._adjust_exercises(request.user, payload['exercises'])
+        for index, exercise in enumerate(exercises):
+            exercise['exercise_index'] = index
+        
         return Response({
-            'lesson': LessonSerializer(lesson).data,
-            'progress': UserLessonProgressSerializer(progress).data,
-            'exercises': exercise_serializer.data
+            'lesson': payload['lesson'],
+            'progress': UserLessonProgressSerializer(
+                progress,
+                context={'lesson_info': payload['lesson']}
+            ).data,
+            'exercises': exercises,
+            'session_id': session_id
         })
     
+    def _adjust_exercises(self, user, exercises):
+        """Параметры заданий урока под пользователя (данные урока из кэша не меняются)"""
+        exercises = [dict(exercise) for exercise in exercises]
+        with_words = [exercise for exercise in exercises if exercise.get('word_info')]
+        
+        parameters = DifficultyEstimator.adjust_many(
+            user,
+            [exercise['word'] for exercise in with_words],
+            [exercise['word_info']['difficulty'] for exercise in with_words],
+            [exercise['exercise_type'] for exercise in with_words]
+        )
+        for exercise, exercise_parameters in zip(with_words, parameters):
+            exercise['parameters'] = exercise_parameters
+        return exercises
+    
     def _update_learning_stats(self, user, action):
         """Обновить статистику обучения"""
-        stats, _ = UserLearningStats.objects.get_or_create(user=user)
-        stats.update_streak()
-        
-        if action == 'lesson_started':
-            stats.save()
+        UserLearningStats.add_progress(user)
 
 
 class GenerateExerciseView(APIView):
@@ -128,7 +153,11 @@ class GenerateExerciseView(APIView):
         exercise_type = request.query_params.get('type')
         
         generator = ExerciseGenerator(request.user, topic_id)
-        exercise = generator.get_next_exercise(exercise_type)
+        
+        if topic_id or exercise_type:
+            exercise = generator.get_next_exercise(exercise_type)
+        else:
+            exercise = ExerciseQueue(request.user).pop()
         
         if not exercise:
             return Response(
@@ -136,16 +165,20 @@ class GenerateExerciseView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        if 'word_id' in exercise:
-            word = Word.objects.get(id=exercise['word_id'])
+        word_id = exercise.get('word_id')
+        if word_id and not KnownWordSet.for_user(request.user).contains(word_id):
+            word = Word.objects.get(id=word_id)
             generator.auto_add_word_to_dictionary(word)
         
+        session_id = PracticeSessionStore.create(request.user, [exercise], 'single')
+        exercise['exercise_index'] = 0
+        
         serializer = GeneratedExerciseSerializer(
             exercise,
             context={'hide_answer': True}
         )
         
-        return Response(serializer.data)
+        return Response({**serializer.data, 'session_id': session_id})
 
 
 class SubmitExerciseView(APIView):
@@ -155,260 +188,49 @@ class SubmitExerciseView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        serializer = ExerciseSubmissionSerializer(data=request.data)
+        serializer = ExerciseSubmissionSerializer(
+            data=request.data,
+            context={'request': request}
+        )
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        data = serializer.validated_data
-        user = request.user
-        
-        check_result = self._check_answer(
-            data['exercise_type'],
-            data['answer'],
-            data['word_id'],
-            data.get('exercise_data')
-        )
+        result = SubmissionPipeline(request.user).submit([serializer.validated_data])[0]
         
-        if check_result.get('error'):
+        if result.get('error'):
             return Response(
-                {'error': check_result['error']},
+                {'error': result['error']},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        is_correct = check_result['is_correct']
-        word_id = data['word_id']
-        exercise_type = data['exercise_type']
-        response_time = data.get('time_spent', 0)
-        
-        try:
-            word = Word.objects.get(id=word_id)
-        except Word.DoesNotExist:
-            return Response(
-                {'error': 'Слово не найдено'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        user_word, created = UserWord.objects.get_or_create(
-            user=user,
-            word=word,
-            defaults={
-                'due': timezone.now(),
-                'state': 0,
-                'difficulty': 8.0,
-            }
-        )
-        
-        rating = user_word.update_review(is_correct, response_time, exercise_type)
-        
-        UserExerciseHistory.objects.create(
-            user=user,
-            exercise_type=exercise_type,
-            word=word,
-            is_correct=is_correct,
-            time_spent=response_time,
-            difficulty=word.difficulty
+        del result['word_id']
+        return Response(result)
+
+
+class SubmitExerciseBatchView(APIView):
+    """
+    Отправка ответов на несколько упражнений одним запросом
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = ExerciseBatchSubmissionSerializer(
+            data=request.data,
+            context={'request': request}
         )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        self._update_daily_goal(user, response_time, xp=15 if is_correct else 5)
-        
-        self._update_learning_stats(user, is_correct, response_time)
-        
-        self._update_topic_progress(user, word, is_correct)
+        results = SubmissionPipeline(request.user).submit(serializer.validated_data['answers'])
+        graded = [result for result in results if 'error' not in result]
         
         return Response({
-            'is_correct': is_correct,
-            'correct_answer': check_result.get('correct_answer'),
-            'explanation': check_result.get('explanation'),
-            'rating': rating,
-            'next_review': user_word.due,
-            'mastery_score': user_word.mastery_score,
-            'xp_earned': 15 if is_correct else 5,
-            'is_learned': user_word.is_learned,
-            'consecutive_correct': user_word.consecutive_correct
+            'results': results,
+            'total': len(graded),
+            'correct': sum(1 for result in graded if result['is_correct']),
+            'xp_earned': sum(result['xp_earned'] for result in graded)
         })
-    
-    def _check_answer(self, exercise_type, user_answer, word_id, exercise_data=None):
-        """Проверить правильность ответа"""
-        try:
-            word = Word.objects.get(id=word_id)
-        except Word.DoesNotExist:
-            return {'error': 'Слово не найдено'}
-        
-        result = {
-            'is_correct': False,
-            'correct_answer': '',
-            'explanation': ''
-        }
-        
-        if exercise_type == 'translation_ru':
-            user_answer_clean = user_answer.strip().lower()
-            
-            translations = [t.strip().lower() for t in word.translation.split(';')]
-            
-            if user_answer_clean in translations:
-                result['is_correct'] = True
-                result['correct_answer'] = translations[0]
-            else:
-                result['is_correct'] = False
-                result['correct_answer'] = translations[0]
-                result['explanation'] = f"Правильный перевод: {translations[0]}"
-        
-        elif exercise_type == 'translation_cn':
-            user_answer_clean = user_answer.strip()
-            correct_answer = word.hanzi
-            
-            if user_answer_clean == correct_answer:
-                result['is_correct'] = True
-                result['correct_answer'] = correct_answer
-            else:
-                result['is_correct'] = False
-                result['correct_answer'] = correct_answer
-                result['explanation'] = f"Правильный ответ: {correct_answer} ({word.pinyin_graphic})"
-        
-        elif exercise_type == 'multiple_choice':
-            try:
-                selected_index = int(user_answer)
-                if exercise_data and 'correct_index' in exercise_data:
-                    result['is_correct'] = (selected_index == exercise_data['correct_index'])
-                    if exercise_data.get('options'):
-                        result['correct_answer'] = exercise_data['options'][exercise_data['correct_index']]
-            except (ValueError, KeyError, IndexError):
-                result['is_correct'] = False
-        
-        elif exercise_type == 'matching':
-            if isinstance(user_answer, list) and exercise_data:
-                # user_answer: список пар [индекс_китайского, индекс_перевода]
-                # exercise_data['correct_pairs']: список правильных пар
-                correct_pairs = exercise_data.get('correct_pairs', [])
-                user_pairs = user_answer
-                
-                if sorted(correct_pairs) == sorted(user_pairs):
-                    result['is_correct'] = True
-                else:
-                    result['is_correct'] = False
-                    result['explanation'] = "Не все пары сопоставлены правильно"
-        
-        return result
-    
-    def _update_topic_progress(self, user, word, is_correct):
-        """Обновить прогресс по теме"""
-        from users.models import UserTopicProgress
-        from django.utils import timezone
-        from dictionary.models import Topic, WordTag
-        
-        topics = Topic.objects.filter(
-            tags__tagged_words__word=word
-        ).distinct()
-        
-        for topic in topics:
-            progress, created = UserTopicProgress.objects.get_or_create(
-                user=user,
-                topic=topic,
-                defaults={
-                    'total_words': self._get_words_count_in_topic(topic),
-                    'is_active': True,
-                    'last_practiced': timezone.now()
-                }
-            )
-            
-            if not created:
-                total_attempts = getattr(progress, 'total_attempts', 0) + 1
-                total_correct = getattr(progress, 'total_correct', 0)
-                
-                if is_correct:
-                    total_correct += 1
-                
-                progress.total_attempts = total_attempts
-                progress.total_correct = total_correct
-                progress.accuracy = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
-                progress.last_practiced = timezone.now()
-                
-                progress.words_learned = self._get_learned_words_count_in_topic(user, topic)
-                
-                if progress.accuracy >= 90:
-                    progress.mastery_level = 5
-                elif progress.accuracy >= 75:
-                    progress.mastery_level = 4
-                elif progress.accuracy >= 60:
-                    progress.mastery_level = 3
-                elif progress.accuracy >= 40:
-                    progress.mastery_level = 2
-                elif progress.accuracy > 0:
-                    progress.mastery_level = 1
-                else:
-                    progress.mastery_level = 0
-            
-            progress.save()
-    
-    def _get_words_count_in_topic(self, topic):
-        """Получить количество слов в теме"""
-        tag_ids = topic.tags.values_list('id', flat=True)
-        from dictionary.models import WordTag
-        return WordTag.objects.filter(tag_id__in=tag_ids).values('word').distinct().count()
 
-    def _get_learned_words_count_in_topic(self, user, topic):
-        """Получить количество изученных слов в теме"""
-        from users.models import UserWord
-        tag_ids = topic.tags.values_list('id', flat=True)
-        
-        user_words = UserWord.objects.filter(
-            user=user,
-            word__word_tags__tag_id__in=tag_ids
-        ).distinct()
-        
-        learned_count = 0
-        for user_word in user_words:
-            if user_word.is_learned:
-                learned_count += 1
-        
-        return learned_count
-
-    def _update_daily_goal(self, user, response_time, xp=0, words=0):
-        """Обновить прогресс дневной цели"""
-        from .models import DailyGoal
-        from django.utils import timezone
-        
-        today = timezone.now().date()
-        
-        try:
-            daily_goal = DailyGoal.objects.get(user=user, date=today)
-        except DailyGoal.DoesNotExist:
-            daily_goal = DailyGoal.objects.create(
-                user=user,
-                date=today,
-                target_xp=100,
-                target_words=10,
-                target_time=30
-            )
-        
-        time_minutes = response_time / 60.0 if response_time else 0
-        
-        daily_goal.update_progress(xp=xp, words=words, time_minutes=time_minutes)
-    
-    def _update_learning_stats(self, user, is_correct, response_time):
-        """Обновить статистику обучения"""
-        from users.models import UserLearningStats
-        
-        stats, created = UserLearningStats.objects.get_or_create(user=user)
-        stats.update_streak()
-        
-        stats.total_exercises_completed += 1
-        stats.total_time_spent += int(response_time)
-        xp_to_add = 15 if is_correct else 5
-        stats.xp_points += xp_to_add
-        
-        self._update_user_level(stats)
-        
-        stats.save()
-    
-    def _update_user_level(self, stats):
-        """Обновить уровень пользователя на основе XP"""
-        required_xp = stats.level * 100
-        
-        while stats.xp_points >= required_xp:
-            stats.level += 1
-            stats.xp_points -= required_xp
-            required_xp = stats.level * 100
 
 class ReviewScheduleView(APIView):
     """
@@ -417,11 +239,15 @@ class ReviewScheduleView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        user_words = UserWord.objects.filter(user=request.user)
+        user_words = UserWord.objects.filter(user=request.user).select_related('word')
         
         fsrs = FSRSOptimizer()
         schedule = fsrs.get_review_schedule(user_words)
         
+        matchers = AnswerMatcher.for_words({
+            word.word_id for words in schedule.values() for word in words[:10]
+        })
+        
         schedule_serialized = {}
         for key, words in schedule.items():
             schedule_serialized[key] = [
@@ -429,7 +255,7 @@ class ReviewScheduleView(APIView):
                     'id': word.id,
                     'word': word.word.hanzi,
                     'pinyin': word.word.pinyin_graphic,
-                    'translation': word.word.translation.split(';')[0].strip(),
+                    'translation': matchers[word.word_id].primary if word.word_id in matchers else '',
                     'next_review': word.due,
                     'stability': word.stability,
                     'difficulty': word.difficulty,
@@ -496,10 +322,7 @@ class LearningStatsView(APIView):
         
         total_words = user_words.count()
         
-        learned_words_count = 0
-        for user_word in user_words:
-            if user_word.is_learned:
-                learned_words_count += 1
+        learned_words_count = KnownWordSet.for_user(user).count(KnownWordSet.LEARNED)
         
         return Response({
             'stats': stats_serializer.data,
@@ -519,48 +342,27 @@ class RecommendedTopicsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        user_progress = UserTopicProgress.objects.filter(user=request.user)
-        
-        if not user_progress.exists():
-            recommended = Topic.objects.filter(
-                difficulty_level=1,
-                is_active=True
-            ).order_by('order')[:3]
-            serializer = TopicProgressSerializer(recommended, many=True)
-            return Response(serializer.data)
-        
-        recommendations = []
-        
-        active_topics = user_progress.filter(
-            is_active=True,
-            mastery_level__lt=5
-        ).order_by('-mastery_level')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', TopicRecommender.LIMIT)), 20))
+        except ValueError:
+            limit = TopicRecommender.LIMIT
         
-        for progress in active_topics[:2]:
-            recommendations.append(progress)
+        recommendations = self._get_top(request.user, limit)
+        if not recommendations:
+            # Рекомендации ещё не рассчитывались (новый пользователь)
+            TopicRecommender().refresh(request.user)
+            recommendations = self._get_top(request.user, limit)
         
-        completed_topics = user_progress.filter(mastery_level__gte=3)
-        if completed_topics.exists():
-            avg_difficulty = completed_topics.aggregate(
-                avg=Avg('topic__difficulty_level')
-            )['avg']
-            
-            new_topics = Topic.objects.filter(
-                difficulty_level__lte=avg_difficulty + 1,
-                is_active=True
-            ).exclude(
-                id__in=user_progress.values_list('topic_id', flat=True)
-            ).order_by('difficulty_level')[:2]
-            
-            for topic in new_topics:
-                progress, created = UserTopicProgress.objects.get_or_create(
-                    user=request.user,
-                    topic=topic
-                )
-                recommendations.append(progress)
-        
-        serializer = TopicProgressSerializer(recommendations, many=True)
+        serializer = TopicRecommendationSerializer(recommendations, many=True)
         return Response(serializer.data)
+    
+    def _get_top(self, user, limit):
+        return list(TopicRecommendation.objects.filter(
+            user=user,
+            topic__is_active=True
+        ).prefetch_related(
+            Prefetch('topic', queryset=TopicSerializer.with_counts(Topic.objects.all()))
+        ).order_by('-score')[:limit])
 
 
 class UpdateDailyGoalView(APIView):
@@ -632,21 +434,8 @@ def complete_lesson(request, lesson_id):
     progress.score = 90
     progress.save()
     
-    stats, _ = UserLearningStats.objects.get_or_create(user=request.user)
-    stats.total_lessons_completed += 1
-    stats.xp_points += lesson.xp_reward
-    stats.save()
-    
-    goal, _ = DailyGoal.objects.get_or_create(
-        user=request.user,
-        date=timezone.now().date(),
-        defaults={
-            'target_xp': 100,
-            'target_words': 10,
-            'target_time': 30
-        }
-    )
-    goal.update_progress(xp=lesson.xp_reward)
+    UserLearningStats.add_progress(request.user, lessons=1, xp=lesson.xp_reward)
+    DailyGoal.add_progress(request.user, xp=lesson.xp_reward)
     
     return Response({
         'success': True,
@@ -666,24 +455,12 @@ class PracticeSessionView(APIView):
         session_type = request.data.get('type', 'mixed')
         count = int(request.data.get('count', 10))
         
-        generator = ExerciseGenerator(request.user, topic_id)
-        exercises = []
-        
-        for _ in range(count):
-            if session_type == 'review':
-                exercise_type = random.choice(['translation_ru', 'multiple_choice'])
-            elif session_type == 'new':
-                exercise_type = random.choice(['translation_cn', 'matching'])
-            else:
-                exercise_type = None
-            
-            exercise = generator.get_next_exercise(exercise_type)
-            if exercise:
-                if 'word_id' in exercise and session_type != 'review':
-                    word = Word.objects.get(id=exercise['word_id'])
-                    generator.auto_add_word_to_dictionary(word)
-                
-                exercises.append(exercise)
+        planner = SessionPlanner(request.user, topic_id, session_type)
+        exercises = planner.plan(count)
+        
+        session_id = PracticeSessionStore.create(request.user, exercises, session_type)
+        for index, exercise in enumerate(exercises):
+            exercise['exercise_index'] = index
         
         serializer = GeneratedExerciseSerializer(
             exercises,
@@ -691,8 +468,6 @@ class PracticeSessionView(APIView):
             context={'hide_answer': True}
         )
         
-        session_id = f"session_{request.user.id}_{int(timezone.now().timestamp())}"
-        
         return Response({
             'session_id': session_id,
             'exercises': serializer.data,
@@ -700,6 +475,23 @@ class PracticeSessionView(APIView):
             'type': session_type
         })
     
+class ReaderAnnotateView(APIView):
+    """
+    Режим чтения: разметка текста известными и новыми словами пользователя
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = ReaderTextSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        reader = TextReader(request.user)
+        result = reader.annotate(serializer.validated_data['text'])
+        
+        return Response(result)
+
+
 class LearningDashboardView(APIView):
     """
     Получение всех данных для главной страницы обучения одним запросом
@@ -709,17 +501,12 @@ class LearningDashboardView(APIView):
     def get(self, request):
         user = request.user
         
-        user_words = UserWord.objects.filter(user=user)
+        word_set = KnownWordSet.for_user(user)
         stats, _ = UserLearningStats.objects.get_or_create(user=user)
         
-        learned_words_count = 0
-        for user_word in user_words:
-            if user_word.is_learned:
-                learned_words_count += 1
-        
         stats_data = {
-            'total_words': user_words.count(),
-            'learned_words': learned_words_count,
+            'total_words': word_set.count(),
+            'learned_words': word_set.count(KnownWordSet.LEARNED),
             'level': stats.level,
             'current_streak': stats.current_streak,
             'total_lessons_completed': stats.total_lessons_completed,
@@ -794,11 +581,4 @@ class LearningDashboardView(APIView):
         """
         Определяем количество изученных слов.
         """
-        user_words = UserWord.objects.filter(user=user)
-        learned_words_count = 0
-        
-        for user_word in user_words:
-            if user_word.is_learned:
-                learned_words_count += 1
-        
-        return learned_words_count
\ No newline at end of file
+        return KnownWordSet.for_user(user).count(KnownWordSet.LEARNED)
\ No newline at end of file
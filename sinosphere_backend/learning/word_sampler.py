@@ -0,0 +1,59 @@
+import numpy as np
+from typing import List
+from dictionary.models import Word
+from dictionary.word_index import WordIndex
+
+
+class WordSampler:
+    """
+    Случайная выборка слов по плотным массивам id из индекса словаря.
+    Позиции выбираются равномерно, неподходящие id отбрасываются,
+    поэтому стоимость выборки зависит от количества слов, а не от размера словаря
+    """
+    MAX_ATTEMPTS_FACTOR = 20
+
+    _rng = np.random.default_rng()
+
+    def __init__(self, topic_id=None, difficulty=None):
+        self.candidate_ids = WordIndex.get().get_word_ids(topic_id, difficulty)
+
+    def sample_ids(self, count: int, exclude_ids=None, exclude_bits: int = 0) -> List[int]:
+        """
+        Выбрать до count различных id слов.
+        exclude_ids - множество исключаемых id, exclude_bits - битовое множество
+        (например, слова из словаря пользователя)
+        """
+        total = len(self.candidate_ids)
+        if count <= 0 or total == 0:
+            return []
+
+        exclude_ids = exclude_ids or set()
+        seen = set()
+        sampled = []
+        attempts_left = max(count, 1) * self.MAX_ATTEMPTS_FACTOR
+
+        while len(sampled) < count and attempts_left > 0 and len(seen) < total:
+            batch_size = min((count - len(sampled)) * 2, attempts_left)
+            positions = self._rng.integers(0, total, size=batch_size)
+            attempts_left -= batch_size
+
+            for word_id in self.candidate_ids[positions].tolist():
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                if word_id in exclude_ids or (exclude_bits >> word_id) & 1:
+                    continue
+                sampled.append(word_id)
+                if len(sampled) == count:
+                    break
+
+        return sampled
+
+    def sample(self, count: int, exclude_ids=None, exclude_bits: int = 0) -> List[Word]:
+        """Выбрать случайные слова и загрузить их одним запросом"""
+        sampled_ids = self.sample_ids(count, exclude_ids, exclude_bits)
+        if not sampled_ids:
+            return []
+
+        words = Word.objects.in_bulk(sampled_ids)
+        return [words[word_id] for word_id in sampled_ids if word_id in words]
@@ -137,6 +137,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Данные о порядке штрихов (собираются командой import_stroke_data)
+
+STROKE_DATA_PATH = BASE_DIR / 'data' / 'strokes.bin'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_reviewlog_userexercisehistory_userlearningprofile_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWordBitset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('new_words', models.BinaryField(default=b'', verbose_name='Новые слова')),
+                ('learning_words', models.BinaryField(default=b'', verbose_name='Слова на изучении')),
+                ('review_words', models.BinaryField(default=b'', verbose_name='Слова на повторении')),
+                ('relearning_words', models.BinaryField(default=b'', verbose_name='Слова на переобучении')),
+                ('learned_words', models.BinaryField(default=b'', verbose_name='Изученные слова')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Время обновления')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='word_bitset', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Битовое множество слов пользователя',
+                'verbose_name_plural': 'Битовые множества слов пользователей',
+            },
+        ),
+    ]
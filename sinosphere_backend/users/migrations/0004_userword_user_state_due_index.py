@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_wordtranslation'),
+        ('users', '0003_userwordbitset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'state', 'due'], name='idx_user_state_due'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0004_wordtranslation'),
+        ('users', '0004_userword_user_state_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userword',
+            name='is_learned',
+            field=models.BooleanField(default=False, verbose_name='Слово изучено'),
+        ),
+        migrations.AddField(
+            model_name='userword',
+            name='mastery_score',
+            field=models.FloatField(default=0, verbose_name='Оценка владения словом (0-100)'),
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'is_learned'], name='idx_user_learned'),
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'mastery_score'], name='idx_userword_mastery'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+# Формулы скопированы из users.models на момент миграции,
+# чтобы их последующие изменения не меняли результат миграции
+def calculate_mastery_score(total_attempts, correct_attempts, stability, difficulty,
+                            reps, consecutive_correct):
+    if total_attempts == 0:
+        return 0
+
+    accuracy = correct_attempts / total_attempts * 100
+    stability_factor = min(stability / 365, 1.0) * 20
+    difficulty_factor = max(0, (10 - difficulty) / 10 * 20)
+    reps_factor = min(reps / 10, 1.0) * 20
+
+    recent_success_factor = 0
+    if consecutive_correct >= 3:
+        recent_success_factor = min(consecutive_correct / 10, 1.0) * 20
+
+    score = (accuracy * 0.4 + stability_factor + difficulty_factor +
+             reps_factor * 0.1 + recent_success_factor * 0.1)
+
+    return min(score, 100)
+
+
+def is_word_learned(mastery_score, reps):
+    return mastery_score >= 70 and reps >= 5
+
+
+def backfill_mastery(apps, schema_editor):
+    UserWord = apps.get_model('users', 'UserWord')
+
+    last_id = 0
+    while True:
+        batch = list(
+            UserWord.objects.filter(id__gt=last_id).order_by('id').only(
+                'id', 'total_attempts', 'correct_attempts', 'stability',
+                'difficulty', 'reps', 'consecutive_correct'
+            )[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for user_word in batch:
+            user_word.mastery_score = calculate_mastery_score(
+                user_word.total_attempts,
+                user_word.correct_attempts,
+                user_word.stability,
+                user_word.difficulty,
+                user_word.reps,
+                user_word.consecutive_correct
+            )
+            user_word.is_learned = is_word_learned(user_word.mastery_score, user_word.reps)
+
+        UserWord.objects.bulk_update(batch, ['mastery_score', 'is_learned'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_userword_mastery'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_mastery, migrations.RunPython.noop),
+    ]
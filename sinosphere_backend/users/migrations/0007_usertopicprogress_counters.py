@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_backfill_userword_mastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertopicprogress',
+            name='total_attempts',
+            field=models.IntegerField(default=0, verbose_name='Всего попыток'),
+        ),
+        migrations.AddField(
+            model_name='usertopicprogress',
+            name='total_correct',
+            field=models.IntegerField(default=0, verbose_name='Правильных попыток'),
+        ),
+    ]
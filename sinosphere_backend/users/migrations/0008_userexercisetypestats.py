@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_usertopicprogress_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserExerciseTypeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counts', models.JSONField(default=dict, verbose_name='Заданий по типам')),
+                ('recent', models.JSONField(default=list, verbose_name='Типы последних заданий')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_type_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Статистика типов заданий',
+                'verbose_name_plural': 'Статистика типов заданий',
+            },
+        ),
+    ]
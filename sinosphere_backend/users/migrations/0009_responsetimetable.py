@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_userexercisetypestats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseTimeTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_type', models.CharField(max_length=50, verbose_name='Тип упражнения')),
+                ('difficulty', models.PositiveSmallIntegerField(default=0, verbose_name='Уровень HSK (0 - все уровни)')),
+                ('sample_count', models.IntegerField(default=0, verbose_name='Количество ответов')),
+                ('percentiles', models.BinaryField(verbose_name='Процентили времени ответа')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Время обновления')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='response_time_tables', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Таблица времени ответа',
+                'verbose_name_plural': 'Таблицы времени ответа',
+                'constraints': [models.UniqueConstraint(fields=('user', 'exercise_type', 'difficulty'), name='unique_response_time_table')],
+            },
+        ),
+    ]
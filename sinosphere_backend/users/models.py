@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Greatest, RowNumber
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from datetime import timedelta
 from django.utils import timezone
+from django.core.cache import cache
 import json
 from fsrs import Card, Scheduler
 from django.contrib.auth.models import User
@@ -30,8 +33,8 @@ class UserLearningStats(models.Model):
     def __str__(self):
         return f"Статистика: {self.user.username}"
     
-    def update_streak(self):
-        """Обновить серию дней обучения"""
+    def update_streak(self, save=True):
+        """Обновить серию дней обучения (save=False - без сохранения, сохраняет вызывающий)"""
         today = timezone.now().date()
         
         if not self.last_activity_date:
@@ -47,7 +50,78 @@ class UserLearningStats(models.Model):
             self.longest_streak = self.current_streak
         
         self.last_activity_date = today
-        self.save()
+        if save:
+            self.save()
+    
+    @classmethod
+    def add_progress(cls, user, exercises=0, lessons=0, xp=0, time_spent=0):
+        """
+        Атомарно увеличить счётчики статистики одним UPDATE с F-выражениями.
+        Серия дней и повышение уровня считаются в том же запросе: UPDATE
+        без повышения уровня условен по XP, иначе выполняется UPDATE с повышением
+        """
+        user_id = getattr(user, 'id', user)
+        today = timezone.now().date()
+        
+        streak = models.Case(
+            models.When(last_activity_date=today, then=models.F('current_streak')),
+            models.When(
+                last_activity_date=today - timedelta(days=1),
+                then=models.F('current_streak') + 1
+            ),
+            default=models.Value(1),
+            output_field=models.IntegerField()
+        )
+        # MySQL вычисляет SET слева направо по уже обновлённым значениям,
+        # поэтому поля, зависящие от старых значений, идут первыми
+        fields = {
+            'longest_streak': Greatest('longest_streak', streak),
+            'current_streak': streak,
+            'last_activity_date': today,
+            'total_exercises_completed': models.F('total_exercises_completed') + exercises,
+            'total_lessons_completed': models.F('total_lessons_completed') + lessons,
+            'total_time_spent': models.F('total_time_spent') + int(time_spent),
+        }
+        next_level = models.F('level') * 100
+        
+        for attempt in range(2):
+            if cls.objects.filter(user_id=user_id, xp_points__lt=next_level - xp).update(
+                **fields,
+                xp_points=models.F('xp_points') + xp
+            ):
+                return
+            
+            if cls.objects.filter(user_id=user_id, xp_points__gte=next_level - xp).update(
+                **fields,
+                xp_points=models.F('xp_points') + xp - next_level,
+                level=models.F('level') + 1
+            ):
+                # Остатка XP хватает ещё на уровень только при большом приросте
+                if xp >= 200:
+                    cls.apply_level_ups(user_id)
+                return
+            
+            cls.objects.get_or_create(user_id=user_id)
+    
+    @classmethod
+    def apply_level_ups(cls, user) -> int:
+        """
+        Повысить уровень, пока XP хватает на следующий (level * 100 очков).
+        Каждое повышение - условный UPDATE, параллельные вызовы не повышают уровень дважды
+        """
+        user_id = getattr(user, 'id', user)
+        level_ups = 0
+        
+        while cls.objects.filter(
+            user_id=user_id,
+            xp_points__gte=models.F('level') * 100
+        ).update(
+            xp_points=models.F('xp_points') - models.F('level') * 100,
+            level=models.F('level') + 1
+        ):
+            level_ups += 1
+        
+        return level_ups
 
 
 class UserTopicProgress(models.Model):
@@ -67,6 +141,8 @@ class UserTopicProgress(models.Model):
     words_learned = models.IntegerField(default=0, verbose_name='Слов изучено')
     total_words = models.IntegerField(default=0, verbose_name='Всего слов в теме')
     accuracy = models.FloatField(default=0.0, verbose_name='Точность ответов')
+    total_attempts = models.IntegerField(default=0, verbose_name='Всего попыток')
+    total_correct = models.IntegerField(default=0, verbose_name='Правильных попыток')
     last_practiced = models.DateTimeField(null=True, blank=True, verbose_name='Последняя практика')
     is_active = models.BooleanField(default=False, verbose_name='Активно изучается')
     mastery_level = models.PositiveSmallIntegerField(
@@ -109,6 +185,83 @@ class UserTopicProgress(models.Model):
         self.total_words = total_words_count
         self.words_learned = learned_words_count
         self.save()
+    
+    @classmethod
+    def add_results(cls, user, topic_results: dict):
+        """
+        Применить приращения {topic_id: (попытки, правильные, изменение числа изученных)}.
+        Темы с одинаковыми приращениями обновляются одним UPDATE с F-выражениями
+        (у слова пакета обычно все темы такие), недостающие строки создаются
+        с текущим числом изученных слов темы
+        """
+        from dictionary.word_index import WordIndex
+        from .word_bitset import KnownWordSet
+        
+        user_id = getattr(user, 'id', user)
+        now = timezone.now()
+        
+        groups = {}
+        for topic_id, increments in topic_results.items():
+            groups.setdefault(increments, []).append(topic_id)
+        
+        missing = []
+        for (attempts, correct, learned), topic_ids in groups.items():
+            updated = cls._apply_results(user_id, topic_ids, attempts, correct, learned, now)
+            if updated < len(topic_ids):
+                existing = set(cls.objects.filter(
+                    user_id=user_id,
+                    topic_id__in=topic_ids
+                ).values_list('topic_id', flat=True))
+                missing.extend(topic_id for topic_id in topic_ids if topic_id not in existing)
+        if not missing:
+            return
+        
+        # Множества уже отражают ответы пакета, поэтому изменение изученных не применяется
+        index = WordIndex.get()
+        word_set = KnownWordSet.for_user(user_id)
+        cls.objects.bulk_create(
+            [
+                cls(
+                    user_id=user_id,
+                    topic_id=topic_id,
+                    total_words=len(index.get_word_ids(topic_id)),
+                    words_learned=word_set.count_in_topic(topic_id),
+                    is_active=True
+                )
+                for topic_id in missing
+            ],
+            ignore_conflicts=True
+        )
+        for topic_id in missing:
+            attempts, correct, _ = topic_results[topic_id]
+            cls._apply_results(user_id, [topic_id], attempts, correct, 0, now)
+    
+    @classmethod
+    def _apply_results(cls, user_id, topic_ids, attempts, correct, learned, now) -> int:
+        total_attempts = models.F('total_attempts') + attempts
+        accuracy = models.ExpressionWrapper(
+            (models.F('total_correct') + correct) * 100.0 / total_attempts,
+            output_field=models.FloatField()
+        )
+        mastery_level = models.Case(
+            models.When(GreaterThanOrEqual(accuracy, 90), then=models.Value(5)),
+            models.When(GreaterThanOrEqual(accuracy, 75), then=models.Value(4)),
+            models.When(GreaterThanOrEqual(accuracy, 60), then=models.Value(3)),
+            models.When(GreaterThanOrEqual(accuracy, 40), then=models.Value(2)),
+            models.When(GreaterThan(accuracy, 0), then=models.Value(1)),
+            default=models.Value(0),
+            output_field=models.PositiveSmallIntegerField()
+        )
+        
+        # Точность и уровень считаются по старым значениям счётчиков, поэтому идут первыми (MySQL)
+        return cls.objects.filter(user_id=user_id, topic_id__in=topic_ids).update(
+            accuracy=accuracy,
+            mastery_level=mastery_level,
+            total_attempts=total_attempts,
+            total_correct=models.F('total_correct') + correct,
+            words_learned=models.F('words_learned') + learned,
+            last_practiced=now
+        )
 
 
 class UserExerciseHistory(models.Model):
@@ -161,6 +314,104 @@ class UserExerciseHistory(models.Model):
         status = "✓" if self.is_correct else "✗"
         return f"{self.user.username}: {self.exercise_type} {status}"
 
+
+class UserExerciseTypeStats(models.Model):
+    """
+    Счётчики выполненных заданий пользователя по типам.
+    Заменяют агрегацию UserExerciseHistory при выборе типа задания:
+    counts - за всё время, recent - типы последних RECENT_WINDOW заданий
+    """
+    RECENT_WINDOW = 50
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='exercise_type_stats'
+    )
+    counts = models.JSONField(default=dict, verbose_name='Заданий по типам')
+    recent = models.JSONField(default=list, verbose_name='Типы последних заданий')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+    
+    class Meta:
+        verbose_name = 'Статистика типов заданий'
+        verbose_name_plural = 'Статистика типов заданий'
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.counts}"
+    
+    @classmethod
+    def get_type_counts(cls, user) -> dict:
+        """
+        Гистограмма типов для выбора следующего задания одним запросом:
+        {тип: (заданий среди последних, заданий всего)} по уже встречавшимся типам
+        """
+        user_id = getattr(user, 'id', user)
+        stats = cls.objects.filter(user_id=user_id).values('counts', 'recent').first()
+        if not stats:
+            return {}
+        
+        recent_counts = {}
+        for exercise_type in stats['recent']:
+            recent_counts[exercise_type] = recent_counts.get(exercise_type, 0) + 1
+        
+        return {
+            exercise_type: (recent_counts.get(exercise_type, 0), count)
+            for exercise_type, count in stats['counts'].items()
+        }
+    
+    @classmethod
+    def record(cls, user, exercise_types):
+        """Учесть выполненные задания (типы в порядке выполнения)"""
+        user_id = getattr(user, 'id', user)
+        exercise_types = list(exercise_types)
+        if not exercise_types:
+            return
+        
+        with transaction.atomic():
+            stats, created = cls.objects.select_for_update().get_or_create(user_id=user_id)
+            for exercise_type in exercise_types:
+                stats.counts[exercise_type] = stats.counts.get(exercise_type, 0) + 1
+            stats.recent = (stats.recent + exercise_types)[-cls.RECENT_WINDOW:]
+            stats.save(update_fields=['counts', 'recent', 'updated_at'])
+    
+    @classmethod
+    def rebuild(cls, user_ids) -> int:
+        """Пересчитать счётчики пользователей по UserExerciseHistory, возвращает число строк"""
+        from dictionary.utils import bulk_upsert
+        
+        user_ids = list(user_ids)
+        counts = {user_id: {} for user_id in user_ids}
+        
+        rows = UserExerciseHistory.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'exercise_type').annotate(
+            count=models.Count('id')
+        ).order_by()
+        for user_id, exercise_type, count in rows:
+            counts[user_id][exercise_type] = count
+        
+        recent = {user_id: [] for user_id in user_ids}
+        rows = UserExerciseHistory.objects.filter(
+            user_id__in=user_ids
+        ).annotate(
+            position=models.Window(
+                RowNumber(),
+                partition_by=[models.F('user_id')],
+                order_by=[models.F('created_at').desc(), models.F('id').desc()]
+            )
+        ).filter(
+            position__lte=cls.RECENT_WINDOW
+        ).values_list('user_id', 'exercise_type').order_by('user_id', 'created_at', 'id')
+        for user_id, exercise_type in rows:
+            recent[user_id].append(exercise_type)
+        
+        stats = [
+            cls(user_id=user_id, counts=counts[user_id], recent=recent[user_id])
+            for user_id in user_ids
+        ]
+        bulk_upsert(cls, stats, ['user'], ['counts', 'recent', 'updated_at'])
+        return len(stats)
+
 class UserProfile(models.Model):
     user = models.OneToOneField(
         User, 
@@ -175,7 +426,40 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"Профиль: {self.user.username}"
     
+def calculate_mastery_score(total_attempts, correct_attempts, stability, difficulty,
+                            reps, consecutive_correct) -> float:
+    """Оценка владения словом (0-100)"""
+    if total_attempts == 0:
+        return 0
+    
+    accuracy = correct_attempts / total_attempts * 100
+    stability_factor = min(stability / 365, 1.0) * 20
+    difficulty_factor = max(0, (10 - difficulty) / 10 * 20)
+    reps_factor = min(reps / 10, 1.0) * 20
+    
+    recent_success_factor = 0
+    if consecutive_correct >= 3:
+        recent_success_factor = min(consecutive_correct / 10, 1.0) * 20
+    
+    score = (accuracy * 0.4 + stability_factor + difficulty_factor + 
+            reps_factor * 0.1 + recent_success_factor * 0.1)
+    
+    return min(score, 100)
+
+
+def is_word_learned(mastery_score, reps) -> bool:
+    """Слово считается изученным"""
+    return mastery_score >= 70 and reps >= 5
+
+
 class UserWord(models.Model):
+    REVIEW_FIELDS = [
+        'due', 'stability', 'difficulty', 'elapsed_days', 'scheduled_days',
+        'reps', 'lapses', 'state', 'last_review', 'total_attempts',
+        'correct_attempts', 'avg_response_time', 'consecutive_correct',
+        'mastery_score', 'is_learned'
+    ]
+    
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -231,6 +515,8 @@ class UserWord(models.Model):
     correct_attempts = models.IntegerField(default=0, verbose_name='Правильных попыток')
     avg_response_time = models.FloatField(default=0, verbose_name='Среднее время ответа (сек)')
     consecutive_correct = models.IntegerField(default=0, verbose_name='Подряд правильных ответов')
+    mastery_score = models.FloatField(default=0, verbose_name='Оценка владения словом (0-100)')
+    is_learned = models.BooleanField(default=False, verbose_name='Слово изучено')
     
     class Meta:
         verbose_name = 'Слово пользователя'
@@ -243,6 +529,9 @@ class UserWord(models.Model):
         ]
         indexes = [
             models.Index(fields=['user', 'due'], name='idx_user_due'),
+            models.Index(fields=['user', 'state', 'due'], name='idx_user_state_due'),
+            models.Index(fields=['user', 'is_learned'], name='idx_user_learned'),
+            models.Index(fields=['user', 'mastery_score'], name='idx_userword_mastery'),
             models.Index(fields=['due'], name='idx_due'),
             models.Index(fields=['state'], name='idx_state'),
         ]
@@ -323,24 +612,38 @@ class UserWord(models.Model):
         if not is_correct:
             return 1
         
+        difficulty_factor = 1.0
+        if self.reps > 0:
+            accuracy = self.correct_attempts / self.total_attempts if self.total_attempts > 0 else 0
+            if accuracy < 0.5:
+                difficulty_factor = 1.2
+            elif accuracy > 0.9:
+                difficulty_factor = 0.8
+        
+        # Процентиль времени ответа по таблицам, откалиброванным по журналу повторений
+        from .response_times import ResponseTimeTables
+        level = self.word.difficulty if self._meta.get_field('word').is_cached(self) else 0
+        percentile = ResponseTimeTables.get().percentile(
+            self.user_id, exercise_type, level, response_time / difficulty_factor
+        )
+        if percentile is not None:
+            if percentile <= ResponseTimeTables.EASY_PERCENTILE:
+                return 4
+            elif percentile <= ResponseTimeTables.GOOD_PERCENTILE:
+                return 3
+            else:
+                return 2
+        
         time_thresholds = {
             'translation_ru': 5.0,
             'translation_cn': 7.0,
             'multiple_choice': 3.0,
             'matching': 10.0,
             'writing': 15.0,
+            'fill_gap': 8.0,
         }
         
         expected_time = time_thresholds.get(exercise_type, 5.0)
-        
-        difficulty_factor = 1.0
-        if self.reps > 0:
-            accuracy = self.correct_attempts / self.total_attempts if self.total_attempts > 0 else 0
-            if accuracy < 0.5:
-                difficulty_factor = 1.2
-            elif accuracy > 0.9:
-                difficulty_factor = 0.8
-        
         adjusted_time = expected_time * difficulty_factor
         
         if response_time <= adjusted_time * 0.5:
@@ -352,8 +655,14 @@ class UserWord(models.Model):
         else:
             return 2
     
-    def update_review(self, is_correct: bool, response_time: float, exercise_type: str):
-        """Обновить состояние после выполнения упражнения"""
+    def apply_review(self, is_correct: bool, response_time: float, exercise_type: str,
+                     scheduler=None, review_date=None) -> 'ReviewLog':
+        """
+        Применить ответ к карточке в памяти, без обращения к БД (кроме получения шедулера).
+        Возвращает несохранённую запись ReviewLog
+        """
+        review_date = review_date or timezone.now()
+        
         self.total_attempts += 1
         if is_correct:
             self.correct_attempts += 1
@@ -370,17 +679,18 @@ class UserWord(models.Model):
 
         rating = self.calculate_automatic_rating(is_correct, response_time, exercise_type)
         
-        review_log = ReviewLog.objects.create(
+        review_log = ReviewLog(
             user_word=self,
             rating=rating,
             is_correct=is_correct,
             response_time=response_time,
             exercise_type=exercise_type,
-            review_date=timezone.now()
+            review_date=review_date
         )
         
         try:
-            scheduler = LearningScheduler.get_scheduler(user=self.user)
+            if scheduler is None:
+                scheduler = LearningScheduler.get_scheduler(user=self.user)
             
             fsrs_card = self.to_fsrs_card()
             
@@ -390,7 +700,7 @@ class UserWord(models.Model):
             updated_card, fsrs_review_log = scheduler.review_card(
                 fsrs_card, 
                 fsrs_rating, 
-                review_datetime=timezone.now(),
+                review_datetime=review_date,
                 review_duration=int(response_time * 1000)
             )
             
@@ -398,7 +708,6 @@ class UserWord(models.Model):
             
             if fsrs_review_log and hasattr(fsrs_review_log, 'scheduled_days'):
                 review_log.scheduled_days = fsrs_review_log.scheduled_days
-                review_log.save()
                 
         except Exception as e:
             print(f"Error using FSRS scheduler: {e}")
@@ -425,9 +734,17 @@ class UserWord(models.Model):
                     self.lapses += 1
                 self.due = timezone.now() + timedelta(minutes=10)
         
+        self.update_mastery()
+        
+        return review_log
+    
+    def update_review(self, is_correct: bool, response_time: float, exercise_type: str):
+        """Обновить состояние после выполнения упражнения"""
+        review_log = self.apply_review(is_correct, response_time, exercise_type)
+        review_log.save()
         self.save()
         
-        return rating
+        return review_log.rating
     
     def get_review_urgency(self) -> float:
         """Получить срочность повторения (0-10)"""
@@ -447,30 +764,17 @@ class UserWord(models.Model):
         else:
             return 1.0
     
-    @property
-    def mastery_score(self) -> float:
-        """Оценка владения словом (0-100)"""
-        if self.total_attempts == 0:
-            return 0
-        
-        accuracy = self.correct_attempts / self.total_attempts * 100
-        stability_factor = min(self.stability / 365, 1.0) * 20
-        difficulty_factor = max(0, (10 - self.difficulty) / 10 * 20)
-        reps_factor = min(self.reps / 10, 1.0) * 20
-        
-        recent_success_factor = 0
-        if self.consecutive_correct >= 3:
-            recent_success_factor = min(self.consecutive_correct / 10, 1.0) * 20
-        
-        score = (accuracy * 0.4 + stability_factor + difficulty_factor + 
-                reps_factor * 0.1 + recent_success_factor * 0.1)
-        
-        return min(score, 100)
-    
-    @property
-    def is_learned(self) -> bool:
-        """Слово считается изученным"""
-        return self.mastery_score >= 70 and self.reps >= 5
+    def update_mastery(self):
+        """Пересчитать сохраняемые mastery_score и is_learned по текущему состоянию карточки"""
+        self.mastery_score = calculate_mastery_score(
+            self.total_attempts,
+            self.correct_attempts,
+            self.stability,
+            self.difficulty,
+            self.reps,
+            self.consecutive_correct
+        )
+        self.is_learned = is_word_learned(self.mastery_score, self.reps)
     
 class ReviewLog(models.Model):
     """
@@ -503,6 +807,64 @@ class ReviewLog(models.Model):
         return f"{self.user_word.word.hanzi} - {rating_text} ({self.review_date.date()})"
 
 
+class ResponseTimeTable(models.Model):
+    """
+    Процентили времени правильного ответа (float32, шаг 5%) по типу упражнения,
+    уровню HSK и пользователю. Пустой пользователь - таблица по всем пользователям,
+    уровень 0 - по всем уровням
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='response_time_tables'
+    )
+    exercise_type = models.CharField(max_length=50, verbose_name='Тип упражнения')
+    difficulty = models.PositiveSmallIntegerField(default=0, verbose_name='Уровень HSK (0 - все уровни)')
+    sample_count = models.IntegerField(default=0, verbose_name='Количество ответов')
+    percentiles = models.BinaryField(verbose_name='Процентили времени ответа')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время обновления')
+    
+    class Meta:
+        verbose_name = 'Таблица времени ответа'
+        verbose_name_plural = 'Таблицы времени ответа'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'exercise_type', 'difficulty'],
+                name='unique_response_time_table'
+            ),
+        ]
+    
+    def __str__(self):
+        scope = self.user.username if self.user_id else 'все пользователи'
+        return f"{self.exercise_type}, HSK {self.difficulty or 'все'}: {scope}"
+
+
+class UserWordBitset(models.Model):
+    """
+    Сжатые битовые множества слов пользователя по состояниям (индекс бита = id слова)
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='word_bitset'
+    )
+    new_words = models.BinaryField(default=b'', verbose_name='Новые слова')
+    learning_words = models.BinaryField(default=b'', verbose_name='Слова на изучении')
+    review_words = models.BinaryField(default=b'', verbose_name='Слова на повторении')
+    relearning_words = models.BinaryField(default=b'', verbose_name='Слова на переобучении')
+    learned_words = models.BinaryField(default=b'', verbose_name='Изученные слова')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время обновления')
+    
+    class Meta:
+        verbose_name = 'Битовое множество слов пользователя'
+        verbose_name_plural = 'Битовые множества слов пользователей'
+    
+    def __str__(self):
+        return f"Множества слов: {self.user.username}"
+
+
 class LearningScheduler:
     """
     Класс-обертка для FSRS Scheduler с настройками
@@ -510,36 +872,22 @@ class LearningScheduler:
     _scheduler = None
     _optimizer = None
     _default_scheduler = None
+    _weighted_schedulers = {}
+    
+    WEIGHTS_CACHE_KEY = 'users:fsrs_weights:{user_id}'
+    WEIGHTS_CACHE_TIMEOUT = 60 * 60 * 24
     
     @classmethod
     def get_scheduler(cls, user=None) -> Scheduler:
         """Получить экземпляр Scheduler для пользователя"""
         if user:
             try:
-                from users.models import UserLearningProfile
-                user_profile, created = UserLearningProfile.objects.get_or_create(
-                    user=user,
-                    defaults={
-                        'fsrs_weights': '[]',
-                        'new_cards_per_day': 10,
-                        'max_reviews_per_day': 100,
-                        'learning_steps': [1, 10],
-                        're_learning_steps': [10],
-                        'desired_retention': 0.9,
-                        'maximum_interval': 36500,
-                    }
-                )
-                
-                weights = user_profile.get_fsrs_weights()
+                weights = cls.get_user_weights(user)
                 
                 if not weights or weights == []:
                     return cls._get_default_scheduler()
                 
-                if isinstance(weights, list):
-                    weights = tuple(weights)
-                
-                from fsrs import Scheduler
-                return Scheduler(parameters=weights)
+                return cls._get_weighted_scheduler(tuple(weights))
                 
             except Exception as e:
                 print(f"Error getting user weights: {e}")
@@ -547,6 +895,38 @@ class LearningScheduler:
         
         return cls._get_default_scheduler()
     
+    @classmethod
+    def get_user_weights(cls, user) -> list:
+        """Веса FSRS пользователя, кэшируются до изменения профиля обучения"""
+        user_id = getattr(user, 'id', user)
+        cache_key = cls.WEIGHTS_CACHE_KEY.format(user_id=user_id)
+        
+        weights = cache.get(cache_key)
+        if weights is None:
+            from users.models import UserLearningProfile
+            user_profile = UserLearningProfile.objects.filter(user_id=user_id).first()
+            # Без профиля используются веса по умолчанию, профиль создаётся при настройке
+            weights = list(user_profile.get_fsrs_weights() or []) if user_profile else []
+            cache.set(cache_key, weights, timeout=cls.WEIGHTS_CACHE_TIMEOUT)
+        
+        return weights
+    
+    @classmethod
+    def invalidate_user_weights(cls, user):
+        """Сбросить кэшированные веса пользователя"""
+        user_id = getattr(user, 'id', user)
+        cache.delete(cls.WEIGHTS_CACHE_KEY.format(user_id=user_id))
+    
+    @classmethod
+    def _get_weighted_scheduler(cls, weights: tuple):
+        """Шедулер для набора весов, один экземпляр на набор в процессе"""
+        scheduler = cls._weighted_schedulers.get(weights)
+        if scheduler is None:
+            from fsrs import Scheduler
+            scheduler = Scheduler(parameters=weights)
+            cls._weighted_schedulers[weights] = scheduler
+        return scheduler
+    
     @classmethod
     def _get_default_scheduler(cls):
         """Получить дефолтный шедулер"""
@@ -0,0 +1,192 @@
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+
+PERCENTILES = np.arange(0, 101, 5, dtype=np.float64)
+
+
+def grouped_percentiles(keys: np.ndarray, values: np.ndarray, min_samples: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Процентили PERCENTILES значений для каждой группы ключей без цикла по группам
+    (линейная интерполяция, как np.percentile). Группы меньше min_samples пропускаются.
+    Возвращает (ключи групп, размеры групп, таблицы процентилей)
+    """
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.int64), np.zeros((0, len(PERCENTILES)))
+
+    order = np.lexsort((values, keys))
+    keys = keys[order]
+    values = values[order]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    selected = counts >= min_samples
+    starts, counts = starts[selected], counts[selected]
+
+    positions = (counts - 1)[:, None] * (PERCENTILES / 100)[None, :]
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, (counts - 1)[:, None])
+    fraction = positions - low
+    base = starts[:, None]
+    tables = values[base + low] * (1 - fraction) + values[base + high] * fraction
+
+    return keys[starts], counts, tables
+
+
+class ResponseTimeTables:
+    """
+    Таблицы процентилей времени ответа в памяти процесса.
+    Версия калибровки - время последнего обновления таблиц в БД; каждый процесс
+    проверяет её не чаще раза в VERSION_CHECK_INTERVAL секунд и при изменении
+    загружает таблицы одним запросом. Таблицы хранятся одним массивом float32;
+    поиск таблицы - обращение к словарю, процентиль ответа - интерполяция
+    по таблице. Пока калибровки нет, рейтинг считается по порогам по умолчанию
+    """
+    VERSION_CHECK_INTERVAL = 60
+    MIN_SAMPLES = 30
+    MAX_RESPONSE_TIME = 300.0
+    EASY_PERCENTILE = 25
+    GOOD_PERCENTILE = 75
+
+    _instance = None
+    _checked_at = 0.0
+
+    def __init__(self, version):
+        from .models import ResponseTimeTable
+
+        self.version = version
+        self.rows = {}
+        tables = []
+
+        if version is not None:
+            rows = ResponseTimeTable.objects.values_list(
+                'user_id', 'exercise_type', 'difficulty', 'percentiles'
+            )
+            for user_id, exercise_type, difficulty, percentiles in rows:
+                self.rows[(user_id, exercise_type, difficulty)] = len(tables)
+                tables.append(np.frombuffer(bytes(percentiles), dtype=np.float32))
+
+        self.tables = np.array(tables, dtype=np.float32).reshape(len(tables), len(PERCENTILES))
+
+    @classmethod
+    def get(cls) -> 'ResponseTimeTables':
+        """Получить таблицы последней калибровки (версия в БД проверяется периодически)"""
+        now = time.monotonic()
+        if cls._instance is None or now - cls._checked_at >= cls.VERSION_CHECK_INTERVAL:
+            version = cls._load_version()
+            if cls._instance is None or cls._instance.version != version:
+                cls._instance = cls(version)
+            cls._checked_at = now
+        return cls._instance
+
+    @classmethod
+    def _load_version(cls):
+        """Версия калибровки: время обновления таблиц (None, если таблиц нет)"""
+        from .models import ResponseTimeTable
+
+        return ResponseTimeTable.objects.aggregate(version=Max('updated_at'))['version']
+
+    @classmethod
+    def publish(cls):
+        """Перезагрузить таблицы в текущем процессе, остальные подхватят их при проверке версии"""
+        cls._instance = None
+
+    def find_table(self, user_id, exercise_type: str, level: int) -> Optional[np.ndarray]:
+        """Самая точная таблица: пользователя по уровню, пользователя, общая по уровню, общая"""
+        for key in (
+            (user_id, exercise_type, level),
+            (user_id, exercise_type, 0),
+            (None, exercise_type, level),
+            (None, exercise_type, 0)
+        ):
+            row = self.rows.get(key)
+            if row is not None:
+                return self.tables[row]
+        return None
+
+    def percentile(self, user_id, exercise_type: str, level: int, response_time: float) -> Optional[float]:
+        """Процентиль времени ответа (0-100) или None, если таблицы нет"""
+        table = self.find_table(user_id, exercise_type, level or 0)
+        if table is None:
+            return None
+        return float(np.interp(response_time, table, PERCENTILES))
+
+    @classmethod
+    def calibrate(cls, since=None, min_samples=None) -> Dict[str, int]:
+        """
+        Пересчитать таблицы по правильным ответам из ReviewLog и опубликовать их.
+        Таблицы считаются на четырёх уровнях детализации: пользователь и уровень HSK,
+        пользователь, уровень HSK, все ответы типа упражнения
+        """
+        from .models import ReviewLog, ResponseTimeTable
+
+        min_samples = min_samples or cls.MIN_SAMPLES
+        logs = ReviewLog.objects.filter(
+            is_correct=True,
+            response_time__gt=0,
+            response_time__lte=cls.MAX_RESPONSE_TIME
+        )
+        if since is not None:
+            logs = logs.filter(review_date__gte=since)
+
+        rows = list(logs.values_list(
+            'user_word__user_id', 'exercise_type', 'user_word__word__difficulty', 'response_time'
+        ).iterator(chunk_size=10000))
+
+        tables = []
+        answers = len(rows)
+        if rows:
+            user_ids, exercise_types, levels, response_times = zip(*rows)
+            del rows
+            types, type_index = np.unique(np.array(exercise_types, dtype=object), return_inverse=True)
+            user_ids = np.array(user_ids, dtype=np.int64)
+            levels = np.array(levels, dtype=np.int64)
+            response_times = np.array(response_times, dtype=np.float64)
+
+            level_count = int(levels.max()) + 1
+            type_count = len(types)
+            all_users = np.zeros_like(user_ids)
+            all_levels = np.zeros_like(levels)
+
+            # Слова без уровня (0) учитываются только в таблицах по всем уровням
+            leveled = levels > 0
+            for scope_users, scope_levels, mask in (
+                (user_ids, levels, leveled),
+                (user_ids, all_levels, None),
+                (all_users, levels, leveled),
+                (all_users, all_levels, None)
+            ):
+                keys = (scope_users * type_count + type_index) * level_count + scope_levels
+                values = response_times
+                if mask is not None:
+                    keys, values = keys[mask], values[mask]
+                group_keys, counts, percentiles = grouped_percentiles(keys, values, min_samples)
+                group_levels = group_keys % level_count
+                group_types = group_keys // level_count % type_count
+                group_users = group_keys // level_count // type_count
+
+                for user_id, type_id, level, count, table in zip(
+                    group_users.tolist(), group_types.tolist(), group_levels.tolist(),
+                    counts.tolist(), percentiles.astype(np.float32)
+                ):
+                    tables.append(ResponseTimeTable(
+                        user_id=user_id or None,
+                        exercise_type=types[type_id],
+                        difficulty=level,
+                        sample_count=count,
+                        percentiles=table.tobytes()
+                    ))
+
+        with transaction.atomic():
+            ResponseTimeTable.objects.all().delete()
+            ResponseTimeTable.objects.bulk_create(tables, batch_size=1000)
+        cls.publish()
+
+        return {
+            'answers': answers,
+            'tables': len(tables),
+            'user_tables': sum(1 for table in tables if table.user_id)
+        }
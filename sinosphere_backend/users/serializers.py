@@ -4,6 +4,7 @@ from django.utils import timezone
 from rest_framework import serializers
 from .models import UserProfile, UserWord, UserLearningProfile, UserTopicProgress, UserExerciseHistory, ReviewLog
 from dictionary.models import Word
+from dictionary.answer_matcher import AnswerMatcher
 from dictionary.serializers import WordSerializer, TopicSerializer
 
 User = get_user_model()
@@ -253,11 +254,12 @@ class ReviewLogSerializer(serializers.ModelSerializer):
     
     def get_word_info(self, obj):
         word = obj.user_word.word
+        matcher = AnswerMatcher.for_word(word.id)
         return {
             'id': word.id,
             'hanzi': word.hanzi,
             'pinyin': word.pinyin_graphic,
-            'translation': word.translation.split(';')[0].strip() if ';' in word.translation else word.translation
+            'translation': matcher.primary if matcher else word.translation
         }
 
 
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import UserWord, UserLearningProfile, LearningScheduler
+from .word_bitset import KnownWordSet
+
+
+@receiver(post_save, sender=UserWord)
+def update_word_bitset(sender, instance, **kwargs):
+    """Обновить битовые множества пользователя после изменения слова"""
+    KnownWordSet.record_user_word(instance)
+
+
+@receiver(post_delete, sender=UserWord)
+def invalidate_word_bitset(sender, instance, **kwargs):
+    """Сбросить битовые множества пользователя после удаления слова"""
+    KnownWordSet.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=UserLearningProfile)
+@receiver(post_delete, sender=UserLearningProfile)
+def invalidate_fsrs_weights(sender, instance, **kwargs):
+    """Сбросить кэшированные веса FSRS после изменения профиля обучения"""
+    LearningScheduler.invalidate_user_weights(instance.user_id)
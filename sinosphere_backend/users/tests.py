@@ -1,3 +1,275 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from unittest import skipIf
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from dictionary.models import Word, Topic, Tag, WordTag
+from learning.tests import sqlite_without_concurrent_writes
+from .models import ReviewLog, ResponseTimeTable, UserWord, UserTopicProgress
+from .response_times import PERCENTILES, ResponseTimeTables, grouped_percentiles
+from .word_bitset import KnownWordSet
 
-# Create your tests here.
+
+class KnownWordSetTest(TestCase):
+    """Битовые множества слов пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.word = Word.objects.create(hanzi='你好', pinyin_graphic='nǐ hǎo', translation='привет', difficulty=1)
+
+    def test_pack_round_trip(self):
+        self.assertEqual(KnownWordSet._pack(0), b'')
+        for bits in (0, 1, 1 << 7, (1 << 100000) | (1 << 64) | 5, int('10' * 5000, 2)):
+            self.assertEqual(KnownWordSet._unpack(KnownWordSet._pack(bits)), bits)
+
+    def test_encode_round_trip(self):
+        word_set = KnownWordSet(self.user.id)
+        word_set.set_word(3, 2, is_learned=True)
+        word_set.set_word(70000, 1)
+
+        decoded = KnownWordSet._decode(self.user.id, word_set._encode())
+
+        self.assertEqual(decoded.buckets, word_set.buckets)
+        self.assertEqual(decoded.word_ids(), [3, 70000])
+        self.assertEqual(decoded.word_ids(KnownWordSet.LEARNED), [3])
+
+    def _word_set(self):
+        """Множества из БД (кэш сбрасывается после фиксации записи)"""
+        return KnownWordSet.for_user(self.user)
+
+    def test_learned_and_unlearned(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user_word = UserWord.objects.create(user=self.user, word=self.word, state=2, is_learned=True)
+        word_set = self._word_set()
+        self.assertEqual(word_set.get_bucket(self.word.id), KnownWordSet.REVIEW)
+        self.assertTrue(word_set.contains(self.word.id, KnownWordSet.LEARNED))
+
+        user_word.state = 3
+        user_word.is_learned = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user_word.save()
+        word_set = self._word_set()
+        self.assertEqual(word_set.get_bucket(self.word.id), KnownWordSet.RELEARNING)
+        self.assertFalse(word_set.contains(self.word.id, KnownWordSet.LEARNED))
+
+        user_word.delete()
+        self.assertFalse(self._word_set().contains(self.word.id))
+
+
+class UserWordListViewTest(TestCase):
+    """Фильтр изученных слов и сортировка по владению в словаре пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.user_words = {}
+        for hanzi, mastery_score, is_learned, difficulty in [
+            ('一', 40.0, False, 6.0), ('二', 95.0, True, 2.0), ('三', 70.0, False, 4.0), ('四', 85.0, True, 3.0)
+        ]:
+            word = Word.objects.create(hanzi=hanzi, pinyin_graphic=hanzi, translation=hanzi, difficulty=1)
+            self.user_words[hanzi] = UserWord.objects.create(
+                user=self.user, word=word, mastery_score=mastery_score, is_learned=is_learned, difficulty=difficulty
+            )
+
+    def _hanzi(self, **params):
+        response = self.client.get(reverse('user-dictionary'), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['word_info']['hanzi'] for item in response.data]
+
+    def test_is_learned_filter(self):
+        self.assertEqual(sorted(self._hanzi(is_learned='true')), ['二', '四'])
+        self.assertEqual(sorted(self._hanzi(is_learned='false')), ['一', '三'])
+        self.assertEqual(len(self._hanzi()), 4)
+
+    def test_mastery_sort(self):
+        self.assertEqual(self._hanzi(sort_by='mastery'), ['二', '四', '三', '一'])
+        self.assertEqual(self._hanzi(sort_by='mastery', is_learned='false'), ['三', '一'])
+
+    def test_stats_average_difficulty_alias(self):
+        response = self.client.get(reverse('user-stats'))
+
+        self.assertEqual(response.data['learned_words'], 2)
+        self.assertAlmostEqual(response.data['average_difficulty'], 3.75)
+        self.assertEqual(response.data['average_ease_factor'], response.data['average_difficulty'])
+
+
+class UserTopicProgressAddResultsTest(TestCase):
+    """Прогресс по темам увеличивается приращениями пакета ответов"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        self.topics = []
+        words = []
+        for index in range(3):
+            topic = Topic.objects.create(name=f'Тема {index}')
+            tag = Tag.objects.create(name=f'tag{index}', topic=topic)
+            word = Word.objects.create(hanzi=chr(0x4e00 + index), pinyin_graphic=f'p{index}', translation=f'слово {index}')
+            WordTag.objects.create(word=word, tag=tag)
+            self.topics.append(topic)
+            words.append(word)
+        UserWord.objects.create(user=self.user, word=words[2], is_learned=True)
+        KnownWordSet.rebuild(self.user)
+        UserTopicProgress.objects.create(
+            user=self.user, topic=self.topics[0], total_words=1, words_learned=0, total_attempts=8, total_correct=6
+        )
+        UserTopicProgress.objects.create(user=self.user, topic=self.topics[1], total_words=1)
+
+    def test_add_results(self):
+        first, second, missing = self.topics
+
+        with CaptureQueriesContext(connection) as queries:
+            UserTopicProgress.add_results(self.user, {
+                first.id: (2, 2, 1),
+                second.id: (2, 2, 1),
+                missing.id: (1, 0, 0),
+            })
+
+        progress = {item.topic_id: item for item in UserTopicProgress.objects.filter(user=self.user)}
+        self.assertEqual(
+            (progress[first.id].total_attempts, progress[first.id].total_correct, progress[first.id].words_learned),
+            (10, 8, 1)
+        )
+        self.assertAlmostEqual(progress[first.id].accuracy, 80.0)
+        self.assertEqual(progress[first.id].mastery_level, 4)
+        self.assertAlmostEqual(progress[second.id].accuracy, 100.0)
+        self.assertEqual(progress[second.id].mastery_level, 5)
+        self.assertIsNotNone(progress[second.id].last_practiced)
+
+        # Недостающая строка создаётся с числом изученных слов темы из битовых множеств
+        created = progress[missing.id]
+        self.assertEqual((created.total_words, created.words_learned, created.total_attempts), (1, 1, 1))
+        self.assertEqual((created.accuracy, created.mastery_level), (0.0, 0))
+        self.assertTrue(created.is_active)
+
+        # Темы с одинаковыми приращениями обновляются одним запросом
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+
+
+class ResponseTimeTablesTest(TestCase):
+    """Рейтинг ответа по процентилям времени из откалиброванных таблиц"""
+
+    def setUp(self):
+        ResponseTimeTables._instance = None
+        self.addCleanup(setattr, ResponseTimeTables, '_instance', None)
+        self.user = User.objects.create_user(username='student', password='password')
+        word = Word.objects.create(hanzi='你好', pinyin_graphic='nǐ hǎo', translation='привет', difficulty=1)
+        self.user_word = UserWord.objects.create(user=self.user, word=word)
+        # Медленный пользователь: правильные ответы за 10-49 секунд
+        logs = [
+            ReviewLog(user_word=self.user_word, rating=3, is_correct=True, response_time=float(seconds),
+                      exercise_type='translation_ru')
+            for seconds in range(10, 50)
+        ]
+        # Неправильные и слишком долгие ответы в калибровку не входят
+        logs.append(ReviewLog(user_word=self.user_word, rating=1, is_correct=False, response_time=1.0,
+                              exercise_type='translation_ru'))
+        logs.append(ReviewLog(user_word=self.user_word, rating=2, is_correct=True, response_time=900.0,
+                              exercise_type='translation_ru'))
+        ReviewLog.objects.bulk_create(logs)
+
+    def test_grouped_percentiles(self):
+        rng = np.random.default_rng(0)
+        keys = rng.integers(0, 5, size=500)
+        values = rng.random(500) * 60
+
+        group_keys, counts, tables = grouped_percentiles(keys, values, min_samples=90)
+
+        for key, count, table in zip(group_keys, counts, tables):
+            group = values[keys == key]
+            self.assertEqual(count, len(group))
+            np.testing.assert_allclose(table, np.percentile(group, PERCENTILES))
+        self.assertEqual(set(group_keys.tolist()), {
+            key for key in range(5) if np.count_nonzero(keys == key) >= 90
+        })
+
+    def test_calibration_changes_rating(self):
+        ratings = [
+            self.user_word.calculate_automatic_rating(True, seconds, 'translation_ru') for seconds in (15, 30, 45)
+        ]
+        self.assertEqual(ratings, [2, 2, 2])
+
+        output = StringIO()
+        call_command('calibrate_response_times', stdout=output)
+        self.assertIn('Правильных ответов: 40', output.getvalue())
+        self.assertIn('Таблиц пользователей: 2', output.getvalue())
+        self.assertEqual(ResponseTimeTable.objects.count(), 4)
+
+        # 25-й процентиль - 19.75 с, 75-й - 39.25 с
+        ratings = [
+            self.user_word.calculate_automatic_rating(True, seconds, 'translation_ru') for seconds in (15, 30, 45)
+        ]
+        self.assertEqual(ratings, [4, 3, 2])
+        self.assertEqual(self.user_word.calculate_automatic_rating(False, 15, 'translation_ru'), 1)
+        # Для типов без таблицы остаются пороги по умолчанию
+        self.assertEqual(self.user_word.calculate_automatic_rating(True, 10, 'writing'), 3)
+
+    def test_new_calibration_picked_up(self):
+        stale = ResponseTimeTables.get()
+        self.assertIsNone(stale.version)
+
+        ResponseTimeTables.calibrate()
+        # Другой процесс со старыми таблицами подхватывает калибровку при проверке версии
+        ResponseTimeTables._instance = stale
+        ResponseTimeTables._checked_at = 0.0
+
+        tables = ResponseTimeTables.get()
+        self.assertIsNot(tables, stale)
+        self.assertIsNotNone(tables.find_table(self.user.id, 'translation_ru', 1))
+        self.assertAlmostEqual(tables.percentile(None, 'translation_ru', 0, 29.5), 50.0, places=4)
+
+
+@skipIf(
+    sqlite_without_concurrent_writes(),
+    "Для SQLite нужна файловая тестовая база (TEST['NAME']) и OPTIONS['transaction_mode'] = 'IMMEDIATE'"
+)
+class ConcurrentRecordWordsTest(TransactionTestCase):
+    """Параллельные записи в множества одного пользователя не теряют биты"""
+    THREADS = 8
+    WORDS_PER_THREAD = 5
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='password')
+        KnownWordSet.rebuild(self.user)
+
+    def _record(self, thread_index, barrier, errors):
+        try:
+            barrier.wait()
+            for offset in range(self.WORDS_PER_THREAD):
+                word_id = thread_index * self.WORDS_PER_THREAD + offset + 1
+                KnownWordSet.record_words(self.user, [UserWord(word_id=word_id, state=2)])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_parallel_record_words(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        threads = [
+            threading.Thread(target=self._record, args=(index, barrier, errors))
+            for index in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        cache.clear()
+        self.assertEqual(
+            KnownWordSet.for_user(self.user).word_ids(KnownWordSet.REVIEW),
+            list(range(1, self.THREADS * self.WORDS_PER_THREAD + 1))
+        )
@@ -10,6 +10,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from dictionary.answer_matcher import AnswerMatcher
 from .models import UserProfile, UserWord, UserLearningProfile, UserExerciseHistory, UserTopicProgress, LearningScheduler, ReviewLog
 from .serializers import (
     UserSerializer, UserProfileSerializer, UserWordSerializer,
@@ -162,9 +163,9 @@ class UserWordListView(APIView):
         is_learned = request.query_params.get('is_learned')
         if is_learned is not None:
             if is_learned.lower() == 'true':
-                user_words = user_words.filter(reps__gte=3, state=2)
+                user_words = user_words.filter(is_learned=True)
             elif is_learned.lower() == 'false':
-                user_words = user_words.filter(Q(reps__lt=3) | ~Q(state=2))
+                user_words = user_words.filter(is_learned=False)
         
         sort_by = request.query_params.get('sort_by', 'due')
         if sort_by == 'added_date':
@@ -277,32 +278,22 @@ class UserStatsView(APIView):
         total_words = user_words.count()
         learned_words = user_words.filter(is_learned=True).count()
         
-        difficulty_stats = {}
-        for i in range(1, 7):
-            count = user_words.filter(word__difficulty=i).count()
-            difficulty_stats[f'HSK{i}'] = count
-        
-        review_words = UserWord.objects.filter(
-            user=request.user,
-            is_learned=False
+        difficulty_counts = dict(
+            user_words.values_list('word__difficulty').annotate(count=Count('id'))
         )
-        today_reviews = 0
-        for word in review_words:
-            if not word.last_reviewed:
-                today_reviews += 1
-            else:
-                days_since_review = (timezone.now() - word.last_reviewed).days
-                if word.review_count == 0 and days_since_review >= 1:
-                    today_reviews += 1
-                elif word.review_count == 1 and days_since_review >= 6:
-                    today_reviews += 1
-                elif word.review_count > 1:
-                    interval = round(word.review_count * word.ease_factor)
-                    if days_since_review >= interval:
-                        today_reviews += 1
+        difficulty_stats = {
+            f'HSK{i}': difficulty_counts.get(i, 0)
+            for i in range(1, 7)
+        }
+        
+        today_reviews = user_words.filter(
+            is_learned=False,
+            due__lte=timezone.now()
+        ).count()
         
         week_ago = timezone.now() - timezone.timedelta(days=7)
         words_last_week = user_words.filter(added_date__gte=week_ago).count()
+        average_difficulty = user_words.aggregate(Avg('difficulty'))['difficulty__avg'] or 0
         
         return Response({
             'total_words': total_words,
@@ -311,7 +302,9 @@ class UserStatsView(APIView):
             'difficulty_stats': difficulty_stats,
             'words_for_review_today': today_reviews,
             'words_added_last_week': words_last_week,
-            'average_ease_factor': user_words.aggregate(Avg('ease_factor'))['ease_factor__avg'] or 0
+            'average_difficulty': average_difficulty,
+            # Прежнее название поля, оставлено для совместимости клиентов
+            'average_ease_factor': average_difficulty
         })
 
 
@@ -496,7 +489,10 @@ class ReviewLogListView(APIView):
             except ValueError:
                 pass
         
-        serializer = ReviewLogSerializer(logs[:100], many=True)
+        logs = list(logs[:100])
+        AnswerMatcher.for_words({log.user_word.word_id for log in logs})
+        
+        serializer = ReviewLogSerializer(logs, many=True)
         return Response(serializer.data)
 
 
@@ -0,0 +1,245 @@
+import zlib
+from typing import Dict, List, Optional
+from django.core.cache import cache
+from django.db import transaction
+from dictionary.word_index import WordIndex, ids_to_bits, bits_to_ids
+
+
+class KnownWordSet:
+    """
+    Множества слов пользователя по состояниям FSRS в виде битовых масок.
+    Хранится в кэше, сохраняется в UserWordBitset и обновляется после каждого повторения
+    """
+    NEW = 'new'
+    LEARNING = 'learning'
+    REVIEW = 'review'
+    RELEARNING = 'relearning'
+    LEARNED = 'learned'
+
+    STATE_BUCKETS = {
+        0: NEW,
+        1: LEARNING,
+        2: REVIEW,
+        3: RELEARNING,
+    }
+    BUCKETS = (NEW, LEARNING, REVIEW, RELEARNING, LEARNED)
+
+    CACHE_KEY = 'users:word_bitset:{user_id}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    def __init__(self, user_id, buckets: Dict[str, int] = None):
+        self.user_id = user_id
+        self.buckets = {bucket: 0 for bucket in self.BUCKETS}
+        if buckets:
+            self.buckets.update(buckets)
+
+    @classmethod
+    def for_user(cls, user) -> 'KnownWordSet':
+        """Получить множества слов пользователя из кэша, БД или пересобрать их"""
+        user_id = getattr(user, 'id', user)
+
+        data = cache.get(cls.CACHE_KEY.format(user_id=user_id))
+        if data is not None:
+            return cls._decode(user_id, data)
+
+        from .models import UserWordBitset
+        stored = UserWordBitset.objects.filter(user_id=user_id).first()
+        if stored is not None:
+            word_set = cls(user_id, {
+                bucket: cls._unpack(getattr(stored, f'{bucket}_words'))
+                for bucket in cls.BUCKETS
+            })
+            word_set._save_to_cache()
+            return word_set
+
+        return cls.rebuild(user_id)
+
+    @classmethod
+    def from_cache(cls, user) -> Optional['KnownWordSet']:
+        """Множества пользователя, только если они есть в кэше"""
+        user_id = getattr(user, 'id', user)
+        data = cache.get(cls.CACHE_KEY.format(user_id=user_id))
+        if data is None:
+            return None
+        return cls._decode(user_id, data)
+
+    @classmethod
+    def rebuild(cls, user) -> 'KnownWordSet':
+        """Пересобрать множества по таблице UserWord"""
+        user_id = getattr(user, 'id', user)
+        word_set = cls._from_user_words(user_id)
+        word_set.save()
+        return word_set
+
+    @classmethod
+    def record_user_word(cls, user_word):
+        """Отразить текущее состояние слова пользователя в его множествах"""
+        cls.record_words(user_word.user_id, [user_word])
+
+    @classmethod
+    def record_words(cls, user, user_words):
+        """
+        Отразить состояния карточек в сохранённых множествах.
+        Строка UserWordBitset блокируется на время изменения, чтобы параллельные
+        повторения одного пользователя не затирали биты друг друга. Кэш сбрасывается
+        после фиксации транзакции и заполняется из БД при следующем обращении
+        """
+        from .models import UserWordBitset
+
+        user_id = getattr(user, 'id', user)
+        with transaction.atomic():
+            stored, created = UserWordBitset.objects.select_for_update().get_or_create(user_id=user_id)
+            if created:
+                word_set = cls._from_user_words(user_id)
+            else:
+                word_set = cls(user_id, {
+                    bucket: cls._unpack(getattr(stored, f'{bucket}_words'))
+                    for bucket in cls.BUCKETS
+                })
+
+            for user_word in user_words:
+                word_set.set_word(user_word.word_id, user_word.state, user_word.is_learned)
+
+            for bucket in cls.BUCKETS:
+                setattr(stored, f'{bucket}_words', cls._pack(word_set.buckets[bucket]))
+            stored.save()
+
+            cache_key = cls.CACHE_KEY.format(user_id=user_id)
+            transaction.on_commit(lambda: cache.delete(cache_key))
+        return word_set
+
+    @classmethod
+    def _from_user_words(cls, user_id) -> 'KnownWordSet':
+        from .models import UserWord
+
+        bucket_ids = {bucket: [] for bucket in cls.BUCKETS}
+        user_words = UserWord.objects.filter(user_id=user_id).values_list(
+            'word_id', 'state', 'is_learned'
+        )
+        for word_id, state, is_learned in user_words:
+            bucket_ids[cls.STATE_BUCKETS.get(state, cls.LEARNING)].append(word_id)
+            if is_learned:
+                bucket_ids[cls.LEARNED].append(word_id)
+
+        return cls(user_id, {
+            bucket: ids_to_bits(ids) for bucket, ids in bucket_ids.items()
+        })
+
+    @classmethod
+    def invalidate(cls, user):
+        """Сбросить сохранённые множества, следующее обращение пересоберёт их"""
+        from .models import UserWordBitset
+
+        user_id = getattr(user, 'id', user)
+        cache.delete(cls.CACHE_KEY.format(user_id=user_id))
+        UserWordBitset.objects.filter(user_id=user_id).delete()
+
+    def set_word(self, word_id, state, is_learned=False):
+        """Переместить слово в корзину, соответствующую состоянию"""
+        self.remove_word(word_id)
+        bit = 1 << word_id
+        bucket = self.STATE_BUCKETS.get(state, self.LEARNING)
+        self.buckets[bucket] |= bit
+        if is_learned:
+            self.buckets[self.LEARNED] |= bit
+
+    def remove_word(self, word_id):
+        """Убрать слово из всех корзин"""
+        mask = ~(1 << word_id)
+        for bucket in self.BUCKETS:
+            self.buckets[bucket] &= mask
+
+    def save(self, persist=True):
+        """Сохранить множества в кэш и в БД (persist=False - только в кэш)"""
+        from .models import UserWordBitset
+
+        if persist:
+            fields = {
+                f'{bucket}_words': self._pack(self.buckets[bucket])
+                for bucket in self.BUCKETS
+            }
+            UserWordBitset.objects.update_or_create(user_id=self.user_id, defaults=fields)
+
+        self._save_to_cache()
+
+    def _save_to_cache(self):
+        cache.set(
+            self.CACHE_KEY.format(user_id=self.user_id),
+            self._encode(),
+            timeout=self.CACHE_TIMEOUT
+        )
+
+    @property
+    def all_bits(self) -> int:
+        """Все слова в словаре пользователя"""
+        return (
+            self.buckets[self.NEW] | self.buckets[self.LEARNING] |
+            self.buckets[self.REVIEW] | self.buckets[self.RELEARNING]
+        )
+
+    @property
+    def known_bits(self) -> int:
+        """Изученные слова"""
+        return self.buckets[self.LEARNED]
+
+    def contains(self, word_id, bucket=None) -> bool:
+        """Есть ли слово в словаре пользователя (или в конкретной корзине)"""
+        bits = self.buckets[bucket] if bucket else self.all_bits
+        return bool((bits >> word_id) & 1)
+
+    def get_bucket(self, word_id):
+        """Корзина состояния слова или None, если слова нет в словаре"""
+        for bucket in (self.NEW, self.LEARNING, self.REVIEW, self.RELEARNING):
+            if (self.buckets[bucket] >> word_id) & 1:
+                return bucket
+        return None
+
+    def count(self, bucket=None) -> int:
+        """Количество слов в корзине (по умолчанию во всём словаре)"""
+        bits = self.buckets[bucket] if bucket else self.all_bits
+        return bits.bit_count()
+
+    def word_ids(self, bucket=None) -> List[int]:
+        """Список id слов корзины"""
+        bits = self.buckets[bucket] if bucket else self.all_bits
+        return bits_to_ids(bits)
+
+    def count_in_topic(self, topic_id, bucket=LEARNED) -> int:
+        """Количество слов корзины, входящих в тему"""
+        return (self.buckets[bucket] & WordIndex.get().get_topic_bits(topic_id)).bit_count()
+
+    def count_in_hsk_level(self, level, bucket=LEARNED) -> int:
+        """Количество слов корзины заданного уровня HSK"""
+        return (self.buckets[bucket] & WordIndex.get().get_difficulty_bits(level)).bit_count()
+
+    def unknown_in_topic(self, topic_id) -> List[int]:
+        """Слова темы, которых ещё нет в словаре пользователя"""
+        topic_bits = WordIndex.get().get_topic_bits(topic_id)
+        return bits_to_ids(topic_bits & ~self.all_bits)
+
+    def topic_coverage(self, topic_id, bucket=LEARNED) -> float:
+        """Доля слов темы в корзине (0-1)"""
+        topic_bits = WordIndex.get().get_topic_bits(topic_id)
+        total = topic_bits.bit_count()
+        if total == 0:
+            return 0.0
+        return (self.buckets[bucket] & topic_bits).bit_count() / total
+
+    @staticmethod
+    def _pack(bits: int) -> bytes:
+        if not bits:
+            return b''
+        return zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+
+    @staticmethod
+    def _unpack(data) -> int:
+        if not data:
+            return 0
+        return int.from_bytes(zlib.decompress(bytes(data)), 'little')
+
+    def _encode(self):
+        return {bucket: self._pack(bits) for bucket, bits in self.buckets.items()}
+
+    @classmethod
+    def _decode(cls, user_id, data):
+        return cls(user_id, {bucket: cls._unpack(packed) for bucket, packed in data.items()})